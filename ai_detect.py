@@ -7,14 +7,68 @@ try:
 except ImportError:
     WEBRTC_AVAILABLE = False
 
+# VAD 分片时长（秒），每个分片交给一个工作进程
+VAD_SHARD_SECONDS = 60.0
+# 分片前附带的上一段音频（秒），只用于让 VAD 的自适应噪声模型预热，结果丢弃
+VAD_WARMUP_SECONDS = 5.0
+# 每个工作进程最多排队的分片数：解码比判定快时，未处理分片的 PCM 不会无限堆积在内存中
+VAD_IN_FLIGHT_PER_WORKER = 2
+
+
+def default_vad_workers():
+    """VAD 默认工作进程数：主进程用全部核心，已在进程池子进程中时不再嵌套"""
+    import multiprocessing
+    import os
+    if multiprocessing.parent_process() is not None:
+        return 1
+    return os.cpu_count() or 1
+
+
+def vad_frames(pcm, frame_length, sample_rate, mode, skip=0):
+    """用独立的 Vad 实例逐帧判定一个分片
+
+    帧长在调用前已保证合法，循环内不再逐帧 try/except，
+    只有整段失败时才退回逐帧容错处理。可在工作进程中调用。
+
+    Args:
+        pcm: 16-bit PCM 字节串，长度为帧长的整数倍
+        frame_length: 每帧采样数
+        sample_rate: 采样率
+        mode: VAD 模式（0-3）
+        skip: 开头丢弃结果的帧数（预热部分）
+
+    Returns:
+        bool 数组，每帧一个
+    """
+    is_speech = webrtcvad.Vad(mode).is_speech
+    view = memoryview(pcm)
+    step = frame_length * 2
+    offsets = range(0, len(view) - step + 1, step)
+    try:
+        flags = [is_speech(view[o:o + step], sample_rate) for o in offsets]
+    except Exception:
+        flags = []
+        for o in offsets:
+            try:
+                flags.append(is_speech(view[o:o + step], sample_rate))
+            except Exception:
+                flags.append(False)
+    return np.array(flags[skip:], dtype=bool)
+
 
 class VADDetector:
     """语音活动检测（使用 WebRTC VAD）"""
 
-    def __init__(self):
+    def __init__(self, workers=None):
+        """
+        Args:
+            workers: 并行 VAD 的进程数，None 表示自动（见 default_vad_workers）
+        """
         self.vad = None
         self.sample_rate = 16000
         self.frame_duration = 30  # ms (10, 20, 或 30)
+        self.mode = 2  # 0-3, 3最激进
+        self.workers = workers
 
     def load_model(self):
         """初始化 WebRTC VAD"""
@@ -24,61 +78,30 @@ class VADDetector:
 
         if self.vad is None:
             try:
-                self.vad = webrtcvad.Vad(2)  # 模式 2 (0-3, 3最激进)
+                self.vad = webrtcvad.Vad(self.mode)
             except Exception as e:
                 print(f"VAD 初始化失败: {e}")
                 self.vad = None
                 return False
         return True
 
-    def detect_speech(self, clip, min_duration=1.0, padding=0.3):
-        """检测语音片段
-
-        Args:
-            clip: 视频片段
-            min_duration: 最小语音时长（秒）
-            padding: 片段前后填充（秒）
-
-        Returns:
-            语音片段列表 [(start, end), ...]
-        """
-        if not clip.audio:
-            return []
-
-        if not self.load_model():
-            return []  # VAD 初始化失败
-
-        # 提取音频并重采样到 16kHz
-        audio = clip.audio
-        samples = audio.to_soundarray(fps=self.sample_rate)
-        if len(samples.shape) > 1:
-            samples = np.mean(samples, axis=1)
-
-        # 转换为 16-bit PCM
-        samples = (samples * 32767).astype(np.int16)
-
-        # VAD 检测（逐帧处理）
-        frame_length = int(self.sample_rate * self.frame_duration / 1000)
-        num_frames = len(samples) // frame_length
-        speech_frames = []
+    def config_key(self):
+        """影响检测结果的参数（用于共享解码和缓存）"""
+        return (self.sample_rate, self.frame_duration, self.mode,
+                VAD_SHARD_SECONDS, VAD_WARMUP_SECONDS)
 
-        for i in range(num_frames):
-            start_idx = i * frame_length
-            end_idx = start_idx + frame_length
-            frame = samples[start_idx:end_idx].tobytes()
+    def create_stream(self):
+        """创建流式 VAD 处理器（供 AudioAnalysis 在解码时逐块喂入）"""
+        return _VADStream(self)
 
-            try:
-                is_speech = self.vad.is_speech(frame, self.sample_rate)
-                speech_frames.append(is_speech)
-            except Exception:
-                speech_frames.append(False)
-
-        if not speech_frames:
+    def segments_from_flags(self, speech_frames, duration, min_duration=1.0, padding=0.3):
+        """将逐帧语音标记转换为时间片段"""
+        if len(speech_frames) == 0:
             return []
 
         # 转换为时间片段
         frame_duration_sec = self.frame_duration / 1000.0
-        is_speech = np.array(speech_frames)
+        is_speech = np.asarray(speech_frames, dtype=bool)
 
         # 找到变化点
         changes = np.diff(np.concatenate([[False], is_speech, [False]]).astype(int))
@@ -90,50 +113,139 @@ class VADDetector:
         for s, e in zip(starts, ends):
             if e - s >= min_duration:
                 s_padded = max(0, s - padding)
-                e_padded = min(clip.duration, e + padding)
+                e_padded = min(duration, e + padding)
                 segments.append((s_padded, e_padded))
 
         return segments
 
-
-class SceneDetector:
-    """场景分割检测（基于直方图差异）"""
-
-    @staticmethod
-    def detect_scenes(clip, threshold=30.0, min_duration=2.0):
-        """检测场景切换
+    def detect_speech(self, clip, min_duration=1.0, padding=0.3, analysis=None):
+        """检测语音片段
 
         Args:
             clip: 视频片段
-            threshold: 场景切换阈值（0-100）
-            min_duration: 最小场景时长（秒）
+            min_duration: 最小语音时长（秒）
+            padding: 片段前后填充（秒）
+            analysis: 共享的 AudioAnalysis 上下文（与其他检测器共用一次解码）
 
         Returns:
-            场景列表 [(start, end), ...]
+            语音片段列表 [(start, end), ...]
         """
-        duration = clip.duration
-        sample_interval = 0.5  # 每0.5秒采样一次
-        times = np.arange(0, duration, sample_interval)
+        if not clip.audio:
+            return []
 
-        if len(times) < 2:
-            return [(0, duration)]
+        if not self.load_model():
+            return []  # VAD 初始化失败
 
-        # 计算直方图
-        def get_histogram(t):
-            frame = clip.get_frame(t)
-            # 缩小图像加速
-            h, w = frame.shape[:2]
-            small = frame[::4, ::4]
-            hist = np.histogram(small, bins=32, range=(0, 256))[0]
-            return hist / hist.sum()
+        if analysis is None:
+            from audio_analysis import AudioAnalysis
+            analysis = AudioAnalysis(clip, vad=self)
+
+        speech_frames = analysis.speech_flags(self)
+        return self.segments_from_flags(speech_frames, clip.duration, min_duration, padding)
+
+
+class _VADStream:
+    """流式 VAD - 接收 16kHz 单声道采样块，按时间分片并行判定语音
+
+    采样按 VAD_SHARD_SECONDS 切成分片（边界落在帧边界上），每个分片用独立的
+    Vad 实例处理，并在开头附带 VAD_WARMUP_SECONDS 的上一段音频用于预热。
+    分片结果按时间顺序拼接，帧数与串行处理一致；分片方式固定，
+    结果与工作进程数无关（workers=1 与 workers=N 逐帧相同）。
+
+    预热只是近似整段串行处理时 Vad 的内部状态：自适应噪声模型在 5 秒内未完全收敛时，
+    分片边界之后的少量帧可能与用一个 Vad 实例处理整段音频的结果不同
+    （tests/test_vad_shards.py：不超过 2% 的帧，且都在边界之后 15 秒内）。
+
+    分片数不少于两个时才启动进程池；进行中的分片达到
+    VAD_IN_FLIGHT_PER_WORKER × 工作进程数时，先等待已提交的分片完成再继续读取。
+    """
+
+    def __init__(self, detector):
+        detector.load_model()
+        self.detector = detector
+        self.frame_length = int(detector.sample_rate * detector.frame_duration / 1000)
+        frames_per_second = 1000 / detector.frame_duration
+        self.shard_samples = max(1, int(VAD_SHARD_SECONDS * frames_per_second)) * self.frame_length
+        self.warmup_samples = int(VAD_WARMUP_SECONDS * frames_per_second) * self.frame_length
+        self.workers = detector.workers or default_vad_workers()
+        self.pending = np.zeros(0, dtype=np.int16)
+        self.tail = np.zeros(0, dtype=np.int16)  # 上一分片末尾，用于预热
+        self.shards = []  # 按时间顺序：bool 数组或 Future
+        self.in_flight = []  # 尚未取回结果的 Future 在 shards 中的下标
+        self.executor = None
+
+    def feed(self, samples):
+        # 转换为 16-bit PCM
+        pcm = (samples * 32767).astype(np.int16)
+        if len(self.pending):
+            pcm = np.concatenate([self.pending, pcm])
+        n_shards = len(pcm) // self.shard_samples
+        for i in range(n_shards):
+            self._submit(pcm[i * self.shard_samples:(i + 1) * self.shard_samples])
+        self.pending = pcm[n_shards * self.shard_samples:]
+
+    def _submit(self, shard):
+        detector = self.detector
+        args = (np.concatenate([self.tail, shard]).tobytes(), self.frame_length,
+                detector.sample_rate, detector.mode, len(self.tail) // self.frame_length)
+        self.tail = shard[len(shard) - self.warmup_samples:] if self.warmup_samples else shard[:0]
+
+        if self.workers > 1 and self.shards and self.executor is None:
+            # 出现第二个分片时才启动进程池，短音频不付出启动开销
+            from concurrent.futures import ProcessPoolExecutor
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        if self.executor is None:
+            self.shards.append(vad_frames(*args))
+        else:
+            self._drain(VAD_IN_FLIGHT_PER_WORKER * self.workers)
+            self.in_flight.append(len(self.shards))
+            self.shards.append(self.executor.submit(vad_frames, *args))
+
+    def _drain(self, limit):
+        """取回已完成分片的结果，直到进行中的分片少于 limit"""
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        while True:
+            for i in [i for i in self.in_flight if self.shards[i].done()]:
+                self.in_flight.remove(i)
+                # 出错的分片保留 Future，在 result() 中抛出
+                if self.shards[i].exception() is None:
+                    self.shards[i] = self.shards[i].result()
+            if len(self.in_flight) < limit:
+                return
+            wait([self.shards[i] for i in self.in_flight], return_when=FIRST_COMPLETED)
+
+    def result(self):
+        # 剩余不足一个分片的整帧
+        whole = len(self.pending) // self.frame_length * self.frame_length
+        if whole:
+            self._submit(self.pending[:whole])
+        self.pending = np.zeros(0, dtype=np.int16)
+        try:
+            parts = [s.result() if hasattr(s, 'result') else s for s in self.shards]
+        finally:
+            self.in_flight = []
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=bool)
 
-        hists = [get_histogram(t) for t in times]
 
-        # 计算相邻帧差异
-        diffs = []
-        for i in range(len(hists) - 1):
-            diff = np.sum(np.abs(hists[i+1] - hists[i])) * 100
-            diffs.append(diff)
+class SceneDetector:
+    """场景分割检测（基于直方图差异）"""
+
+    @staticmethod
+    def compute_histogram_diffs(clip, sample_interval=0.5):
+        """计算相邻采样帧的直方图差异序列（0-200）"""
+        from video_analysis import VideoAnalysis
+        return VideoAnalysis(clip).histogram_diffs(sample_interval)
+
+    @staticmethod
+    def scenes_from_diffs(diffs, duration, threshold=30.0, min_duration=2.0, sample_interval=0.5):
+        """根据直方图差异序列划分场景（不涉及解码）"""
+        times = np.arange(0, duration, sample_interval)
+        if len(times) < 2:
+            return [(0, duration)]
 
         # 检测场景切换点
         scene_changes = [0]
@@ -153,6 +265,28 @@ class SceneDetector:
 
         return scenes if scenes else [(0, duration)]
 
+    @staticmethod
+    def detect_scenes(clip, threshold=30.0, min_duration=2.0, cache=None, analysis=None):
+        """检测场景切换
+
+        Args:
+            clip: 视频片段
+            threshold: 场景切换阈值（0-100）
+            min_duration: 最小场景时长（秒）
+            cache: AnalysisCache 实例，缓存直方图差异序列
+            analysis: 共享的 VideoAnalysis 上下文（与其他画面检测器共用一次解码）
+
+        Returns:
+            场景列表 [(start, end), ...]
+        """
+        sample_interval = 0.5  # 每0.5秒采样一次
+        if analysis is None:
+            from video_analysis import VideoAnalysis
+            analysis = VideoAnalysis(clip, scene_interval=sample_interval, cache=cache)
+        diffs = analysis.histogram_diffs(sample_interval)
+        return SceneDetector.scenes_from_diffs(diffs, clip.duration, threshold, min_duration,
+                                               sample_interval)
+
 
 class FaceDetector:
     """人脸检测（使用 OpenCV Haar Cascade）"""
@@ -172,13 +306,14 @@ class FaceDetector:
                 print(f"人脸检测模型加载失败: {e}")
                 self.cascade = None
 
-    def detect_faces(self, clip, sample_interval=1.0, min_face_ratio=0.02):
+    def detect_faces(self, clip, sample_interval=1.0, min_face_ratio=0.02, analysis=None):
         """检测有人脸的片段
 
         Args:
             clip: 视频片段
             sample_interval: 采样间隔（秒）
             min_face_ratio: 最小人脸占比
+            analysis: 共享的 VideoAnalysis 上下文（与其他画面检测器共用一次解码）
 
         Returns:
             有人脸的时间点列表
@@ -187,26 +322,11 @@ class FaceDetector:
         if self.cascade is None:
             return []
 
-        import cv2
-        duration = clip.duration
-        times = np.arange(0, duration, sample_interval)
-
-        face_times = []
-        for t in times:
-            frame = clip.get_frame(t)
-            gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
-
-            # 检测人脸
-            faces = self.cascade.detectMultiScale(gray, 1.1, 4)
-
-            if len(faces) > 0:
-                # 计算人脸占比
-                total_area = sum(w * h for (x, y, w, h) in faces)
-                frame_area = frame.shape[0] * frame.shape[1]
-                if total_area / frame_area >= min_face_ratio:
-                    face_times.append(t)
-
-        return face_times
+        if analysis is None:
+            from video_analysis import VideoAnalysis
+            analysis = VideoAnalysis(clip, face_detector=self, face_interval=sample_interval,
+                                     min_face_ratio=min_face_ratio)
+        return analysis.face_times(self, sample_interval, min_face_ratio)
 
 
 class KeyframeExtractor:
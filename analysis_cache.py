@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""分析结果磁盘缓存 - 按文件身份 + 检测参数缓存中间序列
+
+缓存的是检测器的中间序列（逐窗口音量、VAD 帧标记、静止画面差异、
+场景直方图差异），而不是最终片段。调整 silence_threshold、min_duration、
+padding 等分段参数时直接从缓存重新分段，无需再次解码视频。
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+
+# 检测算法变更时递增，使旧缓存自动失效
+CACHE_VERSION = 1
+
+# 默认缓存上限 512MB（超出后按最近最少使用淘汰）
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# 内容哈希的采样块大小（头、中、尾各一块）
+HASH_BLOCK = 1024 * 1024
+
+
+def default_cache_root():
+    """平台默认缓存目录（可用环境变量 KOOIX_CUT_CACHE_DIR 覆盖）"""
+    env = os.environ.get("KOOIX_CUT_CACHE_DIR")
+    if env:
+        return Path(env)
+    if sys.platform == "win32":
+        base = Path(os.environ.get("LOCALAPPDATA", Path.home() / "AppData" / "Local"))
+    elif sys.platform == "darwin":
+        base = Path.home() / "Library" / "Caches"
+    else:
+        base = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+    return base / "kooix-cut"
+
+
+def content_hash(path):
+    """采样内容哈希（文件头、中、尾各 1MB + 文件大小）
+
+    对几 GB 的录像也只读取 3MB，能识别被原地覆盖但大小/时间戳相同的文件。
+    """
+    size = os.path.getsize(path)
+    h = hashlib.sha1(str(size).encode())
+    with open(path, "rb") as f:
+        for offset in (0, max(0, size // 2 - HASH_BLOCK // 2), max(0, size - HASH_BLOCK)):
+            f.seek(offset)
+            h.update(f.read(HASH_BLOCK))
+    return h.hexdigest()
+
+
+def file_identity(path, with_hash=False):
+    """文件身份（路径、大小、修改时间，可选内容哈希）"""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    identity = {"path": path, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    if with_hash:
+        identity["hash"] = content_hash(path)
+    return identity
+
+
+class AnalysisCache:
+    """分析中间序列的磁盘缓存（.npy 文件，LRU 淘汰）
+
+    每条缓存一个文件，文件的修改时间即最近使用时间；写入后若总大小
+    超过上限，从最久未使用的开始删除。写入使用临时文件 + 原子替换，
+    多个进程可以安全地共享同一个缓存目录。
+    """
+
+    suffix = ".npy"
+
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES, with_hash=False):
+        """
+        Args:
+            root: 缓存目录，默认见 default_cache_root()
+            max_bytes: 缓存总大小上限（字节）
+            with_hash: 文件身份中是否包含内容哈希
+        """
+        self.root = Path(root) if root else default_cache_root() / "analysis"
+        self.max_bytes = max_bytes
+        self.with_hash = with_hash
+        self._hashes = {}
+
+    def key(self, path, kind, params):
+        """生成缓存键
+
+        Args:
+            path: 源文件路径
+            kind: 序列类型，如 'volumes'、'vad'、'static'、'scene'
+            params: 影响该序列的分析参数（可 JSON 序列化）
+        """
+        identity = file_identity(path)
+        if self.with_hash:
+            stamp = (identity["path"], identity["size"], identity["mtime_ns"])
+            if stamp not in self._hashes:
+                self._hashes[stamp] = content_hash(path)
+            identity["hash"] = self._hashes[stamp]
+        payload = json.dumps(
+            [CACHE_VERSION, identity, kind, params],
+            sort_keys=True, default=str,
+        )
+        return f"{kind}-{hashlib.sha1(payload.encode()).hexdigest()}"
+
+    def _file(self, key):
+        return self.root / f"{key}{self.suffix}"
+
+    def lookup(self, key):
+        """按文件使用缓存：命中时返回缓存文件路径（并更新最近使用时间），否则返回 None"""
+        f = self._file(key)
+        try:
+            os.utime(f)
+            return str(f)
+        except OSError:
+            return None
+
+    def temp_path(self, key):
+        """写入用的临时文件路径（与缓存在同一目录，便于原子替换）"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        return str(self.root / f"{key}.{os.getpid()}.{threading.get_ident()}.part")
+
+    def store(self, tmp, key):
+        """把写入完成的临时文件移入缓存，返回缓存文件路径"""
+        f = self._file(key)
+        os.replace(tmp, f)
+        self.evict()
+        return str(f)
+
+    def get(self, key):
+        """读取缓存，未命中返回 None"""
+        import numpy as np
+
+        f = self._file(key)
+        try:
+            value = np.load(f, allow_pickle=False)
+            os.utime(f)  # 更新最近使用时间
+            return value
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, value):
+        """写入缓存并按需淘汰"""
+        import numpy as np
+
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            f = self._file(key)
+            tmp = f.with_name(f"{f.stem}.{os.getpid()}.tmp")
+            with open(tmp, "wb") as fh:
+                np.save(fh, np.asarray(value), allow_pickle=False)
+            os.replace(tmp, f)
+        except OSError as e:
+            print(f"写入分析缓存失败: {e}")
+            return
+        self.evict()
+
+    def entries(self):
+        """所有缓存条目 [(mtime, size, path), ...]"""
+        result = []
+        if not self.root.exists():
+            return result
+        for f in self.root.glob(f"*{self.suffix}"):
+            try:
+                st = f.stat()
+            except OSError:
+                continue  # 已被其他进程删除
+            result.append((st.st_mtime, st.st_size, f))
+        return result
+
+    def size(self):
+        """缓存总大小（字节）"""
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """超出上限时删除最久未使用的条目"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        for _, size, f in sorted(entries):
+            try:
+                f.unlink()
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        """清空缓存，返回释放的字节数"""
+        freed = 0
+        for _, size, f in self.entries():
+            try:
+                f.unlink()
+                freed += size
+            except OSError:
+                pass
+        return freed
+
+
+_default_cache = None
+
+
+def default_cache():
+    """进程内共享的默认缓存实例"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = AnalysisCache()
+    return _default_cache
+
+
+def cached_series(cache, path, kind, params, compute):
+    """读取缓存的序列，未命中时调用 compute() 计算并写入
+
+    cache 为 None 或 path 为空时直接计算。
+    """
+    if cache is None or not path:
+        return compute()
+    key = cache.key(path, kind, params)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.put(key, value)
+    return value
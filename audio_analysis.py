@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""音频分析上下文 - 单次解码，多个检测器共享"""
+import os
+
+import numpy as np
+
+from analysis_cache import AnalysisCache, default_cache_root
+from run_report import file_size, stage, timed
+
+# 音量检测的最高采样率（避免MoviePy在低采样率下的bug）
+VOLUME_MAX_FPS = 22050
+
+# PCM 旁路文件缓存上限（超出后按最近最少使用淘汰）
+PCM_CACHE_MAX_BYTES = 8 * 1024 * 1024 * 1024
+
+
+def volume_fps(audio):
+    """音量检测使用的采样率"""
+    return min(audio.fps, VOLUME_MAX_FPS)
+
+
+def window_volumes(trimmed):
+    """逐窗口音量（70% RMS + 30% 峰值）
+
+    Args:
+        trimmed: 形状 (n_windows, win_samples) 的采样数组
+
+    Returns:
+        每个窗口的音量数组
+    """
+    # RMS（平均能量）
+    rms = np.sqrt(np.mean(trimmed ** 2, axis=1))
+    # 峰值（捕捉瞬时音量）
+    peaks = np.max(np.abs(trimmed), axis=1)
+    # 混合指标（70% RMS + 30% 峰值）
+    return 0.7 * rms + 0.3 * peaks
+
+
+class VolumeAccumulator:
+    """流式音量累积器 - 逐块累积完整窗口，余数留到下一块"""
+
+    def __init__(self, win_samples):
+        self.win_samples = win_samples
+        self.parts = []
+        self.remainder = np.zeros(0)
+
+    def feed(self, samples):
+        if len(self.remainder):
+            samples = np.concatenate([self.remainder, samples])
+        n_windows = len(samples) // self.win_samples
+        if n_windows:
+            trimmed = samples[:n_windows * self.win_samples].reshape(n_windows, self.win_samples)
+            self.parts.append(window_volumes(trimmed))
+        self.remainder = samples[n_windows * self.win_samples:]
+
+    def result(self):
+        return np.concatenate(self.parts) if self.parts else np.zeros(0)
+
+
+class _SamplePicker:
+    """从源采样流中按目标采样率取样
+
+    与 MoviePy ``to_soundarray(fps=...)`` 的规则完全一致：
+    第 k 个目标采样取时间 k/fps 处最近的源采样帧，解码不足时补零。
+    """
+
+    def __init__(self, reader_fps, target_fps, nchannels, total):
+        self.reader_fps = reader_fps
+        self.target_fps = target_fps
+        self.nchannels = nchannels
+        self.total = total
+        self.k = 0  # 下一个待输出的目标采样序号
+
+    def _source_frames(self, k0, k1):
+        timings = (1.0 / self.target_fps) * np.arange(k0, k1)
+        return np.round(self.reader_fps * timings).astype(int)
+
+    def next_frame(self):
+        """下一个需要的源采样帧号（已完成时返回 None）"""
+        if self.k >= self.total:
+            return None
+        return int(self._source_frames(self.k, self.k + 1)[0])
+
+    def pick(self, buf, buf_start, eof=False):
+        """从缓冲区中取出所有可用的目标采样（单声道 float64）"""
+        if eof:
+            k_end = self.total
+        else:
+            k_end = min(self.total, int((buf_start + len(buf)) * self.target_fps / self.reader_fps) + 2)
+        if k_end <= self.k:
+            return np.zeros(0)
+
+        frames = self._source_frames(self.k, k_end)
+        if not eof:
+            frames = frames[:np.searchsorted(frames, buf_start + len(buf))]
+        idx = frames - buf_start
+        picked = np.zeros((len(frames), self.nchannels))
+        valid = idx < len(buf)
+        picked[valid] = buf[idx[valid]] / 32768.0
+        self.k += len(frames)
+        return np.mean(picked, axis=1) if self.nchannels > 1 else picked[:, 0]
+
+
+class PcmCache(AnalysisCache):
+    """解码后 PCM 的旁路文件缓存（原始 16-bit 交错采样，LRU 淘汰）
+
+    每个音频文件只解码一次，写成与 ffmpeg 输出逐字节相同的 .pcm 文件，
+    之后用 np.memmap 只读映射：任何分析参数的重新分析都直接从页缓存读取，
+    不再启动解码，也不在堆上复制原始采样；多个工作进程映射同一文件时
+    由操作系统共享物理内存。
+    """
+
+    suffix = ".pcm"
+
+    def __init__(self, root=None, max_bytes=PCM_CACHE_MAX_BYTES):
+        super().__init__(root or default_cache_root() / "pcm", max_bytes)
+
+    def open(self, filename, fps, nchannels):
+        """命中时返回只读内存映射（形状 (n, nchannels) 的 int16），否则返回 None"""
+        path = self.lookup(self.key(filename, "pcm", [fps, nchannels]))
+        if path is None:
+            return None
+        frames = os.path.getsize(path) // (2 * nchannels)
+        if frames == 0:
+            return np.zeros((0, nchannels), dtype=np.int16)
+        return np.memmap(path, dtype=np.int16, mode="r", shape=(frames, nchannels))
+
+    def decode(self, filename, fps, nchannels, chunk_frames):
+        """解码并在读取的同时写入旁路文件，用法同 ffmpeg_tools.iter_pcm_chunks
+
+        调用方提前结束读取时，剩余部分继续解码写完，保证旁路文件完整。
+        """
+        from ffmpeg_tools import iter_pcm_chunks
+
+        key = self.key(filename, "pcm", [fps, nchannels])
+        tmp = self.temp_path(key)
+        source = iter_pcm_chunks(filename, fps, nchannels, chunk_frames)
+        complete = False
+        try:
+            with open(tmp, "wb") as f:
+                try:
+                    for chunk in source:
+                        f.write(chunk.tobytes())
+                        yield chunk
+                except GeneratorExit:
+                    for chunk in source:
+                        f.write(chunk.tobytes())
+                    complete = True
+                    raise
+                complete = True
+        finally:
+            source.close()
+            if complete:
+                self.store(tmp, key)
+            elif os.path.exists(tmp):
+                os.remove(tmp)
+
+
+_pcm_cache = None
+
+
+def default_pcm_cache():
+    """进程内共享的 PCM 旁路文件缓存"""
+    global _pcm_cache
+    if _pcm_cache is None:
+        _pcm_cache = PcmCache()
+    return _pcm_cache
+
+
+class AudioAnalysis:
+    """单个文件的音频分析上下文
+
+    各检测器在创建时声明所需的数据（音量窗口、VAD），首次取结果时
+    只启动一次 ffmpeg 解码，按各自的采样率和格式分发给所有检测器。
+    解码是流式的，内存占用与时长无关。
+
+    用法:
+        vad = VADDetector()
+        analysis = AudioAnalysis(clip, window_size=0.3, vad=vad)
+        volumes = analysis.volumes(0.3)     # 触发唯一一次解码
+        flags = analysis.speech_flags(vad)  # 直接复用结果
+    """
+
+    def __init__(self, clip, window_size=None, vad=None, streaming=True, chunk_seconds=10.0,
+                 cache=None, pcm_cache=None):
+        """
+        Args:
+            clip: 视频片段
+            window_size: 音量分析窗口（秒），None 表示不需要音量
+            vad: VADDetector 实例，None 表示不需要 VAD
+            streaming: 是否流式解码；无源文件时自动回退到一次性读取
+            chunk_seconds: 流式解码的块大小（秒）
+            cache: AnalysisCache 实例，命中时跳过解码
+            pcm_cache: PcmCache 实例，流式分析改为读取（或首次生成）PCM 旁路文件
+        """
+        self.clip = clip
+        self.streaming = streaming
+        self.cache = cache
+        self.pcm_cache = pcm_cache
+        self.chunk_seconds = chunk_seconds
+        self._pending = {}
+        self._results = {}
+        if self.has_audio and window_size is not None:
+            self._declare_volumes(window_size)
+        if self.has_audio and vad is not None:
+            self._declare_vad(vad)
+
+    @property
+    def has_audio(self):
+        return self.clip.audio is not None
+
+    def _declare_volumes(self, window_size):
+        audio = self.clip.audio
+        fps = volume_fps(audio)
+        key = ('volumes', window_size, audio.fps, audio.nchannels, fps)
+        if key not in self._results and key not in self._pending:
+            self._pending[key] = (fps, VolumeAccumulator(int(fps * window_size)))
+        return key
+
+    def _declare_vad(self, vad):
+        audio = self.clip.audio
+        key = ('vad', audio.fps, audio.nchannels) + vad.config_key()
+        if key not in self._results and key not in self._pending:
+            self._pending[key] = (vad.sample_rate, vad.create_stream())
+        return key
+
+    def volumes(self, window_size=0.3):
+        """逐窗口音量序列（见 window_volumes）"""
+        if not self.has_audio:
+            return np.zeros(0)
+        return self._get(self._declare_volumes(window_size))
+
+    def speech_flags(self, vad):
+        """VAD 逐帧语音标记（bool 数组）"""
+        if not self.has_audio:
+            return np.zeros(0, dtype=bool)
+        return self._get(self._declare_vad(vad))
+
+    def _get(self, key):
+        if key not in self._results:
+            self.decode()
+        return self._results[key]
+
+    def decode(self):
+        """执行一次解码，计算所有已声明但尚未完成的结果"""
+        audio = self.clip.audio
+        filename = getattr(audio, 'filename', None)
+
+        # 先查磁盘缓存，全部命中则完全不解码
+        cache_keys = {}
+        if self.cache is not None and filename:
+            for key in list(self._pending):
+                cache_keys[key] = self.cache.key(filename, key[0], list(key[1:]))
+                value = self.cache.get(cache_keys[key])
+                if value is not None:
+                    self._results[key] = value
+                    del self._pending[key]
+
+        if not self._pending:
+            return
+        # 各检测器的计算计入各自的阶段，其余为解码
+        feeds = [(fps, timed(consumer.feed, f"audio.{key[0]}"))
+                 for key, (fps, consumer) in self._pending.items()]
+
+        with stage("audio.decode") as st:
+            if self.streaming and filename:
+                st.bytes_read = self._decode_streaming(feeds)
+            else:
+                st.bytes_read = file_size(filename)
+                for fps, feed in feeds:
+                    samples = audio.to_soundarray(fps=fps)
+                    if len(samples.shape) > 1:
+                        samples = np.mean(samples, axis=1)
+                    feed(samples)
+
+        for key, (_, consumer) in self._pending.items():
+            self._results[key] = timed(consumer.result, f"audio.{key[0]}")()
+            if key in cache_keys:
+                self.cache.put(cache_keys[key], self._results[key])
+        self._pending = {}
+
+    def _decode_streaming(self, feeds):
+        """流式解码并分发，返回读取的字节数"""
+        from ffmpeg_tools import iter_pcm_chunks
+
+        audio = self.clip.audio
+        reader_fps = audio.fps
+        nchannels = audio.nchannels
+        pickers = [
+            (_SamplePicker(reader_fps, fps, nchannels, int(fps * audio.duration)), feed)
+            for fps, feed in feeds
+        ]
+
+        buf = np.zeros((0, nchannels), dtype=np.int16)
+        buf_start = 0  # buf[0] 对应的源采样帧号
+        chunk_frames = max(1, int(reader_fps * self.chunk_seconds))
+
+        pcm = None
+        if self.pcm_cache is not None:
+            pcm = self.pcm_cache.open(audio.filename, reader_fps, nchannels)
+        if pcm is not None:
+            chunks = (pcm[i:i + chunk_frames] for i in range(0, len(pcm), chunk_frames))
+            bytes_read = pcm.nbytes
+        elif self.pcm_cache is not None:
+            chunks = self.pcm_cache.decode(audio.filename, reader_fps, nchannels, chunk_frames)
+            bytes_read = file_size(audio.filename)
+        else:
+            chunks = iter_pcm_chunks(audio.filename, reader_fps, nchannels, chunk_frames)
+            bytes_read = file_size(audio.filename)
+
+        for chunk in chunks:
+            if pcm is None:
+                buf = np.concatenate([buf, chunk])
+            else:
+                # 旁路文件：缓冲区直接是内存映射的视图，不复制原始采样
+                buf = pcm[buf_start:buf_start + len(buf) + len(chunk)]
+            for picker, feed in pickers:
+                samples = picker.pick(buf, buf_start)
+                if len(samples):
+                    feed(samples)
+
+            # 只保留后续还会用到的采样
+            needed = [f for f in (p.next_frame() for p, _ in pickers) if f is not None]
+            if not needed:
+                return bytes_read
+            keep_from = min(needed) - buf_start
+            if keep_from > 0:
+                buf = buf[keep_from:]
+                buf_start += keep_from
+
+        for picker, feed in pickers:
+            samples = picker.pick(buf, buf_start, eof=True)
+            if len(samples):
+                feed(samples)
+        return bytes_read
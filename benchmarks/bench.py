@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""性能基准测试 - 各检测器与完整导出流程
+
+每个基准在独立子进程中运行（峰值内存互不影响，且不使用分析缓存），
+结果写入 JSON，便于在不同提交之间对比：
+
+    python benchmarks/bench.py                      # 全部基准，120 秒 720p 素材
+    python benchmarks/bench.py --only audio static  # 只运行部分基准
+    python benchmarks/bench.py --compare old.json   # 与之前的结果对比
+
+指标：wall_s（耗时）、cpu_s（CPU 时间）、x_realtime（素材时长 / 耗时，
+越大越快）、peak_rss_mb（子进程峰值内存，Windows 下为 null）。
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+
+def bench_audio(clip, workdir):
+    from kooix_cut import detect_audio_segments
+    detect_audio_segments(clip)
+
+
+def bench_static(clip, workdir):
+    from kooix_cut import detect_static_scenes
+    detect_static_scenes(clip)
+
+
+def bench_vad(clip, workdir):
+    from ai_detect import VADDetector, WEBRTC_AVAILABLE
+    if not WEBRTC_AVAILABLE:
+        return "webrtcvad 未安装"
+    VADDetector().detect_speech(clip)
+
+
+def bench_scene(clip, workdir):
+    from ai_detect import SceneDetector
+    SceneDetector.detect_scenes(clip)
+
+
+def bench_face(clip, workdir):
+    from ai_detect import FaceDetector
+    detector = FaceDetector()
+    detector.load_model()
+    if detector.cascade is None:
+        return "OpenCV 人脸模型不可用"
+    detector.detect_faces(clip)
+
+
+def bench_keyframes(clip, workdir):
+    from ai_detect import KeyframeExtractor
+    KeyframeExtractor.extract_keyframes(clip)
+
+
+def bench_process_videos(clip, workdir):
+    from kooix_cut import process_videos
+    process_videos(str(Path(clip.filename).parent), str(Path(workdir) / "output.mp4"),
+                   use_cache=False)
+
+
+BENCHMARKS = {
+    "audio": bench_audio,
+    "static": bench_static,
+    "vad": bench_vad,
+    "scene": bench_scene,
+    "face": bench_face,
+    "keyframes": bench_keyframes,
+    "process_videos": bench_process_videos,
+}
+
+
+def peak_rss_mb():
+    """当前进程峰值内存（MB），不支持的平台返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_worker(name, fixture):
+    """子进程入口：运行单个基准，结果以 JSON 输出到 stdout 最后一行"""
+    from moviepy import VideoFileClip
+
+    clip = VideoFileClip(str(fixture))
+    duration = clip.duration
+    with tempfile.TemporaryDirectory() as workdir:
+        cpu0 = time.process_time()
+        t0 = time.perf_counter()
+        skipped = BENCHMARKS[name](clip, workdir)
+        wall = time.perf_counter() - t0
+        cpu = time.process_time() - cpu0
+    clip.close()
+
+    if skipped:
+        result = {"skipped": skipped}
+    else:
+        result = {
+            "wall_s": round(wall, 3),
+            "cpu_s": round(cpu, 3),
+            "x_realtime": round(duration / wall, 2) if wall > 0 else None,
+            "peak_rss_mb": None if peak_rss_mb() is None else round(peak_rss_mb(), 1),
+        }
+    print(json.dumps(result))
+
+
+def run_benchmark(name, fixture):
+    """在独立子进程中运行一个基准"""
+    env = dict(os.environ, KOOIX_CUT_CACHE_DIR=tempfile.mkdtemp(prefix="kooix-bench-cache-"))
+    proc = subprocess.run(
+        [sys.executable, __file__, "--worker", name, str(fixture)],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, text=True,
+    )
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        return {"error": proc.stderr.strip()[-800:] or f"退出码 {proc.returncode}"}
+    return json.loads(lines[-1])
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(current, baseline_file):
+    """打印与之前结果的对比（耗时比值 < 1 表示变快）"""
+    baseline = json.loads(Path(baseline_file).read_text(encoding="utf-8"))
+    print(f"\n对比 {baseline_file}（{baseline.get('commit')} → {current.get('commit')}）")
+    print(f"{'基准':<16}{'旧耗时':>10}{'新耗时':>10}{'比值':>8}{'旧内存':>10}{'新内存':>10}")
+    for name, new in current["benchmarks"].items():
+        old = baseline.get("benchmarks", {}).get(name, {})
+        if "wall_s" not in new or "wall_s" not in old:
+            continue
+        ratio = new["wall_s"] / old["wall_s"] if old["wall_s"] else float("nan")
+        print(f"{name:<16}{old['wall_s']:>10.2f}{new['wall_s']:>10.2f}{ratio:>8.2f}"
+              f"{old.get('peak_rss_mb') or 0:>10.0f}{new.get('peak_rss_mb') or 0:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KOOIX Cut 性能基准测试")
+    parser.add_argument("--duration", type=int, default=120, help="素材时长（秒）")
+    parser.add_argument("--size", default="1280x720", help="素材分辨率")
+    parser.add_argument("--fps", type=int, default=30, help="素材帧率")
+    parser.add_argument("--fixtures", default=str(Path(tempfile.gettempdir()) / "kooix-bench"),
+                        help="素材目录（重复运行时复用）")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="只运行指定基准")
+    parser.add_argument("--output", help="结果 JSON 路径，默认 bench-<commit>.json")
+    parser.add_argument("--compare", help="与之前的结果 JSON 对比")
+    parser.add_argument("--worker", nargs=2, metavar=("NAME", "FIXTURE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker)
+        return
+
+    from fixtures import make_fixture
+
+    # 每个分辨率/时长单独一个目录，process_videos 只处理这一个文件
+    folder = Path(args.fixtures) / f"{args.duration}s_{args.size}_{args.fps}fps"
+    print(f"准备素材: {folder}")
+    fixture = make_fixture(folder, args.duration, args.size, args.fps)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "fixture": {"duration": args.duration, "size": args.size, "fps": args.fps},
+        "benchmarks": {},
+    }
+    for name in args.only or BENCHMARKS:
+        print(f"运行 {name} ...", end=" ", flush=True)
+        result = run_benchmark(name, fixture)
+        report["benchmarks"][name] = result
+        if "wall_s" in result:
+            print(f"{result['wall_s']:.2f}s  {result['x_realtime']}x  "
+                  f"{result['peak_rss_mb']} MB")
+        else:
+            print(result.get("skipped") or "失败: " + result.get("error", ""))
+
+    output = Path(args.output or f"bench-{report['commit'] or 'local'}.json")
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"结果已写入 {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
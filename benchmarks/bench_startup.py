@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""启动耗时基准 - 基于 python -X importtime，防止重量级模块回到启动路径
+
+每次在新的子进程中导入目标模块（不创建窗口），解析 -X importtime 输出，
+统计导入耗时和各直接依赖的累计耗时；同时检查 numpy、MoviePy、OpenCV、
+webrtcvad 等只应在开始处理时（或窗口首次绘制后在后台）导入的模块
+是否出现在启动路径中：
+
+    python benchmarks/bench_startup.py                        # modern_gui，运行 5 次取中位数
+    python benchmarks/bench_startup.py --modules modern_gui cli --runs 10
+    python benchmarks/bench_startup.py --budget-ms 300        # 超出预算时退出码为 1
+    python benchmarks/bench_startup.py --compare startup-<旧提交>.json
+
+启动路径中出现重量级模块，或导入耗时中位数超出 --budget-ms 时退出码为 1，
+可直接用于 CI。
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from bench import ROOT, git_commit
+
+# 不应在启动时导入的顶层包
+HEAVY_MODULES = ("numpy", "moviepy", "cv2", "webrtcvad", "imageio", "PIL", "kooix_cut", "ai_detect")
+
+# 报告中列出的直接依赖数
+TOP_IMPORTS = 15
+
+
+def parse_importtime(stderr):
+    """解析 -X importtime 输出
+
+    Returns:
+        [(模块名, 深度, 自身耗时 μs, 累计耗时 μs), ...]，按输出顺序（子模块在前）
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # 表头
+        name = fields[2]
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((name.strip(), depth, int(fields[0]), int(fields[1])))
+    return entries
+
+
+def direct_imports(entries, module):
+    """目标模块的直接依赖及其累计耗时（μs），按耗时降序"""
+    pending = []
+    for name, depth, _, cumulative in entries:
+        if depth == 0:
+            if name == module:
+                children = [(n, c) for n, d, _, c in pending if d == 1]
+                return sorted(children, key=lambda item: -item[1])
+            pending = []
+        else:
+            pending.append((name, depth, None, cumulative))
+    return []
+
+
+def run_once(module):
+    """在新的子进程中导入一次模块
+
+    Returns:
+        (进程总耗时秒, 导入耗时秒, importtime 条目)
+    """
+    code = (f"import sys, time; sys.path.insert(0, {str(ROOT)!r}); "
+            f"t0 = time.perf_counter(); import {module}; print(time.perf_counter() - t0)")
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    process = time.perf_counter() - t0
+    if proc.returncode != 0:
+        tail = [line for line in proc.stderr.splitlines() if not line.startswith("import time:")]
+        raise RuntimeError("\n".join(tail[-5:]) or f"退出码 {proc.returncode}")
+    return process, float(proc.stdout.strip().splitlines()[-1]), parse_importtime(proc.stderr)
+
+
+def bench_module(module, runs):
+    """多次导入取中位数，并检查启动路径中的重量级模块"""
+    processes, imports = [], []
+    entries = []
+    for _ in range(runs):
+        try:
+            process, imported, entries = run_once(module)
+        except RuntimeError as e:
+            return {"error": str(e)}
+        processes.append(process)
+        imports.append(imported)
+
+    heavy = sorted({name.split(".")[0] for name, _, _, _ in entries
+                    if name.split(".")[0] in HEAVY_MODULES and name != module})
+    return {
+        "import_ms": round(statistics.median(imports) * 1000, 1),
+        "process_ms": round(statistics.median(processes) * 1000, 1),
+        "first_process_ms": round(processes[0] * 1000, 1),  # 最接近冷启动
+        "modules_imported": len(entries),
+        "heavy_modules": heavy,
+        "top_imports": [{"module": name, "cumulative_ms": round(us / 1000, 1)}
+                        for name, us in direct_imports(entries, module)[:TOP_IMPORTS]],
+    }
+
+
+def compare(current, baseline_file):
+    """打印与之前结果的对比（比值 < 1 表示变快）"""
+    baseline = json.loads(Path(baseline_file).read_text(encoding="utf-8"))
+    print(f"\n对比 {baseline_file}（{baseline.get('commit')} → {current.get('commit')}）")
+    print(f"{'模块':<16}{'旧导入ms':>10}{'新导入ms':>10}{'比值':>8}")
+    for name, new in current["modules"].items():
+        old = baseline.get("modules", {}).get(name, {})
+        if "import_ms" not in new or "import_ms" not in old:
+            continue
+        ratio = new["import_ms"] / old["import_ms"] if old["import_ms"] else float("nan")
+        print(f"{name:<16}{old['import_ms']:>10.1f}{new['import_ms']:>10.1f}{ratio:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KOOIX Cut 启动耗时基准")
+    parser.add_argument("--modules", nargs="+", default=["modern_gui"], help="要导入的模块")
+    parser.add_argument("--runs", type=int, default=5, help="每个模块的运行次数")
+    parser.add_argument("--budget-ms", type=float, help="导入耗时中位数上限（毫秒）")
+    parser.add_argument("--output", help="结果 JSON 路径，默认 startup-<commit>.json")
+    parser.add_argument("--compare", help="与之前的结果 JSON 对比")
+    args = parser.parse_args()
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "modules": {},
+    }
+    failed = False
+    for module in args.modules:
+        result = bench_module(module, max(1, args.runs))
+        report["modules"][module] = result
+        if "error" in result:
+            print(f"{module}: 失败: {result['error']}")
+            failed = True
+            continue
+        print(f"{module}: 导入 {result['import_ms']:.1f}ms  进程 {result['process_ms']:.1f}ms"
+              f"（首次 {result['first_process_ms']:.1f}ms）  {result['modules_imported']} 个模块")
+        for entry in result["top_imports"]:
+            print(f"  {entry['module']:<28}{entry['cumulative_ms']:>8.1f}ms")
+        if result["heavy_modules"]:
+            print(f"  启动路径中出现重量级模块: {', '.join(result['heavy_modules'])}")
+            failed = True
+        if args.budget_ms and result["import_ms"] > args.budget_ms:
+            print(f"  超出预算 {args.budget_ms:.0f}ms")
+            failed = True
+
+    output = Path(args.output or f"startup-{report['commit'] or 'local'}.json")
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"结果已写入 {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
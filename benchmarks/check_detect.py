@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""检测一致性检查 - ffmpeg 抽帧的画面分析与逐帧 get_frame 的原始实现一致
+
+VideoAnalysis 由 ffmpeg 按采样网格一次解码；这里用 MoviePy ``get_frame(t)``
+逐帧读取同样的时间点，按原始实现计算静止差异（全分辨率 RGB 十字条带）、
+场景直方图差异和人脸时间点，逐项比较（静止片段同时按默认阈值比较）：
+
+    python benchmarks/check_detect.py
+    python benchmarks/check_detect.py --fps 24 --size 1280x720
+
+任一序列不一致时退出码为 1。
+"""
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fixtures import make_fixture  # noqa: E402
+from kooix_cut import static_segments_from_diffs  # noqa: E402
+from video_analysis import VideoAnalysis  # noqa: E402
+
+
+def reference_frames(clip, interval):
+    return [clip.get_frame(t) for t in np.arange(0, clip.duration, interval)]
+
+
+def reference_static_diffs(frames):
+    """原始静止检测：相邻采样帧十字条带平均差异（0-1）"""
+    samples = []
+    for frame in frames:
+        h, w = frame.shape[:2]
+        s = max(2, min(h, w) // 20)
+        samples.append(np.concatenate([frame[h // 2 - s:h // 2 + s, :].flatten(),
+                                       frame[:, w // 2 - s:w // 2 + s].flatten()]))
+    return np.array([np.mean(np.abs(b.astype(float) - a.astype(float))) / 255.0
+                     for a, b in zip(samples, samples[1:])])
+
+
+def reference_histogram_diffs(frames):
+    """原始场景检测：相邻采样帧 32 级直方图差异（0-200）"""
+    hists = []
+    for frame in frames:
+        hist = np.histogram(frame[::4, ::4], bins=32, range=(0, 256))[0]
+        hists.append(hist / hist.sum())
+    return np.array([np.sum(np.abs(b - a)) * 100 for a, b in zip(hists, hists[1:])])
+
+
+def reference_face_times(detector, frames, interval, min_face_ratio=0.02):
+    import cv2
+
+    times = []
+    for t, frame in zip(np.arange(0, len(frames)) * interval, frames):
+        faces = detector.cascade.detectMultiScale(cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY), 1.1, 4)
+        area = sum(w * h for (x, y, w, h) in faces)
+        if len(faces) and area / (frame.shape[0] * frame.shape[1]) >= min_face_ratio:
+            times.append(t)
+    return times
+
+
+def report(name, ok, detail):
+    print(f"{name:<10}{'OK' if ok else '不一致'}  {detail}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KOOIX Cut 检测一致性检查")
+    parser.add_argument("--duration", type=int, default=30, help="素材时长（秒）")
+    parser.add_argument("--size", default="640x360", help="素材分辨率")
+    parser.add_argument("--fps", type=int, default=30, help="素材帧率")
+    parser.add_argument("--fixtures", default=str(Path(tempfile.gettempdir()) / "kooix-bench"),
+                        help="素材目录（重复运行时复用）")
+    args = parser.parse_args()
+
+    from moviepy import VideoFileClip
+
+    from ai_detect import FaceDetector
+
+    folder = Path(args.fixtures) / f"{args.duration}s_{args.size}_{args.fps}fps"
+    clip = VideoFileClip(str(make_fixture(folder, args.duration, args.size, args.fps)))
+    detector = FaceDetector()
+    detector.load_model()
+    ok = True
+    # 单独运行静止检测时 ffmpeg 只输出条带，与其他检测器一起时从整帧裁剪，两种都比较
+    frames = reference_frames(clip, 1.0)
+    expected = reference_static_diffs(frames)
+    for name, analysis in (("static", VideoAnalysis(clip, static_interval=1.0)),
+                           ("static+", VideoAnalysis(clip, static_interval=1.0,
+                                                     scene_interval=0.5))):
+        actual = analysis.static_diffs(1.0)
+        same = len(actual) == len(expected) and np.allclose(actual, expected)
+        segments = static_segments_from_diffs(actual, clip.duration)
+        same &= segments == static_segments_from_diffs(expected, clip.duration)
+        ok &= report(name, same,
+                     f"{len(actual)} 个差异，最大偏差 "
+                     f"{np.max(np.abs(actual - expected)) if len(actual) == len(expected) else '-'}"
+                     f"，{len(segments)} 个静止片段")
+
+    analysis = VideoAnalysis(clip, scene_interval=0.5,
+                             face_detector=detector if detector.cascade is not None else None)
+    frames = reference_frames(clip, 0.5)
+    expected = reference_histogram_diffs(frames)
+    actual = analysis.histogram_diffs(0.5)
+    ok &= report("scene", len(actual) == len(expected) and np.allclose(actual, expected),
+                 f"{len(actual)} 个差异，最大偏差 "
+                 f"{np.max(np.abs(actual - expected)) if len(actual) == len(expected) else '-'}")
+
+    if detector.cascade is None:
+        print("face      跳过（OpenCV 人脸模型不可用）")
+    else:
+        frames = reference_frames(clip, 1.0)
+        expected = reference_face_times(detector, frames, 1.0)
+        actual = analysis.face_times(detector, 1.0)
+        ok &= report("face", list(actual) == list(expected), f"{len(actual)} 个时间点")
+
+    clip.close()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""导出一致性检查 - 各导出模式的帧数、帧率与 MoviePy 合成一致
+
+用基准素材（见 fixtures.py）构造跨越关键帧的时间线，分别用每种导出模式
+输出，以 MoviePy 合成的结果为基准比较视频帧数和帧率：
+
+    python benchmarks/check_export.py
+    python benchmarks/check_export.py --fps 24 --size 1280x720
+
+任一模式帧率不同，或帧数相差超过片段数（每个剪切点最多差一帧）时退出码为 1。
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from export import (EXPORT_MODES, export_moviepy_timeline, export_parallel,  # noqa: E402
+                    export_timeline)
+from ffmpeg_tools import probe_streams, run_ffmpeg  # noqa: E402
+from fixtures import make_fixture  # noqa: E402
+
+
+def count_frames(path):
+    """(视频帧数, 帧率字符串)
+
+    用 ffmpeg 流复制到 framecrc 逐包计数（每个视频包一帧），不依赖 ffprobe。
+    """
+    out = run_ffmpeg(["-i", str(path), "-map", "0:v:0", "-c", "copy", "-f", "framecrc", "-"])
+    frames = sum(1 for line in out.decode(errors="replace").splitlines()
+                 if line and not line.startswith("#"))
+    streams = probe_streams(str(path)).get("streams") or []
+    video = next((s for s in streams if s.get("codec_type") == "video"), {})
+    return frames, video.get("r_frame_rate")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KOOIX Cut 导出一致性检查")
+    parser.add_argument("--duration", type=int, default=30, help="素材时长（秒）")
+    parser.add_argument("--size", default="640x360", help="素材分辨率")
+    parser.add_argument("--fps", type=int, default=30, help="素材帧率")
+    parser.add_argument("--fixtures", default=str(Path(tempfile.gettempdir()) / "kooix-bench"),
+                        help="素材目录（重复运行时复用）")
+    args = parser.parse_args()
+
+    folder = Path(args.fixtures) / f"{args.duration}s_{args.size}_{args.fps}fps"
+    fixture = str(make_fixture(folder, args.duration, args.size, args.fps))
+    # 三个片段，起止点都不在关键帧上
+    third = args.duration / 3
+    segments = [(fixture, k * third + 1.0, (k + 1) * third - 0.4) for k in range(3)]
+
+    workdir = tempfile.mkdtemp(prefix="kooix-check-export-")
+    try:
+        reference = os.path.join(workdir, "moviepy.mp4")
+        export_moviepy_timeline(segments, reference, preset="ultrafast", threads=2)
+        expected, expected_rate = count_frames(reference)
+        print(f"{'moviepy':<12}{expected:>6} 帧  {expected_rate}")
+
+        failed = False
+        for mode in [*EXPORT_MODES, "parallel-3"]:
+            output = os.path.join(workdir, f"{mode}.mp4")
+            if mode == "parallel-3":
+                export_parallel(segments, output, preset="ultrafast", threads=2, chunks=3)
+            else:
+                export_timeline(segments, output, mode, preset="ultrafast", threads=2)
+            frames, rate = count_frames(output)
+            ok = rate == expected_rate and abs(frames - expected) <= len(segments)
+            failed |= not ok
+            print(f"{mode:<12}{frames:>6} 帧  {rate}  {'OK' if ok else '不一致'}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""基准测试素材 - 用 ffmpeg lavfi 在本地生成合成视频
+
+画面依次为：运动测试图（testsrc2）→ 纯色静止画面 → 彩条（smptebars），
+两处硬切；音频为 440Hz 音调，每 20 秒响 12 秒、静音 8 秒。
+相同参数生成的素材内容完全一致，可在不同提交之间对比。
+"""
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ffmpeg_tools import run_ffmpeg  # noqa: E402
+
+# 音频开关周期（秒）与每个周期内的发声时长
+TONE_PERIOD = 20
+TONE_ON = 12
+
+
+def fixture_name(duration, size, fps):
+    return f"bench_{duration}s_{size}_{fps}fps.mp4"
+
+
+def make_fixture(folder, duration=120, size="1280x720", fps=30, force=False):
+    """生成（或复用）一个基准素材
+
+    Args:
+        folder: 输出目录
+        duration: 时长（秒）
+        size: 分辨率，如 "1280x720"
+        fps: 帧率
+        force: 已存在时也重新生成
+
+    Returns:
+        素材文件路径
+    """
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    output = folder / fixture_name(duration, size, fps)
+    if output.exists() and not force:
+        return output
+
+    part = duration / 3
+    video = (
+        f"testsrc2=s={size}:r={fps}:d={part}[v0];"
+        f"color=c=0x406080:s={size}:r={fps}:d={part}[v1];"
+        f"smptebars=s={size}:r={fps}:d={duration - 2 * part}[v2];"
+        f"[v0][v1][v2]concat=n=3:v=1:a=0[v]"
+    )
+    audio = (
+        f"aevalsrc='0.5*sin(2*PI*440*t)*lt(mod(t,{TONE_PERIOD}),{TONE_ON})'"
+        f":s=44100:c=stereo:d={duration}[a]"
+    )
+    tmp = output.with_name(output.stem + ".tmp.mp4")
+    run_ffmpeg([
+        "-y", "-filter_complex", f"{video};{audio}",
+        "-map", "[v]", "-map", "[a]",
+        "-c:v", "libx264", "-preset", "veryfast", "-g", str(fps * 2), "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", "128k",
+        str(tmp),
+    ])
+    os.replace(tmp, output)
+    return output
+
+
+if __name__ == "__main__":
+    print(make_fixture(sys.argv[1] if len(sys.argv) > 1 else "bench_fixtures"))
@@ -16,6 +16,8 @@ a = Analysis(
         'cv2',
         'moviepy',
         'numpy',
+        'cProfile',
+        'pstats',
     ],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""命令行批处理 - 无界面运行完整检测流程
+
+每个输入（目录或清单文件）是一个任务，输出一个剪辑后的视频。
+多个任务可以并行，所有任务共用一个分析进程池：
+
+    kooix-cut-cli ./day1 ./day2 -o ./out --jobs 2 --vad --static
+    kooix-cut-cli list.txt -o merged.mp4 --export-mode smart
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from export import EXPORT_MODES
+from video_sort import SORT_METHODS
+
+
+def add_pipeline_arguments(parser):
+    """检测与导出参数（批处理和监视模式共用）"""
+    audio = parser.add_argument_group("音频检测")
+    audio.add_argument("--threshold", type=float, default=0.01, help="静音阈值（默认 0.01）")
+    audio.add_argument("--min-duration", type=float, default=3.0, help="最小片段时长（秒）")
+    audio.add_argument("--window-size", type=float, default=0.3, help="分析窗口（秒）")
+    audio.add_argument("--smoothing", type=int, default=3, help="平滑窗口数")
+    audio.add_argument("--padding", type=float, default=0.5, help="片段前后填充（秒）")
+    audio.add_argument("--vad", action="store_true", help="使用 WebRTC VAD 语音检测")
+    audio.add_argument("--pcm-sidecar", action="store_true",
+                       help="音频只解码一次为 PCM 旁路文件，之后内存映射读取（占用缓存空间）")
+
+    video = parser.add_argument_group("画面检测")
+    video.add_argument("--static", action="store_true", help="过滤静止画面")
+    video.add_argument("--static-threshold", type=float, default=0.02, help="静止变化阈值")
+    video.add_argument("--static-duration", type=float, default=5.0, help="最小静止时长（秒）")
+    video.add_argument("--scene", action="store_true", help="按场景切分")
+    video.add_argument("--face", action="store_true", help="只保留有人脸的片段")
+
+    out = parser.add_argument_group("导出")
+    out.add_argument("--codec", default="libx264", help="视频编码器（默认 libx264；auto 自动检测 GPU 编码器）")
+    out.add_argument("--preset", default="medium", help="编码预设（默认 medium）")
+    out.add_argument("--export-mode", default="reencode", choices=list(EXPORT_MODES),
+                     help="导出模式（默认 reencode）")
+    out.add_argument("--sort", default="name_natural", choices=list(SORT_METHODS),
+                     help="目录输入的排序方式（默认 name_natural）")
+    out.add_argument("--reverse", action="store_true", help="倒序排序")
+    out.add_argument("--no-cache", action="store_true", help="不使用分析缓存")
+
+
+def options_from_args(args):
+    """从命令行参数构造分析参数"""
+    from engine import analysis_options
+    return analysis_options(
+        args.threshold, args.min_duration, args.window_size, args.smoothing, args.padding,
+        args.vad, args.static, args.static_threshold, args.static_duration,
+        args.scene, args.face, use_cache=not args.no_cache, pcm_sidecar=args.pcm_sidecar,
+    )
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="kooix-cut-cli",
+        description="KOOIX Cut 命令行批处理：自动删除静音片段并合并视频",
+    )
+    parser.add_argument("inputs", nargs="+",
+                        help="输入目录或清单文件（.txt/.lst 每行一个路径，或 .json）")
+    parser.add_argument("-o", "--output",
+                        help="输出：单个输入时可为 .mp4 文件，否则为输出目录（默认当前目录）")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="同时运行的任务数（默认 1）")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="分析进程总数，所有任务共用（默认 CPU 核数）")
+    parser.add_argument("--report", action="store_true",
+                        help="输出分阶段耗时报告（打印摘要并保存为 <输出>.report.json）")
+    parser.add_argument("--profile", action="store_true",
+                        help="剖析各阶段，输出 .pstats 和火焰图折叠栈到 <输出>.profile/"
+                             "（与 --jobs N 同用时各任务的导出阶段依次执行）")
+
+    add_pipeline_arguments(parser)
+    return parser
+
+
+def plan_jobs(args):
+    """解析输入，返回任务列表 [(名称, 文件列表, 输出路径), ...]
+
+    默认输出名为 <输入名>_cut.mp4；不同输入同名（如 a/day1 与 b/day1、day1/ 与
+    day1.txt）时依次加序号 _cut_2.mp4、_cut_3.mp4。清单中指定的输出路径重复时
+    抛出 ValueError，避免并行任务写同一个文件。
+    """
+    from engine import collect_files
+
+    single_file = (len(args.inputs) == 1 and args.output
+                   and Path(args.output).suffix.lower() == ".mp4")
+    out_dir = Path(args.output) if args.output and not single_file else Path.cwd()
+
+    planned = []
+    for item in args.inputs:
+        path = Path(item)
+        files, manifest_output = collect_files(path, args.sort, args.reverse)
+        planned.append((path, files, args.output if single_file else manifest_output))
+
+    # 先占用明确指定的输出，再为其余任务分配不冲突的默认名
+    taken = {}
+    for path, _, output in planned:
+        if output:
+            key = os.path.abspath(output)
+            if key in taken:
+                raise ValueError(f"{taken[key]} 与 {path} 的输出文件相同: {output}")
+            taken[key] = path
+
+    jobs = []
+    for path, files, output in planned:
+        if not output:
+            output = str(out_dir / f"{path.stem}_cut.mp4")
+            n = 1
+            while os.path.abspath(output) in taken:
+                n += 1
+                output = str(out_dir / f"{path.stem}_cut_{n}.mp4")
+            taken[os.path.abspath(output)] = path
+        jobs.append((path.name, files, output))
+    return jobs
+
+
+def main(argv=None):
+    multiprocessing.freeze_support()
+    args = build_parser().parse_args(argv)
+
+    from engine import run_job
+    from profiling import profile_dir_for
+    from run_report import RunReport
+
+    try:
+        jobs = plan_jobs(args)
+    except (OSError, ValueError) as e:
+        print(f"读取输入失败: {e}", file=sys.stderr)
+        return 2
+
+    options = options_from_args(args)
+    jobs_count = max(1, min(args.jobs, len(jobs)))
+    export_threads = max(1, (os.cpu_count() or 4) // jobs_count)
+
+    def run(job):
+        name, files, output = job
+        if not files:
+            print(f"[{name}] 未找到视频文件")
+            return False
+
+        def progress(current, total, message):
+            print(f"[{name}] {current}/{total} {message}", flush=True)
+
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        report = RunReport() if args.report else None
+        try:
+            result = run_job(files, output, options, args.codec, args.preset, args.export_mode,
+                             threads=export_threads, executor=executor, on_progress=progress,
+                             report=report, profile_dir=profile_dir_for(output, args.profile))
+        except Exception as e:
+            print(f"[{name}] 失败: {e}", file=sys.stderr, flush=True)
+            return False
+        if report is not None:
+            path = report.save(Path(output).with_suffix(".report.json"))
+            print(f"[{name}] {report.summary()}\n[{name}] 报告: {path}", flush=True)
+        if result is None:
+            print(f"[{name}] 没有有效片段", flush=True)
+            return False
+        print(f"[{name}] 完成: {result}", flush=True)
+        return True
+
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        with ThreadPoolExecutor(max_workers=jobs_count) as pool:
+            results = list(pool.map(run, jobs))
+
+    failed = results.count(False)
+    print(f"\n{len(jobs) - failed}/{len(jobs)} 个任务完成")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
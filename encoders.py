@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""编码器能力注册表 - 探测可用的视频编码器并缓存到磁盘
+
+列出 `ffmpeg -encoders`，对其中的候选 H.264 编码器各做一次极短的测试编码
+（硬件编码器即使编译进 ffmpeg，没有对应显卡或驱动时也无法使用）。
+结果按 ffmpeg 可执行文件（路径 + `-version` 输出）缓存，换用或升级 ffmpeg
+后自动重新探测。GUI 启动时在后台线程探测，选择「自动检测」时不阻塞界面。
+"""
+import hashlib
+import json
+import os
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+from analysis_cache import default_cache_root
+from ffmpeg_tools import popen_params
+
+# 注册表格式、候选列表或测试参数变更时递增，使旧缓存自动失效
+REGISTRY_VERSION = 2
+
+# 「自动检测」的候选编码器，按优先级排列（CPU 编码器 libx264 作为保底）
+CANDIDATES = ("h264_nvenc", "h264_qsv", "h264_amf", "h264_videotoolbox", "libx264")
+
+# 自动检测的默认结果
+FALLBACK_ENCODER = "libx264"
+
+# 单个编码器测试编码的超时（秒）
+TEST_TIMEOUT = 10
+
+# 界面提供的编码速度（x264 preset 名称），测试编码时逐一验证转换后的参数
+PRESETS = ("ultrafast", "superfast", "veryfast", "faster", "fast", "medium")
+
+# 硬件编码器：x264 preset → 该编码器的速度参数（选项名, {preset: 值}, 默认值）；
+# 选项名为 None 表示没有对应的速度参数（VideoToolbox）
+HARDWARE_SPEED_OPTIONS = {
+    "nvenc": ("-preset", {"ultrafast": "p1", "superfast": "p2", "veryfast": "p3",
+                          "faster": "p4", "fast": "p5", "medium": "p6",
+                          "slow": "p7", "slower": "p7", "veryslow": "p7"}, "p1"),
+    "qsv": ("-preset", {"ultrafast": "veryfast", "superfast": "veryfast", "veryfast": "veryfast",
+                        "faster": "faster", "fast": "fast", "medium": "medium",
+                        "slow": "slow", "slower": "slower", "veryslow": "veryslow"}, "veryfast"),
+    "amf": ("-quality", {"ultrafast": "speed", "superfast": "speed", "veryfast": "speed",
+                         "faster": "speed", "fast": "balanced", "medium": "balanced",
+                         "slow": "quality", "slower": "quality", "veryslow": "quality"}, "speed"),
+    "videotoolbox": (None, {}, None),
+}
+
+
+def hardware_family(codec):
+    """硬件编码器所属的类别（nvenc / qsv / amf / videotoolbox），软件编码器返回 None"""
+    suffix = str(codec).rpartition("_")[2]
+    return suffix if "_" in str(codec) and suffix in HARDWARE_SPEED_OPTIONS else None
+
+
+def is_hardware_encoder(codec):
+    """是否为硬件编码器（失败时应回退到 libx264）"""
+    return hardware_family(codec) is not None
+
+
+def encoder_options(codec, preset):
+    """把 x264 风格的 preset 转换为该编码器的 ffmpeg 速度参数
+
+    Returns:
+        参数列表，如 ["-preset", "p1"]、["-quality", "speed"]；没有对应参数时为空列表
+    """
+    family = hardware_family(codec)
+    if family is None:
+        return ["-preset", preset]
+    option, values, default = HARDWARE_SPEED_OPTIONS[family]
+    return [option, values.get(preset, default)] if option else []
+
+
+def _run(binary, args, timeout):
+    return subprocess.run([binary, "-hide_banner", "-nostdin"] + list(args), **popen_params({
+        "stdout": subprocess.PIPE,
+        "stderr": subprocess.PIPE,
+        "stdin": subprocess.DEVNULL,
+        "timeout": timeout,
+    }))
+
+
+def ffmpeg_fingerprint(binary):
+    """ffmpeg 可执行文件的身份（绝对路径 + `-version` 输出的哈希）"""
+    result = _run(binary, ["-version"], timeout=TEST_TIMEOUT)
+    version = result.stdout.decode(errors="replace")
+    if result.returncode != 0 or not version.strip():
+        raise RuntimeError(f"无法执行 {binary} -version")
+    path = os.path.realpath(binary) if os.path.sep in binary else binary
+    digest = hashlib.sha1(f"{path}\n{version}".encode()).hexdigest()
+    return digest, version.splitlines()[0].strip()
+
+
+def list_encoders(binary):
+    """解析 `ffmpeg -encoders`，返回视频编码器名称列表"""
+    result = _run(binary, ["-encoders"], timeout=TEST_TIMEOUT)
+    names = []
+    started = False
+    for line in result.stdout.decode(errors="replace").splitlines():
+        # 表头之后每行形如 " V....D libx264   libx264 H.264 / AVC ..."
+        if line.strip().startswith("------"):
+            started = True
+            continue
+        parts = line.split()
+        if started and len(parts) >= 2 and parts[0].startswith("V"):
+            names.append(parts[1])
+    return names
+
+
+def test_encoder(binary, name, presets=PRESETS):
+    """用该编码器编码几帧测试画面，导出时会用到的每组速度参数都成功才返回 True"""
+    option_sets = {tuple(encoder_options(name, preset)) for preset in presets}
+    for options in sorted(option_sets):
+        try:
+            result = _run(binary, [
+                "-loglevel", "error",
+                "-f", "lavfi", "-i", "color=c=black:s=256x256:r=25:d=0.2",
+                "-c:v", name, *options, "-pix_fmt", "yuv420p", "-f", "null", "-",
+            ], timeout=TEST_TIMEOUT)
+        except (OSError, subprocess.SubprocessError):
+            return False
+        if result.returncode != 0:
+            return False
+    return True
+
+
+def probe_encoders(binary, candidates=CANDIDATES, version=None):
+    """探测 ffmpeg 的编码器能力
+
+    Args:
+        binary: ffmpeg 可执行文件
+        candidates: 需要测试编码的候选编码器
+        version: 已知的版本行，None 时执行 `-version` 获取
+
+    Returns:
+        {'version', 'listed': 所有视频编码器, 'working': 测试通过的候选（按优先级）,
+         'probed_at'}
+    """
+    if version is None:
+        _, version = ffmpeg_fingerprint(binary)
+    listed = list_encoders(binary)
+    working = [name for name in candidates if name in listed and test_encoder(binary, name)]
+    return {"version": version, "listed": listed, "working": working,
+            "probed_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+class EncoderRegistry:
+    """编码器能力注册表（磁盘缓存 + 后台探测）"""
+
+    def __init__(self, path=None, binary=None):
+        """
+        Args:
+            path: 缓存文件，默认 <缓存目录>/encoders.json
+            binary: ffmpeg 可执行文件，默认 ffmpeg_tools.ffmpeg_binary()
+        """
+        self.path = Path(path) if path else default_cache_root() / "encoders.json"
+        self._binary = binary
+        self._lock = threading.Lock()
+        self._thread = None
+        self._info = None
+
+    @property
+    def binary(self):
+        if self._binary is None:
+            from ffmpeg_tools import ffmpeg_binary
+            self._binary = ffmpeg_binary()
+        return self._binary
+
+    def _read(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return data.get("entries", {}) if data.get("version") == REGISTRY_VERSION else {}
+
+    def _write(self, entries):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"version": REGISTRY_VERSION, "entries": entries},
+                                      indent=2), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"写入编码器缓存失败: {e}")
+
+    def probe(self, refresh=False):
+        """读取缓存或立即探测（阻塞）
+
+        Args:
+            refresh: 忽略缓存重新探测（如更换显卡驱动后）
+
+        Returns:
+            探测结果（见 probe_encoders）；ffmpeg 无法执行时 working 为空
+        """
+        with self._lock:
+            if self._info is not None and not refresh:
+                return self._info
+            try:
+                key, version = ffmpeg_fingerprint(self.binary)
+            except (OSError, RuntimeError, subprocess.SubprocessError) as e:
+                print(f"探测编码器失败: {e}")
+                self._info = {"version": None, "listed": [], "working": []}
+                return self._info
+
+            entries = self._read()
+            if refresh or key not in entries:
+                entries[key] = probe_encoders(self.binary, version=version)
+                self._write(entries)
+            self._info = entries[key]
+            return self._info
+
+    def start(self):
+        """在后台线程中探测（已在运行或已有结果时不重复启动）"""
+        with self._lock:
+            if self._info is not None or (self._thread and self._thread.is_alive()):
+                return
+            self._thread = threading.Thread(target=self.probe, daemon=True)
+            self._thread.start()
+
+    def working(self):
+        """可用的候选编码器（按优先级）"""
+        return list(self.probe()["working"])
+
+    def best(self):
+        """「自动检测」选择的编码器：第一个可用的候选，没有则为 libx264"""
+        working = self.working()
+        return working[0] if working else FALLBACK_ENCODER
+
+    def resolve(self, codec):
+        """把 'auto' 解析为具体编码器，其他值原样返回"""
+        return self.best() if codec == "auto" else codec
+
+
+_default_registry = None
+
+
+def default_registry():
+    """进程内共享的编码器注册表"""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = EncoderRegistry()
+    return _default_registry
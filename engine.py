@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""处理引擎 - 不依赖 Qt 的完整检测 + 导出流程
+
+GUI（ProcessThread）和命令行（cli.py）共用这里的流程：
+多进程分析每个文件（见 kooix_cut.analyze_video），按顺序拼接时间线，再导出。
+
+kooix_cut（MoviePy、numpy）在开始分析时才导入，GUI 导入本模块不会加载它们；
+GUI 首次绘制后可在后台线程调用 preload() 提前导入。
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from encoders import default_registry
+from export import export_timeline
+from profiling import profiled
+from run_report import StageRecorder, file_size, recording, stage
+from video_sort import sort_files
+
+# 支持的视频扩展名（与 GUI 添加文件时一致）
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+
+# 清单文件扩展名
+MANIFEST_EXTENSIONS = ('.txt', '.lst', '.json')
+
+# 处理时才需要的重量级模块（cv2 只在启用人脸检测时由检测器导入）
+PRELOAD_MODULES = ('numpy', 'moviepy', 'kooix_cut', 'ai_detect', 'audio_analysis',
+                   'video_analysis', 'volume_pyramid')
+
+
+def preload(modules=PRELOAD_MODULES):
+    """导入处理流程需要的重量级模块，使首次处理和预览无需等待导入
+
+    在后台线程调用；导入失败（如可选依赖缺失）时忽略，实际使用时再报告。
+    """
+    import importlib
+
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f"预加载 {name} 失败: {e}")
+
+
+def analysis_options(threshold=0.01, min_duration=3.0, window_size=0.3, smoothing=3,
+                     padding=0.5, enable_vad=False, enable_static=False, static_threshold=0.02,
+                     static_duration=5.0, enable_scene=False, enable_face=False, use_cache=True,
+                     pcm_sidecar=False):
+    """分析参数（即 analyze_video 的关键字参数），可直接传给工作进程"""
+    return dict(
+        threshold=threshold, min_duration=min_duration,
+        window_size=window_size, smoothing=int(smoothing), padding=padding,
+        enable_vad=enable_vad, enable_static=enable_static,
+        static_threshold=static_threshold, static_duration=static_duration,
+        enable_scene=enable_scene, enable_face=enable_face, use_cache=use_cache,
+        pcm_sidecar=pcm_sidecar,
+    )
+
+
+def collect_files(path, sort_method='name_natural', reverse=False):
+    """读取一个输入：目录（其中的视频文件，按 sort_method 排序）或清单文件
+
+    清单文件：
+        .txt / .lst  每行一个视频路径，# 开头为注释
+        .json        路径列表，或 {"files": [...], "output": "..."}
+    清单中的相对路径相对于清单所在目录，顺序保持不变。
+
+    Returns:
+        (files, output)：文件路径列表与清单指定的输出（未指定为 None）
+    """
+    path = Path(path)
+    if path.is_dir():
+        files = [str(f) for f in path.iterdir()
+                 if f.is_file() and f.suffix.lower() in VIDEO_EXTENSIONS]
+        return sort_files(files, method=sort_method, reverse=reverse), None
+
+    output = None
+    text = path.read_text(encoding='utf-8')
+    if path.suffix.lower() == '.json':
+        data = json.loads(text)
+        if isinstance(data, dict):
+            output = data.get('output')
+            data = data.get('files', [])
+        entries = [str(entry) for entry in data]
+    else:
+        entries = [line.strip() for line in text.splitlines()]
+        entries = [line for line in entries if line and not line.startswith('#')]
+
+    base = path.parent
+    files = [str(base / entry) if not Path(entry).is_absolute() else entry for entry in entries]
+    if output and not Path(output).is_absolute():
+        output = str(base / output)
+    return files, output
+
+
+def analyze_timed(video_file, options, profile_dir=None, profile_name=None):
+    """analyze_video 并记录分阶段计时（在工作进程中运行）
+
+    Args:
+        video_file: 视频文件路径
+        options: 分析参数（见 analysis_options）
+        profile_dir: 剖析输出目录，None 时不剖析（见 profiling.profiled）
+        profile_name: 剖析文件名
+
+    Returns:
+        (片段列表, StageRecorder.to_dict())
+    """
+    from kooix_cut import analyze_video
+
+    recorder = StageRecorder()
+    with profiled(profile_dir, profile_name or f"analyze-{Path(video_file).stem}"):
+        with recording(recorder):
+            with stage("analyze"):
+                segments = analyze_video(video_file, **options)
+    return segments, recorder.to_dict()
+
+
+def analyze_files(files, options, executor=None, workers=None, on_progress=None,
+                  report=None, profile_dir=None):
+    """多进程分析一组文件
+
+    Args:
+        files: 视频文件路径列表
+        options: 分析参数（见 analysis_options）
+        executor: 共享的 ProcessPoolExecutor，None 时临时创建
+        workers: 临时进程池大小，默认 CPU 核数（不超过文件数）
+        on_progress: 回调 (已完成数, 总数, 文件名)
+        report: RunReport，记录每个文件的分阶段计时
+        profile_dir: 剖析输出目录，每个文件输出 analyze-<序号>-<文件名>.pstats/.collapsed
+
+    Returns:
+        与 files 顺序一致的片段列表
+    """
+    total = len(files)
+    results = [None] * total
+    if not total:
+        return results
+
+    own = executor is None
+    if own:
+        executor = ProcessPoolExecutor(max_workers=workers or min(os.cpu_count() or 1, total))
+    try:
+        if on_progress:
+            on_progress(0, total, Path(files[0]).name)
+        futures = {executor.submit(analyze_timed, f, options, profile_dir,
+                                   f"analyze-{i + 1:03d}-{Path(f).stem}"): i
+                   for i, f in enumerate(files)}
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            results[i], timings = future.result()
+            if report is not None:
+                report.add_file(files[i], timings)
+            if on_progress:
+                on_progress(done, total, Path(files[i]).name)
+    finally:
+        if own:
+            executor.shutdown()
+    return results
+
+
+def build_timeline(files, results):
+    """按文件顺序拼接时间线 [(source, start, end), ...]"""
+    return [(str(video_file), start, end)
+            for video_file, segments in zip(files, results) for start, end in segments]
+
+
+def run_job(files, output, options=None, codec="libx264", preset="medium",
+            export_mode='reencode', threads=None, executor=None, workers=None,
+            on_progress=None, report=None, profile_dir=None):
+    """完整处理一组文件：分析 → 拼接 → 导出
+
+    Args:
+        files: 视频文件路径列表（已排序）
+        output: 输出文件路径
+        options: 分析参数（见 analysis_options），默认全部使用默认值
+        codec: 视频编码器；'auto' 使用编码器注册表检测到的最佳编码器
+        preset: 编码预设
+        export_mode: 导出模式，见 export.EXPORT_MODES
+        threads: 导出线程数，默认 CPU 核数
+        executor: 共享的 ProcessPoolExecutor（多个任务共用）
+        workers: 未提供 executor 时的分析进程数
+        on_progress: 回调 (当前, 总数, 消息)；导出阶段当前 = 总数
+        report: RunReport，记录分析和导出的分阶段计时（调用方负责保存）
+        profile_dir: 剖析输出目录（见 profiling.profile_dir_for），None 时不剖析
+
+    Returns:
+        输出文件路径；没有有效片段时返回 None
+    """
+    options = options or analysis_options()
+    results = analyze_files(files, options, executor, workers, on_progress, report, profile_dir)
+    timeline = build_timeline(files, results)
+    if report is not None:
+        report.info.update(files=len(files), segments=len(timeline), codec=codec,
+                           preset=preset, export_mode=export_mode, options=options)
+    if not timeline:
+        if report is not None:
+            report.finish()
+        return None
+
+    codec = default_registry().resolve(codec)
+    total = len(files)
+    status = (lambda message: on_progress(total, total, message)) if on_progress else None
+    if status:
+        status("合并中...")
+    # 导出按片段描述重新读取源文件
+    recorder = report.run if report is not None else StageRecorder()
+    recorder.media_seconds = sum(end - start for _, start, end in timeline)
+    with profiled(profile_dir, "export"), recording(recorder), stage("export") as st:
+        export_timeline(timeline, output, export_mode, codec, preset,
+                        threads=threads or os.cpu_count() or 4, on_status=status)
+        st.bytes_read = sum(file_size(path) for path in dict.fromkeys(files))
+        st.bytes_written = file_size(output)
+    if report is not None:
+        report.finish()
+    return output
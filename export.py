@@ -0,0 +1,732 @@
+#!/usr/bin/env python3
+"""导出引擎 - ffmpeg 滤镜图重编码 / 智能流复制（smart render）/ 增量导出 / 分块并行编码 / MoviePy 合成"""
+import bisect
+import itertools
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from analysis_cache import AnalysisCache, default_cache_root
+from encoders import encoder_options, is_hardware_encoder
+from ffmpeg_tools import ffprobe_binary, ffprobe_json, probe_streams, run_ffmpeg
+from timeline import READER_POOL_SIZE, timeline_clip
+
+# 导出模式注册表
+EXPORT_MODES = {
+    'reencode': {
+        'name_zh': '完全重编码',
+        'name_en': 'Full Re-encode',
+    },
+    'smart': {
+        'name_zh': '智能流复制（仅重编码剪切点）',
+        'name_en': 'Smart Copy (re-encode cut points only)',
+    },
+    'incremental': {
+        'name_zh': '增量导出（复用已编码片段）',
+        'name_en': 'Incremental (reuse encoded segments)',
+    },
+    'parallel': {
+        'name_zh': '分块并行编码（多核）',
+        'name_en': 'Parallel Chunked Encoding (many-core)',
+    },
+    'moviepy': {
+        'name_zh': 'MoviePy 合成（兼容模式）',
+        'name_en': 'MoviePy Compositing (compatibility)',
+    },
+}
+
+# 智能流复制：源编码 -> 剪切点重编码使用的编码器
+SMART_ENCODERS = {
+    'h264': 'libx264',
+    'hevc': 'libx265',
+}
+
+# 分块并行编码：每块编码进程的线程数（x264 超过此数后加速有限）
+PARALLEL_CHUNK_THREADS = 8
+
+# 小于此时长（秒）的边缘片段直接丢弃（不足一帧）
+MIN_PIECE = 0.02
+
+# 增量导出的片段缓存上限（超出后按最近最少使用淘汰）
+SEGMENT_CACHE_MAX_BYTES = 8 * 1024 * 1024 * 1024
+
+
+def _write_videofile(final, output, codec, preset, threads, on_status=None):
+    """写出 MoviePy 片段，硬件编码器失败时回退到 libx264"""
+    threads = threads or os.cpu_count() or 4
+
+    # MoviePy 总是输出 -preset <preset>；硬件编码器的速度参数放在 ffmpeg_params 中，
+    # 位于其后，同名的 -preset 以后者为准
+    hardware = is_hardware_encoder(codec)
+    try:
+        final.write_videofile(
+            output,
+            codec=codec,
+            audio_codec="aac",
+            preset=preset,
+            ffmpeg_params=encoder_options(codec, preset) if hardware else None,
+            threads=threads,
+            logger=None
+        )
+    except Exception as e:
+        if not hardware:
+            raise
+        # GPU 编码失败，回退到 CPU
+        print(f"{codec} 编码失败，使用 libx264: {e}")
+        if on_status:
+            on_status("GPU不可用，使用CPU编码...")
+        final.write_videofile(
+            output,
+            codec="libx264",
+            audio_codec="aac",
+            preset=preset,
+            threads=threads,
+            logger=None
+        )
+
+
+def export_moviepy(clips, output, codec="libx264", preset="ultrafast", threads=None,
+                   on_status=None):
+    """使用 MoviePy 合并并完全重编码
+
+    Args:
+        clips: 子片段列表
+        output: 输出文件路径
+        codec: 视频编码器
+        preset: 编码速度
+        threads: 编码线程数
+        on_status: 状态回调 on_status(message)
+    """
+    from moviepy import concatenate_videoclips
+
+    final = concatenate_videoclips(clips)
+    try:
+        _write_videofile(final, output, codec, preset, threads, on_status)
+    finally:
+        final.close()
+
+
+def export_moviepy_timeline(segments, output, codec="libx264", preset="ultrafast", threads=None,
+                            on_status=None, max_readers=READER_POOL_SIZE):
+    """使用 MoviePy 按片段描述合成并完全重编码
+
+    与 export_moviepy 不同，不预先打开所有源文件：读取器通过有上限的池按需打开，
+    导出越过某个源的最后一个片段后即关闭（见 timeline.timeline_clip）。
+
+    Args:
+        segments: 片段描述 [(path, start, end), ...]
+        output: 输出文件路径
+        codec: 视频编码器
+        preset: 编码速度
+        threads: 编码线程数
+        on_status: 状态回调 on_status(message)
+        max_readers: 同时打开的源文件读取器上限
+    """
+    final, close = timeline_clip(segments, max_readers)
+    try:
+        _write_videofile(final, output, codec, preset, threads, on_status)
+    finally:
+        close()
+
+
+def probe_video_stream(path):
+    """探测视频流参数（编码、分辨率、像素格式等）"""
+    streams = probe_streams(path).get("streams") or []
+    return next((s for s in streams if s.get("codec_type") == "video"), None)
+
+
+def probe_has_audio(path):
+    """探测文件是否包含音频流"""
+    streams = probe_streams(path).get("streams") or []
+    return any(s.get("codec_type") == "audio" for s in streams)
+
+
+def probe_keyframes(path):
+    """探测视频关键帧时间点（只读取包信息，不解码）"""
+    if not ffprobe_binary():
+        return _framecrc_keyframes(path)
+    info = ffprobe_json(path, [
+        "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags:stream=start_time",
+    ], timeout=600)
+    # 片段时间从 0 开始计，关键帧时间需减去流的起始时间
+    streams = info.get("streams") or [{}]
+    try:
+        offset = float(streams[0].get("start_time", 0))
+    except ValueError:
+        offset = 0.0
+    times = []
+    for packet in info.get("packets") or []:
+        if "K" in packet.get("flags", "") and packet.get("pts_time") not in (None, "N/A"):
+            times.append(float(packet["pts_time"]) - offset)
+    return sorted(times)
+
+
+def _framecrc_keyframes(path):
+    """未安装 ffprobe 时用 ffmpeg 流复制到 framecrc 读取包信息（不解码）
+
+    framecrc 每行一个包：流, dts, pts, 时长, 大小, 校验和[, F=标志]，
+    关键帧省略 F= 或标志含 0x1。时间基见 "#tb 0: num/den" 行。
+    """
+    out = run_ffmpeg(["-i", path, "-map", "0:v:0", "-c", "copy", "-f", "framecrc", "-"],
+                     timeout=600).decode("utf-8", errors="replace")
+    tb = 1.0
+    pts = []
+    for line in out.splitlines():
+        if line.startswith("#tb 0:"):
+            num, _, den = line.split(":", 1)[1].strip().partition("/")
+            tb = float(num) / float(den or 1)
+            continue
+        fields = [f.strip() for f in line.split(",")]
+        if line.startswith("#") or len(fields) < 6 or not fields[2].lstrip("-").isdigit():
+            continue
+        flags = fields[6][2:] if len(fields) > 6 and fields[6].startswith("F=") else "0x1"
+        pts.append((int(fields[2]), int(flags, 16) & 1))
+    if not pts:
+        return []
+    # 与 ffprobe 分支一致：减去流的起始时间
+    offset = min(p for p, _ in pts)
+    return sorted((p - offset) * tb for p, key in pts if key)
+
+
+def plan_smart_pieces(start, end, keyframes):
+    """把一个保留片段拆分为 [(start, end, copy), ...]
+
+    片段内部完整的 GOP 直接流复制，首尾不完整的 GOP 重编码：
+        [start, 首个关键帧) 重编码
+        [首个关键帧, 最后关键帧) 流复制
+        [最后关键帧, end) 重编码
+    """
+    inner = [k for k in keyframes if start <= k <= end]
+    if len(inner) < 2:
+        return [(start, end, False)]
+
+    k0, k1 = inner[0], inner[-1]
+    pieces = []
+    if k0 - start >= MIN_PIECE:
+        pieces.append((start, k0, False))
+    pieces.append((k0, k1, True))
+    if end - k1 >= MIN_PIECE:
+        pieces.append((k1, end, False))
+    return pieces
+
+
+def _render_piece(path, start, end, copy, stream, preset, threads, out):
+    """输出单个片段（MPEG-TS，参数集随流内嵌，便于无损拼接）"""
+    args = ["-y", "-ss", "%.6f" % start, "-i", path, "-t", "%.6f" % (end - start),
+            "-map", "0:v:0", "-map", "0:a:0?"]
+    if copy:
+        args += ["-c:v", "copy"]
+    else:
+        args += ["-c:v", SMART_ENCODERS[stream["codec_name"]],
+                 "-preset", preset, "-crf", "18",
+                 "-pix_fmt", stream.get("pix_fmt") or "yuv420p",
+                 "-threads", str(threads)]
+        profile = (stream.get("profile") or "").lower()
+        if stream["codec_name"] == "h264" and profile in ("baseline", "main", "high"):
+            args += ["-profile:v", profile]
+    args += ["-c:a", "aac", "-ar", "48000", "-ac", "2",
+             "-avoid_negative_ts", "make_zero", "-f", "mpegts", out]
+    run_ffmpeg(args)
+
+
+def concat_files(files, output, workdir, audio_file=None):
+    """用 concat 分离器无损拼接（流复制）
+
+    Args:
+        files: 按顺序拼接的文件
+        output: 输出文件路径
+        workdir: 临时目录（写入 concat 列表）
+        audio_file: 单独编码的整条音轨；指定时替代各文件自带的音频
+    """
+    list_file = os.path.join(workdir, "concat.txt")
+    with open(list_file, "w", encoding="utf-8") as f:
+        for path in files:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    args = ["-y", "-f", "concat", "-safe", "0", "-i", list_file]
+    if audio_file:
+        args += ["-i", audio_file, "-map", "0:v:0", "-map", "1:a:0"]
+    else:
+        args += ["-map", "0:v:0", "-map", "0:a:0?", "-bsf:a", "aac_adtstoasc"]
+    run_ffmpeg(args + ["-c", "copy", "-movflags", "+faststart", output])
+
+
+def export_smart(segments, output, preset="ultrafast", threads=None, workers=None,
+                 progress=None):
+    """智能流复制导出
+
+    每个保留片段内部的完整 GOP 直接流复制，只有剪切点附近不完整的
+    GOP 重编码，最后用 concat 分离器无损拼接。音频统一重编码为 AAC
+    （体积小，开销可忽略），保证拼接处无缝。
+
+    Args:
+        segments: 片段描述 [(path, start, end), ...]
+        output: 输出文件路径
+        preset: 剪切点重编码的编码速度
+        threads: 每个编码进程的线程数
+        workers: 并行生成片段的进程数
+        progress: 进度回调 progress(done, total)
+
+    Returns:
+        是否成功；源编码不支持或各源参数不一致时返回 False（调用方应回退到完全重编码）
+    """
+    if not segments:
+        return False
+
+    # 所有源必须编码参数一致，才能无损拼接
+    streams = {}
+    try:
+        for path, _, _ in segments:
+            if path not in streams:
+                stream = probe_video_stream(path)
+                if not stream or stream.get("codec_name") not in SMART_ENCODERS:
+                    return False
+                streams[path] = stream
+        keyframes = {path: probe_keyframes(path) for path in streams}
+    except (OSError, RuntimeError, subprocess.SubprocessError) as e:
+        print(f"探测关键帧失败: {e}")
+        return False
+
+    signature = {(s["codec_name"], s["width"], s["height"], s.get("pix_fmt"), s.get("r_frame_rate"))
+                 for s in streams.values()}
+    if len(signature) != 1:
+        return False
+
+    pieces = []
+    for path, start, end in segments:
+        for p_start, p_end, copy in plan_smart_pieces(start, end, keyframes[path]):
+            pieces.append((path, p_start, p_end, copy))
+
+    cpu = os.cpu_count() or 4
+    workers = workers or min(4, cpu)
+    threads = threads or max(1, cpu // workers)
+    workdir = tempfile.mkdtemp(prefix="kooix-smart-")
+    try:
+        outs = [os.path.join(workdir, f"piece-{i:05d}.ts") for i in range(len(pieces))]
+        done = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_render_piece, path, p_start, p_end, copy,
+                                streams[path], preset, threads, out)
+                for (path, p_start, p_end, copy), out in zip(pieces, outs)
+            ]
+            for future in futures:
+                future.result()
+                done += 1
+                if progress:
+                    progress(done, len(pieces))
+
+        concat_files(outs, output, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return True
+
+
+class SegmentCache(AnalysisCache):
+    """已编码片段的磁盘缓存（MPEG-TS 文件，LRU 淘汰）
+
+    键由源文件身份（路径、大小、修改时间）、剪切区间和编码参数组成，
+    与分析缓存共用淘汰和清理逻辑，按文件路径读写（lookup / temp_path / store）。
+    """
+
+    suffix = ".ts"
+
+    def __init__(self, root=None, max_bytes=SEGMENT_CACHE_MAX_BYTES):
+        super().__init__(root or default_cache_root() / "segments", max_bytes)
+
+
+_segment_cache = None
+
+
+def default_segment_cache():
+    """进程内共享的片段缓存实例"""
+    global _segment_cache
+    if _segment_cache is None:
+        _segment_cache = SegmentCache()
+    return _segment_cache
+
+
+def _parse_rate(rate):
+    """解析 ffprobe 的帧率（如 "30000/1001"），无效时返回 None"""
+    try:
+        num, _, den = (rate or "").partition("/")
+        value = float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return None
+    return rate if value > 0 else None
+
+
+def _encode_segment(path, start, end, target, has_audio, codec, preset, threads, out):
+    """把一个片段编码为统一参数的 MPEG-TS（分辨率、帧率、像素格式、音频格式一致）"""
+    w, h, rate = target
+    duration = end - start
+    args = ["-y", "-ss", "%.6f" % start, "-t", "%.6f" % duration, "-i", path]
+    if not has_audio:
+        args += ["-f", "lavfi", "-t", "%.6f" % duration, "-i", "anullsrc=r=48000:cl=stereo"]
+    video = (f"scale={w}:{h}:force_original_aspect_ratio=decrease,"
+             f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,setsar=1")
+    if rate:
+        video += f",fps={rate}"
+    args += ["-map", "0:v:0", "-map", "0:a:0" if has_audio else "1:a:0",
+             "-vf", video,
+             "-c:v", codec, *encoder_options(codec, preset),
+             "-pix_fmt", "yuv420p", "-threads", str(threads),
+             "-af", "aresample=48000,aformat=channel_layouts=stereo",
+             "-c:a", "aac", "-ar", "48000", "-ac", "2",
+             "-avoid_negative_ts", "make_zero", "-f", "mpegts", out]
+    run_ffmpeg(args)
+
+
+def export_incremental(segments, output, codec="libx264", preset="ultrafast", threads=None,
+                       workers=None, cache=None, progress=None):
+    """增量导出：每个保留片段单独编码并缓存，最后无损拼接
+
+    片段按源文件身份 + 剪切区间 + 编码参数缓存。删除一个文件或调整
+    某个文件的阈值后重新导出，只需编码发生变化的片段。
+
+    Args:
+        segments: 片段描述 [(path, start, end), ...]
+        output: 输出文件路径
+        codec: 视频编码器
+        preset: 编码速度
+        threads: 编码线程总数（平均分给各编码进程）
+        workers: 并行编码的进程数
+        cache: SegmentCache 实例，默认 default_segment_cache()
+        progress: 进度回调 progress(done, total, reused)
+
+    Returns:
+        复用的片段数
+    """
+    cache = cache or default_segment_cache()
+    inputs = list(dict.fromkeys(path for path, _, _ in segments))
+
+    # 统一输出参数：第一个源的分辨率和帧率
+    streams = {path: probe_video_stream(path) for path in inputs}
+    audio = {path: probe_has_audio(path) for path in inputs}
+    first = streams[inputs[0]] or {}
+    if not first.get("width"):
+        raise RuntimeError(f"无法读取视频流: {inputs[0]}")
+    target = (first["width"], first["height"], _parse_rate(first.get("r_frame_rate")))
+
+    cpu = os.cpu_count() or 4
+    workers = workers or min(4, cpu)
+    threads = max(1, (threads or cpu) // workers)
+
+    def render(path, start, end, codec):
+        key = cache.key(path, "segment", [round(start, 6), round(end, 6), list(target),
+                                          codec, preset])
+        cached = cache.lookup(key)
+        if cached:
+            return cached, True
+        tmp = cache.temp_path(key)
+        try:
+            _encode_segment(path, start, end, target, audio[path], codec, preset, threads, tmp)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return cache.store(tmp, key), False
+
+    def render_with_fallback(path, start, end):
+        try:
+            return render(path, start, end, codec)
+        except RuntimeError:
+            if not is_hardware_encoder(codec):
+                raise
+            # GPU 编码失败，回退到 CPU
+            return render(path, start, end, "libx264")
+
+    files = []
+    reused = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(render_with_fallback, path, start, end)
+                   for path, start, end in segments]
+        for done, future in enumerate(futures, 1):
+            f, hit = future.result()
+            files.append(f)
+            reused += hit
+            if progress:
+                progress(done, len(segments), reused)
+
+    workdir = tempfile.mkdtemp(prefix="kooix-incremental-")
+    try:
+        concat_files(files, output, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return reused
+
+
+def build_concat_filtergraph(segments, inputs, size=None, audio=None, streams="va"):
+    """生成 trim/atrim + concat 滤镜图
+
+    每个源文件只作为一个输入解码一次，用 split/asplit 分给它的各个片段，
+    trim/atrim 截取后按时间线顺序 concat。
+
+    Args:
+        segments: 片段描述 [(path, start, end), ...]
+        inputs: 输入文件列表（与 -i 顺序一致）
+        size: 统一输出分辨率 (w, h)；None 表示各源分辨率一致无需缩放
+        audio: {path: 是否有音频}；无音频的源用静音补齐
+        streams: 输出的流，"va"、只有视频 "v" 或只有音频 "a"
+
+    Returns:
+        滤镜图字符串，输出标签为 [vout] 和/或 [aout]
+    """
+    with_video, with_audio = "v" in streams, "a" in streams
+    index = {path: i for i, path in enumerate(inputs)}
+    counts = {}
+    for path, _, _ in segments:
+        counts[path] = counts.get(path, 0) + 1
+
+    lines = []
+    for path, n in counts.items():
+        i = index[path]
+        if with_video:
+            lines.append(f"[{i}:v:0]split={n}" + "".join(f"[v{i}_{k}]" for k in range(n)))
+        if with_audio and (audio is None or audio.get(path, True)):
+            lines.append(f"[{i}:a:0]asplit={n}" + "".join(f"[a{i}_{k}]" for k in range(n)))
+
+    used = {}
+    labels = []
+    for j, (path, start, end) in enumerate(segments):
+        i = index[path]
+        k = used.get(path, 0)
+        used[path] = k + 1
+
+        if with_video:
+            video = f"[v{i}_{k}]trim=start={start:.6f}:end={end:.6f},setpts=PTS-STARTPTS"
+            if size:
+                w, h = size
+                video += (f",scale={w}:{h}:force_original_aspect_ratio=decrease"
+                          f",pad={w}:{h}:(ow-iw)/2:(oh-ih)/2")
+            lines.append(video + f",setsar=1[v{j}]")
+            labels.append(f"[v{j}]")
+
+        if with_audio:
+            if audio is None or audio.get(path, True):
+                lines.append(f"[a{i}_{k}]atrim=start={start:.6f}:end={end:.6f},"
+                             f"asetpts=PTS-STARTPTS,aresample=48000,"
+                             f"aformat=channel_layouts=stereo[a{j}]")
+            else:
+                lines.append(f"anullsrc=r=48000:cl=stereo,atrim=duration={end - start:.6f}[a{j}]")
+            labels.append(f"[a{j}]")
+
+    outputs = ("[vout]" if with_video else "") + ("[aout]" if with_audio else "")
+    lines.append("".join(labels) + f"concat=n={len(segments)}:v={int(with_video)}"
+                 f":a={int(with_audio)}{outputs}")
+    return ";\n".join(lines)
+
+
+def export_ffmpeg(segments, output, codec="libx264", preset="ultrafast", threads=None,
+                  on_status=None, size=None, output_args=(), streams="va"):
+    """单次 ffmpeg 调用完成剪切、拼接和编码（帧不经过 Python 进程）
+
+    Args:
+        segments: 片段描述 [(path, start, end), ...]
+        output: 输出文件路径
+        codec: 视频编码器
+        preset: 编码速度
+        threads: 编码线程数
+        on_status: 状态回调 on_status(message)
+        size: 强制输出分辨率 (w, h)；None 时各源不一致才缩放到第一个源的分辨率
+        output_args: 附加的 ffmpeg 输出参数
+        streams: 输出的流，"va"、只有视频 "v" 或只有音频 "a"（见 build_concat_filtergraph）
+    """
+    inputs = list(dict.fromkeys(path for path, _, _ in segments))
+    threads = threads or os.cpu_count() or 4
+
+    # 各源分辨率不一致时统一缩放到第一个源的分辨率；探测失败则假定一致
+    audio = None
+    first = None
+    try:
+        if "v" in streams and size is None:
+            probed = [probe_video_stream(path) for path in inputs]
+            sizes = {(s["width"], s["height"]) for s in probed if s}
+            if len(sizes) > 1:
+                size = (probed[0]["width"], probed[0]["height"])
+            first = probed[0]
+        elif "v" in streams and "-r" not in output_args:
+            first = probe_video_stream(inputs[0])
+        if "a" in streams:
+            audio = {path: probe_has_audio(path) for path in inputs}
+    except (OSError, RuntimeError, subprocess.SubprocessError) as e:
+        print(f"探测源文件失败，按参数一致处理: {e}")
+
+    # concat 滤镜不保留帧率，不指定时 ffmpeg 按 25fps 输出：沿用第一个源的帧率
+    rate = _parse_rate((first or {}).get("r_frame_rate"))
+    if rate and "-r" not in output_args:
+        output_args = ["-r", rate, *output_args]
+
+    workdir = tempfile.mkdtemp(prefix="kooix-export-")
+    try:
+        graph_file = os.path.join(workdir, "graph.txt")
+        with open(graph_file, "w", encoding="utf-8") as f:
+            f.write(build_concat_filtergraph(segments, inputs, size, audio, streams))
+
+        def encode(codec):
+            args = ["-y"]
+            for path in inputs:
+                args += ["-i", path]
+            args += ["-filter_complex_script", graph_file]
+            if "v" in streams:
+                args += ["-map", "[vout]",
+                         "-c:v", codec, *encoder_options(codec, preset), "-threads", str(threads),
+                         "-pix_fmt", "yuv420p"]
+            if "a" in streams:
+                args += ["-map", "[aout]", "-c:a", "aac"]
+            args += [*output_args, "-movflags", "+faststart", output]
+            run_ffmpeg(args)
+
+        try:
+            encode(codec)
+        except RuntimeError:
+            if not is_hardware_encoder(codec):
+                raise
+            # GPU 编码失败，回退到 CPU
+            if on_status:
+                on_status("GPU不可用，使用CPU编码...")
+            encode("libx264")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def split_chunks(segments, n):
+    """按片段边界把时间线切成 n 段时长接近的连续块（块数不超过片段数）"""
+    n = max(1, min(n, len(segments)))
+    ends = list(itertools.accumulate(end - start for _, start, end in segments))
+    total = ends[-1]
+    chunks, first = [], 0
+    for k in range(1, n):
+        # 第 k 个切点：累计时长首次达到 k/n 的片段之后，且每块至少一个片段
+        cut = bisect.bisect_left(ends, total * k / n) + 1
+        cut = min(max(cut, first + 1), len(segments) - (n - k))
+        chunks.append(segments[first:cut])
+        first = cut
+    chunks.append(segments[first:])
+    return chunks
+
+
+def export_parallel(segments, output, codec="libx264", preset="ultrafast", threads=None,
+                    chunks=None, on_status=None, progress=None):
+    """分块并行编码导出
+
+    x264 单个编码器的线程数超过 8～16 后几乎不再加速。这里按片段边界把时间线
+    切成若干时长接近的连续块，每块由一个 ffmpeg 进程独立编码视频（见 export_ffmpeg），
+    最后用 concat 分离器无损拼接。各块统一分辨率和帧率，保证拼接处参数一致。
+
+    音频不分块：各块单独编码 AAC 时，每块的编码器延迟（priming）和末帧填充在
+    拼接处累积，音视频逐渐错开。整条时间线的音频由另一个 ffmpeg 进程一次编码，
+    与拼接后的视频流一起封装。
+
+    Args:
+        segments: 片段描述 [(path, start, end), ...]
+        output: 输出文件路径
+        codec: 视频编码器
+        preset: 编码速度
+        threads: 编码线程总数（平均分给各块）
+        chunks: 块数，默认 CPU 核数 / PARALLEL_CHUNK_THREADS
+        on_status: 状态回调 on_status(message)
+        progress: 进度回调 progress(done, total)
+    """
+    cpu = os.cpu_count() or 4
+    threads = threads or cpu
+    chunks = split_chunks(segments, chunks or threads // PARALLEL_CHUNK_THREADS)
+    if len(chunks) == 1:
+        export_ffmpeg(segments, output, codec, preset, threads, on_status=on_status)
+        return
+
+    # 统一输出参数：第一个源的分辨率和帧率
+    first = probe_video_stream(segments[0][0]) or {}
+    if not first.get("width"):
+        raise RuntimeError(f"无法读取视频流: {segments[0][0]}")
+    size = (first["width"], first["height"])
+    output_args = ["-video_track_timescale", "90000"]
+    rate = _parse_rate(first.get("r_frame_rate"))
+    if rate:
+        output_args = ["-r", rate] + output_args
+    per_chunk = max(1, threads // len(chunks))
+
+    workdir = tempfile.mkdtemp(prefix="kooix-parallel-")
+    try:
+        files = [os.path.join(workdir, f"chunk{i:04d}.mp4") for i in range(len(chunks))]
+        audio_file = os.path.join(workdir, "audio.m4a")
+        with ThreadPoolExecutor(max_workers=len(chunks) + 1) as executor:
+            audio = executor.submit(export_ffmpeg, segments, audio_file, threads=1,
+                                    output_args=["-ar", "48000", "-ac", "2"], streams="a")
+            futures = [executor.submit(export_ffmpeg, chunk, f, codec, preset, per_chunk,
+                                       on_status, size, output_args, streams="v")
+                       for chunk, f in zip(chunks, files)]
+            for done, future in enumerate(futures, 1):
+                future.result()
+                if progress:
+                    progress(done, len(chunks))
+            audio.result()
+        concat_files(files, output, workdir, audio_file)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def export_timeline(segments, output, mode="reencode", codec="libx264", preset="ultrafast",
+                    threads=None, on_status=None, max_readers=READER_POOL_SIZE):
+    """按导出模式输出时间线
+
+    smart / incremental / parallel 不适用时回退到 ffmpeg 重编码，ffmpeg 滤镜图失败时再回退到 MoviePy。
+
+    Args:
+        segments: 片段描述 [(path, start, end), ...]
+        output: 输出文件路径
+        mode: 导出模式，见 EXPORT_MODES
+        codec: 视频编码器
+        preset: 编码速度
+        threads: 编码线程数
+        on_status: 状态回调 on_status(message)
+        max_readers: MoviePy 合成时同时打开的源文件读取器上限
+    """
+    status = on_status or (lambda message: None)
+
+    if mode == "smart":
+        try:
+            if export_smart(segments, output, preset,
+                            progress=lambda done, n: status(f"智能导出 ({done}/{n})...")):
+                return
+            status("源编码不支持流复制，完全重编码...")
+        except (OSError, RuntimeError, subprocess.SubprocessError) as e:
+            print(f"智能导出失败，完全重编码: {e}")
+            status("智能导出失败，完全重编码...")
+
+    if mode == "incremental":
+        try:
+            reused = export_incremental(
+                segments, output, codec, preset, threads,
+                progress=lambda done, n, hits: status(f"增量导出 ({done}/{n}，复用 {hits})..."),
+            )
+            print(f"增量导出完成，复用 {reused}/{len(segments)} 个已编码片段")
+            return
+        except (OSError, RuntimeError, subprocess.SubprocessError) as e:
+            print(f"增量导出失败，完全重编码: {e}")
+            status("增量导出失败，完全重编码...")
+
+    if mode == "parallel":
+        try:
+            export_parallel(
+                segments, output, codec, preset, threads, on_status=status,
+                progress=lambda done, n: status(f"分块并行编码 ({done}/{n})..."),
+            )
+            return
+        except (OSError, RuntimeError, subprocess.SubprocessError) as e:
+            print(f"分块并行编码失败，单进程重编码: {e}")
+            status("分块并行编码失败，单进程重编码...")
+
+    if mode in ("reencode", "smart", "incremental", "parallel"):
+        try:
+            export_ffmpeg(segments, output, codec, preset, threads, on_status=status)
+            return
+        except (OSError, RuntimeError) as e:
+            print(f"ffmpeg 导出失败，改用 MoviePy: {e}")
+            status("改用 MoviePy 合成...")
+
+    export_moviepy_timeline(segments, output, codec, preset, threads, on_status=status,
+                            max_readers=max_readers)
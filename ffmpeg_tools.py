@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""ffmpeg 子进程工具 - 流式读取原始 PCM / 视频帧、探测、执行命令"""
+import json
+import os
+import shutil
+import subprocess
+
+
+def ffmpeg_binary():
+    """获取 ffmpeg 可执行文件路径（与 MoviePy 使用同一个）"""
+    from moviepy.config import FFMPEG_BINARY
+    return FFMPEG_BINARY
+
+
+_ffprobe = None
+
+
+def ffprobe_binary():
+    """获取 ffprobe 可执行文件路径，找不到时返回 None
+
+    优先使用环境变量 FFPROBE_BINARY，其次是与 ffmpeg 同目录的 ffprobe，
+    最后在 PATH 中查找。MoviePy 默认使用的 imageio-ffmpeg 只附带 ffmpeg
+    （文件名如 ffmpeg-linux-x86_64-v7.0.2），此时需回退到解析 ffmpeg 输出，见 probe_streams。
+    """
+    global _ffprobe
+    env = os.environ.get("FFPROBE_BINARY")
+    if env:
+        return env
+    if _ffprobe is None:
+        ffmpeg = ffmpeg_binary()
+        folder, name = os.path.split(ffmpeg)
+        ext = os.path.splitext(name)[1] if name.lower().endswith(".exe") else ""
+        candidates = [os.path.join(folder, name.replace("ffmpeg", "ffprobe", 1)),
+                      os.path.join(folder, "ffprobe" + ext)] if folder else []
+        found = next((c for c in candidates if c != ffmpeg and os.path.isfile(c)), None)
+        _ffprobe = found or shutil.which("ffprobe") or ""
+    return _ffprobe or None
+
+
+def run_ffmpeg(args, binary=None, timeout=None):
+    """执行 ffmpeg 命令，失败时抛出 RuntimeError（附带 stderr 末尾）
+
+    Args:
+        args: ffmpeg 参数（不含可执行文件）
+        binary: 可执行文件，默认 ffmpeg_binary()
+        timeout: 超时（秒）
+
+    Returns:
+        stdout 字节串
+    """
+    cmd = [binary or ffmpeg_binary(), "-hide_banner", "-nostdin", "-loglevel", "error"] + list(args)
+    result = subprocess.run(cmd, **popen_params({
+        "stdout": subprocess.PIPE,
+        "stderr": subprocess.PIPE,
+        "stdin": subprocess.DEVNULL,
+        "timeout": timeout,
+    }))
+    if result.returncode != 0:
+        tail = result.stderr.decode(errors="replace").strip()[-800:]
+        raise RuntimeError(f"ffmpeg 执行失败 ({result.returncode}): {tail}")
+    return result.stdout
+
+
+def ffprobe_json(path, args, timeout=60):
+    """执行 ffprobe 并解析 JSON 输出（未安装 ffprobe 时抛出 RuntimeError）"""
+    binary = ffprobe_binary()
+    if not binary:
+        raise RuntimeError("未找到 ffprobe")
+    cmd = [binary, "-v", "error", "-of", "json"] + list(args) + [path]
+    result = subprocess.run(cmd, **popen_params({
+        "stdout": subprocess.PIPE,
+        "stderr": subprocess.PIPE,
+        "stdin": subprocess.DEVNULL,
+        "timeout": timeout,
+    }))
+    if result.returncode != 0:
+        tail = result.stderr.decode(errors="replace").strip()[-400:]
+        raise RuntimeError(f"ffprobe 执行失败: {tail}")
+    return json.loads(result.stdout or b"{}")
+
+
+def probe_streams(path, timeout=60):
+    """读取容器和各流的头信息（ffprobe JSON 格式）
+
+    有 ffprobe 时直接调用；否则解析 ``ffmpeg -i`` 的输出（见 parse_ffmpeg_info），
+    只提供 format 的 duration、creation_time 和各流的常用字段。
+
+    Returns:
+        {'format': {...}, 'streams': [{...}, ...]}
+    """
+    if ffprobe_binary():
+        return ffprobe_json(path, [
+            "-show_entries",
+            "format=duration:format_tags=creation_time:"
+            "stream=codec_type,codec_name,profile,width,height,pix_fmt,"
+            "avg_frame_rate,r_frame_rate,sample_rate,channels,duration",
+        ], timeout)
+
+    cmd = [ffmpeg_binary(), "-hide_banner", "-nostdin", "-i", path]
+    result = subprocess.run(cmd, **popen_params({
+        "stdout": subprocess.DEVNULL,
+        "stderr": subprocess.PIPE,
+        "stdin": subprocess.DEVNULL,
+        "timeout": timeout,
+    }))
+    # 没有指定输出，ffmpeg 总是以非零退出码结束，只看是否读到输入信息
+    text = result.stderr.decode("utf-8", errors="replace")
+    if "Input #0" not in text:
+        raise RuntimeError(f"ffmpeg 无法读取文件: {text.strip()[-400:]}")
+    return parse_ffmpeg_info(text)
+
+
+# ffmpeg 输出的声道布局 → 声道数
+_CHANNEL_LAYOUTS = {"mono": 1, "stereo": 2, "2.1": 3, "3.0": 3, "quad": 4, "4.0": 4,
+                    "5.0": 5, "5.1": 6, "6.1": 7, "7.1": 8}
+
+
+def _split_fields(text):
+    """按顶层逗号分割（括号内的逗号不分割）"""
+    fields, depth, current = [], 0, ""
+    for ch in text:
+        depth += (ch in "([") - (ch in ")]")
+        if ch == "," and depth == 0:
+            fields.append(current.strip())
+            current = ""
+        else:
+            current += ch
+    fields.append(current.strip())
+    return fields
+
+
+def _rate_fraction(value):
+    """ffmpeg 输出的帧率（如 29.97、23.98、30k）转为 ffprobe 的分数形式"""
+    from fractions import Fraction
+
+    try:
+        rate = float(value[:-1]) * 1000 if value.endswith("k") else float(value)
+    except ValueError:
+        return None
+    if rate <= 0:
+        return None
+    # NTSC 帧率（24000/1001、30000/1001 等）只打印两位小数
+    ntsc = round(rate * 1.001)
+    if abs(rate - round(rate)) > 0.001 and abs(rate - ntsc / 1.001) < 0.01:
+        return f"{ntsc * 1000}/1001"
+    rate = Fraction(rate).limit_denominator(1000)
+    return f"{rate.numerator}/{rate.denominator}"
+
+
+def parse_ffmpeg_info(text):
+    """把 ``ffmpeg -i`` 的输出解析为 ffprobe JSON 的结构（未安装 ffprobe 时使用）"""
+    import re
+
+    fmt, streams = {}, []
+    match = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", text)
+    if match:
+        h, m, sec = match.groups()
+        fmt["duration"] = "%.6f" % (int(h) * 3600 + int(m) * 60 + float(sec))
+    match = re.search(r"^\s+creation_time\s*: (\S+)", text, re.M)
+    if match:
+        fmt["tags"] = {"creation_time": match.group(1)}
+
+    for kind, detail in re.findall(r"^\s+Stream #0:\d+\S*: (Video|Audio): (.*)$", text, re.M):
+        fields = _split_fields(detail)
+        codec = fields[0].split()
+        stream = {"codec_type": kind.lower(), "codec_name": codec[0] if codec else None}
+        profile = re.match(r"\S+ \(([^)/]+)\)", fields[0])
+        if profile:
+            stream["profile"] = profile.group(1)
+        if kind == "Video":
+            if len(fields) > 1:
+                stream["pix_fmt"] = fields[1].split("(")[0].strip()
+            for field in fields[1:]:
+                size = re.match(r"(\d+)x(\d+)", field)
+                if size and "width" not in stream:
+                    stream["width"], stream["height"] = int(size.group(1)), int(size.group(2))
+                for unit, key in (("fps", "avg_frame_rate"), ("tbr", "r_frame_rate")):
+                    if field.endswith(" " + unit):
+                        stream[key] = _rate_fraction(field.split()[0])
+        else:
+            for field in fields[1:]:
+                if field.endswith(" Hz"):
+                    stream["sample_rate"] = field.split()[0]
+                elif field in _CHANNEL_LAYOUTS:
+                    stream["channels"] = _CHANNEL_LAYOUTS[field]
+                elif field.endswith(" channels"):
+                    stream["channels"] = int(field.split()[0])
+        streams.append(stream)
+    return {"format": fmt, "streams": streams}
+
+
+def popen_params(params=None):
+    """跨平台 Popen 参数（Windows 下不弹出控制台窗口）"""
+    params = dict(params or {})
+    if os.name == "nt":
+        params["creationflags"] = 0x08000000  # CREATE_NO_WINDOW
+    return params
+
+
+def iter_pcm_chunks(filename, fps, nchannels, chunk_frames):
+    """流式解码音频为 16-bit PCM
+
+    与 MoviePy 的 FFMPEG_AudioReader 使用相同的 ffmpeg 参数，
+    保证得到的采样值完全一致，但每次只在内存中保留一个块。
+
+    Args:
+        filename: 音视频文件路径
+        fps: 解码采样率
+        nchannels: 声道数
+        chunk_frames: 每块采样帧数
+
+    Yields:
+        int16 数组，形状 (n, nchannels)
+    """
+    import numpy as np
+
+    cmd = [
+        ffmpeg_binary(), "-i", filename, "-vn",
+        "-loglevel", "error",
+        "-f", "s16le", "-acodec", "pcm_s16le",
+        "-ar", "%d" % fps, "-ac", "%d" % nchannels,
+        "-",
+    ]
+    chunk_bytes = chunk_frames * nchannels * 2
+    proc = subprocess.Popen(cmd, **popen_params({
+        "stdout": subprocess.PIPE,
+        "stderr": subprocess.DEVNULL,
+        "stdin": subprocess.DEVNULL,
+    }))
+    try:
+        while True:
+            data = proc.stdout.read(chunk_bytes)
+            if not data:
+                break
+            usable = len(data) - len(data) % (nchannels * 2)
+            yield np.frombuffer(data[:usable], dtype=np.int16).reshape(-1, nchannels)
+    finally:
+        proc.stdout.close()
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+
+
+def _iter_raw_frames(cmd, shape):
+    """读取 ffmpeg rawvideo 输出，逐帧产出 uint8 数组"""
+    import numpy as np
+
+    frame_bytes = int(np.prod(shape))
+    proc = subprocess.Popen(cmd, **popen_params({
+        "stdout": subprocess.PIPE,
+        "stderr": subprocess.DEVNULL,
+        "stdin": subprocess.DEVNULL,
+    }))
+    try:
+        while True:
+            data = proc.stdout.read(frame_bytes)
+            if len(data) < frame_bytes:
+                break
+            yield np.frombuffer(data, dtype=np.uint8).reshape(shape)
+    finally:
+        proc.stdout.close()
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+
+
+def iter_video_frames(filename, fps, width, height, gray=True):
+    """流式解码预缩放的视频帧
+
+    由 ffmpeg 完成按采样率抽帧（fps 滤镜）和缩放，一次顺序解码，
+    比逐帧 seek + 全分辨率 RGB 解码快得多。fps 滤镜使用 round=up，第 k 帧
+    与 MoviePy ``get_frame(k / fps)`` 取到同一源帧（默认的就近取整会晚约半个间隔）。
+
+    Args:
+        filename: 视频文件路径
+        fps: 输出帧率（如 1/采样间隔）
+        width: 输出宽度
+        height: 输出高度
+        gray: True 输出单通道灰度，否则 RGB
+
+    Yields:
+        uint8 数组，形状 (height, width) 或 (height, width, 3)
+    """
+    cmd = [
+        ffmpeg_binary(), "-i", filename, "-an", "-sn",
+        "-loglevel", "error",
+        "-vf", "fps=%r:round=up,scale=%d:%d:flags=area" % (fps, width, height),
+        "-f", "rawvideo", "-pix_fmt", "gray" if gray else "rgb24",
+        "-",
+    ]
+    shape = (height, width) if gray else (height, width, 3)
+    return _iter_raw_frames(cmd, shape)
+
+
+def iter_cross_strips(filename, fps, width, height, half):
+    """流式解码帧中心的十字条带（全分辨率 RGB）
+
+    ffmpeg 裁出中心横条（高 2*half）和竖条（宽 2*half，转置为横向）后拼接输出，
+    管道中只有条带像素。取帧方式与 iter_video_frames 相同。
+
+    Args:
+        filename: 视频文件路径
+        fps: 输出帧率（如 1/采样间隔）
+        width: 源视频宽度
+        height: 源视频高度
+        half: 条带半宽（像素）
+
+    Yields:
+        uint8 数组，形状 (2*half, width+height, 3)
+    """
+    graph = (
+        "[0:v]fps=%r:round=up,format=rgb24,split[a][b];"
+        "[a]crop=%d:%d:0:%d[h];"
+        "[b]crop=%d:%d:%d:0,transpose=clock[v];"
+        "[h][v]hstack"
+    ) % (fps,
+         width, 2 * half, height // 2 - half,
+         2 * half, height, width // 2 - half)
+    cmd = [
+        ffmpeg_binary(), "-i", filename, "-an", "-sn",
+        "-loglevel", "error",
+        "-filter_complex", graph,
+        "-f", "rawvideo", "-pix_fmt", "rgb24",
+        "-",
+    ]
+    return _iter_raw_frames(cmd, (2 * half, width + height, 3))
@@ -6,8 +6,10 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QH
                              QLineEdit, QGroupBox, QGridLayout, QTabWidget, QTextEdit, QComboBox)
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QFont
-from kooix_cut import detect_audio_segments
-from moviepy import VideoFileClip, concatenate_videoclips
+from encoders import default_registry
+from engine import analysis_options, run_job
+from profiling import profile_dir_from_env
+from run_report import RunReport
 from video_sort import sort_files
 
 
@@ -17,7 +19,8 @@ class ProcessThread(QThread):
 
     def __init__(self, files, output, threshold, min_duration, codec, preset,
                  window_size, smoothing, padding, enable_static, static_threshold, static_duration,
-                 enable_vad, enable_scene, enable_face):
+                 enable_vad, enable_scene, enable_face, export_mode='reencode',
+                 analysis_workers=None):
         super().__init__()
         self.files = files
         self.output = output
@@ -34,137 +37,28 @@ class ProcessThread(QThread):
         self.enable_vad = enable_vad
         self.enable_scene = enable_scene
         self.enable_face = enable_face
+        self.export_mode = export_mode
+        self.analysis_workers = analysis_workers
+        self.report = None
 
     def run(self):
-        from concurrent.futures import ThreadPoolExecutor
-        import os
-
-        def process_video(i, video_file):
-            from kooix_cut import detect_static_scenes
-            self.progress.emit(i, len(self.files), Path(video_file).name)
-            clip = VideoFileClip(video_file)
-
-            # 选择检测方法
-            if self.enable_vad:
-                # AI VAD 检测
-                from ai_detect import VADDetector
-                vad = VADDetector()
-                audio_segments = vad.detect_speech(clip, self.min_duration, self.padding)
-            else:
-                # 传统音频检测
-                audio_segments = detect_audio_segments(
-                    clip, self.threshold, self.min_duration,
-                    self.window_size, self.smoothing, self.padding
-                )
-
-            # 视频静止检测（可选）
-            if self.enable_static and audio_segments:
-                static_segments = detect_static_scenes(
-                    clip, self.static_threshold, self.static_duration
-                )
-                filtered = []
-                for a_start, a_end in audio_segments:
-                    keep = True
-                    for s_start, s_end in static_segments:
-                        overlap = min(a_end, s_end) - max(a_start, s_start)
-                        if overlap > (a_end - a_start) * 0.8:
-                            keep = False
-                            break
-                    if keep:
-                        filtered.append((a_start, a_end))
-                audio_segments = filtered
-
-            # 场景分割（可选）
-            if self.enable_scene and audio_segments:
-                from ai_detect import SceneDetector
-                scenes = SceneDetector.detect_scenes(clip)
-                # 与音频片段求交集
-                filtered = []
-                for a_start, a_end in audio_segments:
-                    for s_start, s_end in scenes:
-                        overlap_start = max(a_start, s_start)
-                        overlap_end = min(a_end, s_end)
-                        if overlap_end > overlap_start:
-                            filtered.append((overlap_start, overlap_end))
-                audio_segments = filtered if filtered else audio_segments
-
-            # 人脸检测（可选）
-            if self.enable_face and audio_segments:
-                from ai_detect import FaceDetector
-                face_detector = FaceDetector()
-                face_times = face_detector.detect_faces(clip)
-                if face_times:
-                    # 保留有人脸的片段
-                    filtered = []
-                    for a_start, a_end in audio_segments:
-                        has_face = any(a_start <= t <= a_end for t in face_times)
-                        if has_face:
-                            filtered.append((a_start, a_end))
-                    audio_segments = filtered if filtered else audio_segments
-
-            result = []
-            if audio_segments:
-                for start, end in audio_segments:
-                    result.append(clip.subclipped(start, end))
-            else:
-                clip.close()
-            return result
-
-        # 并行处理视频
-        clips = []
-        with ThreadPoolExecutor(max_workers=min(4, len(self.files))) as executor:
-            futures = [executor.submit(process_video, i, f) for i, f in enumerate(self.files)]
-            for future in futures:
-                clips.extend(future.result())
-
-        if clips:
-            self.progress.emit(len(self.files), len(self.files), "合并中...")
-            final = concatenate_videoclips(clips)
-
-            # 编码参数
-            threads = os.cpu_count() or 4
-
-            # nvenc 使用不同的 preset
-            if "nvenc" in self.codec:
-                preset_map = {
-                    "ultrafast": "p1", "superfast": "p2", "veryfast": "p3",
-                    "faster": "p4", "fast": "p5", "medium": "p6"
-                }
-                preset = preset_map.get(self.preset, "p1")
-            else:
-                preset = self.preset
-
-            # 尝试编码，失败则自动回退
-            try:
-                final.write_videofile(
-                    self.output,
-                    codec=self.codec,
-                    audio_codec="aac",
-                    preset=preset,
-                    threads=threads,
-                    logger=None
-                )
-            except Exception as e:
-                if "nvenc" in self.codec and "Unknown encoder" in str(e):
-                    # GPU 编码失败，回退到 CPU
-                    self.progress.emit(len(self.files), len(self.files), "GPU不可用，使用CPU编码...")
-                    final.write_videofile(
-                        self.output,
-                        codec="libx264",
-                        audio_codec="aac",
-                        preset=self.preset,
-                        threads=threads,
-                        logger=None
-                    )
-                else:
-                    raise
-
-            for clip in clips:
-                clip.close()
-            final.close()
-            self.finished.emit(f"✅ 完成！输出: {self.output}")
-        else:
+        options = analysis_options(
+            self.threshold, self.min_duration, self.window_size, self.smoothing, self.padding,
+            self.enable_vad, self.enable_static, self.static_threshold, self.static_duration,
+            self.enable_scene, self.enable_face,
+        )
+        # 多进程分析（绕过 GIL），导出时按片段描述重新读取源文件
+        self.report = RunReport()
+        output = run_job(self.files, self.output, options, self.codec, self.preset,
+                         self.export_mode, workers=self.analysis_workers,
+                         on_progress=self.progress.emit, report=self.report,
+                         profile_dir=profile_dir_from_env(self.output))
+        if output is None:
             self.finished.emit("❌ 没有有效片段")
+            return
+        # 分阶段耗时报告保存在输出文件旁
+        report_path = self.report.save(Path(output).with_suffix(".report.json"))
+        self.finished.emit(f"✅ 完成！输出: {output}\n{self.report.summary()}\n报告: {report_path}")
 
 
 class MainWindow(QMainWindow):
@@ -174,6 +68,9 @@ class MainWindow(QMainWindow):
         self.setGeometry(100, 100, 800, 650)
         self.setAcceptDrops(True)
 
+        # 后台探测可用编码器（结果按 ffmpeg 版本缓存），「自动检测」时直接使用
+        default_registry().start()
+
         # 深色主题样式
         self.setStyleSheet("""
             QMainWindow { background: #1e1e1e; }
@@ -386,7 +283,7 @@ class MainWindow(QMainWindow):
         # 获取编码器
         codec_map = {
             "libx264 (CPU)": "libx264",
-            "自动检测": self._detect_gpu(),
+            "自动检测": "auto",  # 由处理线程通过编码器注册表解析
             "h264_nvenc (NVIDIA GPU)": "h264_nvenc"
         }
         codec = codec_map[self.codec.currentText()]
@@ -412,21 +309,6 @@ class MainWindow(QMainWindow):
         self.thread.finished.connect(self.process_finished)
         self.thread.start()
 
-    def _detect_gpu(self):
-        import subprocess
-        try:
-            # 实际测试 nvenc 是否可用
-            result = subprocess.run(
-                ["ffmpeg", "-f", "lavfi", "-i", "nullsrc=s=256x256:d=1", "-c:v", "h264_nvenc", "-f", "null", "-"],
-                capture_output=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                return "h264_nvenc"
-        except:
-            pass
-        return "libx264"
-
     def update_progress(self, current, total, name):
         self.progress.setValue(current)
         self.status.setText(f"处理中 ({current}/{total}): {name}")
@@ -437,6 +319,8 @@ class MainWindow(QMainWindow):
 
 
 def main():
+    import multiprocessing
+    multiprocessing.freeze_support()  # PyInstaller 打包后子进程分析需要
     app = QApplication([])
     window = MainWindow()
     window.show()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""区间运算 - 合并检测器结果用的向量化交集、差集、重叠过滤、点包含
+
+区间统一表示为 [(start, end), ...]。所有运算按起点排序后用 searchsorted
+定位候选区间，复杂度为 O((n + m) log m + 重叠对数)，替代逐对比较的嵌套循环。
+输出顺序与输入的第一个区间列表一致。
+"""
+import numpy as np
+
+
+def as_array(intervals):
+    """区间列表转为 (n, 2) float 数组"""
+    arr = np.asarray(intervals, dtype=float)
+    return arr.reshape(-1, 2)
+
+
+def to_list(arr):
+    """(n, 2) 数组转回 [(start, end), ...]"""
+    return [(float(s), float(e)) for s, e in arr]
+
+
+def _candidate_pairs(a, b):
+    """a 中每个区间与 b 中可能重叠的区间下标对
+
+    b 按起点排序后，终点的前缀最大值单调不减，可用二分查找确定每个
+    a 区间的候选范围 [lo, hi)；候选中不重叠的由调用方按重叠长度过滤。
+
+    Returns:
+        (ai, bi, b_sorted)：下标数组与按起点排序后的 b
+    """
+    b = b[np.argsort(b[:, 0], kind='stable')]
+    reach = np.maximum.accumulate(b[:, 1])
+    lo = np.searchsorted(reach, a[:, 0], side='right')
+    hi = np.searchsorted(b[:, 0], a[:, 1], side='left')
+    counts = np.maximum(hi - lo, 0)
+    ai = np.repeat(np.arange(len(a)), counts)
+    # 每个 a 区间内从 lo 开始连续编号
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    bi = np.repeat(lo, counts) + offsets
+    return ai, bi, b
+
+
+def intersect(a, b):
+    """逐对交集：a 中每个区间与 b 中每个区间的重叠部分（长度为正）
+
+    Args:
+        a: 区间列表
+        b: 区间列表
+
+    Returns:
+        [(start, end), ...]，按 a 的顺序、同一 a 内按 b 的起点排列
+    """
+    a, b = as_array(a), as_array(b)
+    if not len(a) or not len(b):
+        return []
+    ai, bi, b = _candidate_pairs(a, b)
+    starts = np.maximum(a[ai, 0], b[bi, 0])
+    ends = np.minimum(a[ai, 1], b[bi, 1])
+    keep = ends > starts
+    return to_list(np.column_stack([starts[keep], ends[keep]]))
+
+
+def max_overlap(a, b):
+    """a 中每个区间与 b 中任一单个区间的最大重叠长度（无重叠为 0）"""
+    a, b = as_array(a), as_array(b)
+    result = np.zeros(len(a))
+    if not len(a) or not len(b):
+        return result
+    ai, bi, b = _candidate_pairs(a, b)
+    overlaps = np.minimum(a[ai, 1], b[bi, 1]) - np.maximum(a[ai, 0], b[bi, 0])
+    np.maximum.at(result, ai, overlaps)
+    return result
+
+
+def filter_by_overlap(a, b, max_ratio=0.8):
+    """去掉被 b 中某个区间覆盖超过 max_ratio 的 a 区间
+
+    Args:
+        a: 待过滤的区间列表
+        b: 参照区间列表（如静止画面）
+        max_ratio: 允许的最大覆盖比例
+
+    Returns:
+        保留的 a 区间列表
+    """
+    arr = as_array(a)
+    keep = max_overlap(arr, b) <= (arr[:, 1] - arr[:, 0]) * max_ratio
+    return to_list(arr[keep])
+
+
+def filter_containing(a, points):
+    """保留至少包含一个时间点的区间（端点闭区间）"""
+    arr = as_array(a)
+    points = np.sort(np.asarray(points, dtype=float).ravel())
+    first = np.searchsorted(points, arr[:, 0], side='left')
+    last = np.searchsorted(points, arr[:, 1], side='right')
+    return to_list(arr[last > first])
+
+
+def union(a):
+    """合并重叠或相接的区间，返回按起点排序的不相交区间"""
+    arr = as_array(a)
+    if not len(arr):
+        return []
+    arr = arr[np.argsort(arr[:, 0], kind='stable')]
+    reach = np.maximum.accumulate(arr[:, 1])
+    # 起点超过之前所有区间终点的位置开始新的一段
+    new = np.concatenate([[True], arr[1:, 0] > reach[:-1]])
+    starts = arr[new, 0]
+    ends = reach[np.concatenate([np.flatnonzero(new)[1:] - 1, [len(arr) - 1]])]
+    return to_list(np.column_stack([starts, ends]))
+
+
+def subtract(a, b):
+    """差集：从 a 的每个区间中去掉 b 覆盖的部分
+
+    Returns:
+        剩余区间列表（长度为正），按 a 的顺序
+    """
+    arr = as_array(a)
+    holes = as_array(union(b))
+    if not len(arr) or not len(holes):
+        return to_list(arr)
+    result = []
+    lo = np.searchsorted(holes[:, 1], arr[:, 0], side='right')
+    hi = np.searchsorted(holes[:, 0], arr[:, 1], side='left')
+    for (start, end), i, j in zip(arr, lo, hi):
+        cursor = start
+        for h_start, h_end in holes[i:j]:
+            if h_start > cursor:
+                result.append((float(cursor), float(h_start)))
+            cursor = max(cursor, h_end)
+        if end > cursor:
+            result.append((float(cursor), float(end)))
+    return result
@@ -1,55 +1,42 @@
 #!/usr/bin/env python3
 """视频剪辑预处理工具 - 自动合并和删除静音片段"""
 from pathlib import Path
-from moviepy import VideoFileClip, concatenate_videoclips
+from moviepy import VideoFileClip
 import numpy as np
 from video_sort import sort_files
+from audio_analysis import AudioAnalysis, default_pcm_cache
+from video_analysis import VideoAnalysis
+import intervals
+from analysis_cache import default_cache
+from export import export_timeline
+from run_report import set_media_seconds, stage
 
 
-def detect_static_scenes(clip, threshold=0.02, min_duration=5.0, sample_interval=1.0):
-    """快速检测静止画面（十字采样法）
+def compute_static_diffs(clip, sample_interval=1.0):
+    """计算相邻采样帧的十字条带差异序列
+
+    有源文件时由 ffmpeg 按采样网格顺序输出帧中心的十字条带，
+    否则回退到 clip.get_frame 逐帧读取（见 VideoAnalysis），两者结果一致。
 
     Args:
         clip: 视频片段
-        threshold: 变化阈值（0-1），越小越敏感
-        min_duration: 最小静止时长（秒）
         sample_interval: 采样间隔（秒）
 
     Returns:
-        静止片段的时间区间列表 [(start, end), ...]
+        相邻帧差异数组（0-1），长度为采样点数 - 1
     """
-    duration = clip.duration
-    h, w = clip.size[1], clip.size[0]
+    return VideoAnalysis(clip).static_diffs(sample_interval)
 
-    # 十字采样位置（中心横竖条带）
-    h_center = h // 2
-    w_center = w // 2
-    strip_width = max(2, min(h, w) // 20)  # 条带宽度约5%
 
+def static_segments_from_diffs(diffs, duration, threshold=0.02, min_duration=5.0,
+                               sample_interval=1.0):
+    """根据帧差异序列划分静止片段（不涉及解码）"""
     times = np.arange(0, duration, sample_interval)
-    if len(times) < 2:
+    if len(times) < 2 or len(diffs) == 0:
         return []
 
-    # 提取十字条带
-    def get_cross_sample(t):
-        frame = clip.get_frame(t)
-        # 横条
-        h_strip = frame[h_center - strip_width:h_center + strip_width, :]
-        # 竖条
-        v_strip = frame[:, w_center - strip_width:w_center + strip_width]
-        return np.concatenate([h_strip.flatten(), v_strip.flatten()])
-
-    # 批量采样
-    samples = [get_cross_sample(t) for t in times]
-
-    # 计算相邻帧差异
-    diffs = []
-    for i in range(len(samples) - 1):
-        diff = np.mean(np.abs(samples[i+1].astype(float) - samples[i].astype(float))) / 255.0
-        diffs.append(diff)
-
     # 检测静止段
-    is_static = np.array(diffs) < threshold
+    is_static = np.asarray(diffs) < threshold
     changes = np.diff(np.concatenate([[False], is_static, [False]]).astype(int))
     starts = np.where(changes == 1)[0]
     ends = np.where(changes == -1)[0]
@@ -65,49 +52,58 @@ def detect_static_scenes(clip, threshold=0.02, min_duration=5.0, sample_interval
     return static_segments
 
 
-def detect_audio_segments(clip, silence_threshold=0.01, min_duration=3.0,
-                         window_size=0.3, smoothing=3, padding=0.5):
-    """智能检测有效音频片段（高性能+高质量）
+def detect_static_scenes(clip, threshold=0.02, min_duration=5.0, sample_interval=1.0,
+                         cache=None, analysis=None):
+    """快速检测静止画面（十字采样法）
 
     Args:
         clip: 视频片段
-        silence_threshold: 静音阈值（RMS）
-        min_duration: 最小有效片段时长（秒）
-        window_size: 分析窗口大小（秒），越小越精确但越慢
-        smoothing: 平滑窗口（帧数），减少误判
-        padding: 片段前后填充时间（秒），避免切掉开头结尾
+        threshold: 变化阈值（0-1），越小越敏感
+        min_duration: 最小静止时长（秒）
+        sample_interval: 采样间隔（秒）
+        cache: AnalysisCache 实例，缓存帧差异序列
+        analysis: 共享的 VideoAnalysis 上下文（与其他画面检测器共用一次解码）
 
     Returns:
-        有效片段的时间区间列表 [(start, end), ...]
+        静止片段的时间区间列表 [(start, end), ...]
     """
-    if not clip.audio:
-        return []
+    if analysis is None:
+        analysis = VideoAnalysis(clip, static_interval=sample_interval, cache=cache)
+    diffs = analysis.static_diffs(sample_interval)
+    return static_segments_from_diffs(diffs, clip.duration, threshold, min_duration,
+                                      sample_interval)
 
-    audio = clip.audio
-    fps = audio.fps
-    duration = clip.duration
 
-    # 智能采样率（避免MoviePy在低采样率下的bug）
-    # MoviePy在16kHz及以下会导致音频数据损坏
-    target_fps = min(fps, 22050)  # 使用至少22050Hz
-    samples = audio.to_soundarray(fps=target_fps)
-    if len(samples.shape) > 1:
-        samples = np.mean(samples, axis=1)
+def compute_audio_volumes(clip, window_size=0.3, streaming=True, cache=None):
+    """计算逐窗口音量序列（70% RMS + 30% 峰值）
+
+    Args:
+        clip: 视频片段
+        window_size: 分析窗口大小（秒）
+        streaming: 是否流式读取（内存占用恒定）；无源文件时自动回退
+        cache: AnalysisCache 实例，缓存音量序列
 
-    # 向量化计算音量（RMS + 峰值混合）
-    win_samples = int(target_fps * window_size)
-    n_windows = len(samples) // win_samples
+    Returns:
+        每个窗口的音量数组
+    """
+    analysis = AudioAnalysis(clip, window_size, streaming=streaming, cache=cache)
+    return analysis.volumes(window_size)
 
-    trimmed = samples[:n_windows * win_samples].reshape(n_windows, win_samples)
 
-    # RMS（平均能量）
-    rms = np.sqrt(np.mean(trimmed ** 2, axis=1))
+def segments_from_volumes(volumes, duration, silence_threshold=0.01, min_duration=3.0,
+                          window_size=0.3, smoothing=3, padding=0.5):
+    """根据音量序列划分有效片段（不涉及解码，毫秒级）
 
-    # 峰值（捕捉瞬时音量）
-    peaks = np.max(np.abs(trimmed), axis=1)
+    Args:
+        volumes: 逐窗口音量数组（见 compute_audio_volumes）
+        duration: 视频时长（秒）
+        其余参数同 detect_audio_segments
 
-    # 混合指标（70% RMS + 30% 峰值）
-    volumes = 0.7 * rms + 0.3 * peaks
+    Returns:
+        有效片段的时间区间列表 [(start, end), ...]
+    """
+    if len(volumes) == 0:
+        return []
 
     # 平滑处理（移动平均，减少抖动）
     if smoothing > 1:
@@ -162,7 +158,147 @@ def detect_audio_segments(clip, silence_threshold=0.01, min_duration=3.0,
     return segments
 
 
-def process_videos(input_dir, output_file, silence_threshold=0.01, min_duration=3.0):
+def detect_audio_segments(clip, silence_threshold=0.01, min_duration=3.0,
+                         window_size=0.3, smoothing=3, padding=0.5, streaming=True,
+                         analysis=None):
+    """智能检测有效音频片段（高性能+高质量）
+
+    Args:
+        clip: 视频片段
+        silence_threshold: 静音阈值（RMS）
+        min_duration: 最小有效片段时长（秒）
+        window_size: 分析窗口大小（秒），越小越精确但越慢
+        smoothing: 平滑窗口（帧数），减少误判
+        padding: 片段前后填充时间（秒），避免切掉开头结尾
+        streaming: 流式解码音频，内存占用与视频时长无关（结果相同）
+        analysis: 共享的 AudioAnalysis 上下文（与其他检测器共用一次解码）
+
+    Returns:
+        有效片段的时间区间列表 [(start, end), ...]
+    """
+    if not clip.audio:
+        return []
+
+    if analysis is None:
+        analysis = AudioAnalysis(clip, window_size, streaming=streaming)
+    volumes = analysis.volumes(window_size)
+    return segments_from_volumes(volumes, clip.duration, silence_threshold, min_duration,
+                                 window_size, smoothing, padding)
+
+
+def analyze_audio(clip, enable_vad=False, silence_threshold=0.01, min_duration=3.0,
+                  window_size=0.3, smoothing=3, padding=0.5, cache=None, pcm_cache=None):
+    """检测有效音频片段（CLI 与 GUI 共用）
+
+    为文件创建一个 AudioAnalysis 上下文，所有音频检测器共享同一次解码。
+
+    Args:
+        clip: 视频片段
+        enable_vad: 使用 WebRTC VAD 检测语音，否则使用音量检测
+        cache: AnalysisCache 实例，缓存音量/VAD 序列
+        pcm_cache: PcmCache 实例，从 PCM 旁路文件读取采样（首次分析时生成）
+        其余参数同 detect_audio_segments
+
+    Returns:
+        有效片段的时间区间列表 [(start, end), ...]
+    """
+    if not clip.audio:
+        return []
+
+    if enable_vad:
+        from ai_detect import VADDetector
+        vad = VADDetector()
+        analysis = AudioAnalysis(clip, vad=vad, cache=cache, pcm_cache=pcm_cache)
+        return vad.detect_speech(clip, min_duration, padding, analysis=analysis)
+
+    analysis = AudioAnalysis(clip, window_size, cache=cache, pcm_cache=pcm_cache)
+    return detect_audio_segments(clip, silence_threshold, min_duration,
+                                 window_size, smoothing, padding, analysis=analysis)
+
+
+def analyze_video(video_file, threshold=0.01, min_duration=3.0, window_size=0.3, smoothing=3,
+                  padding=0.5, enable_vad=False, enable_static=False, static_threshold=0.02,
+                  static_duration=5.0, enable_scene=False, enable_face=False, use_cache=True,
+                  pcm_sidecar=False):
+    """分析单个视频，返回保留片段（完整检测流程，可在子进程中运行）
+
+    只返回片段列表而不是 VideoFileClip，便于进程池传回结果；
+    导出时由父进程按片段描述重新打开源文件。
+
+    Args:
+        video_file: 视频文件路径
+        threshold, min_duration, window_size, smoothing, padding: 音频检测参数
+        enable_vad: 使用 VAD 代替音量检测
+        enable_static, static_threshold, static_duration: 静止画面过滤
+        enable_scene: 按场景切分
+        enable_face: 只保留有人脸的片段
+        use_cache: 使用分析缓存
+        pcm_sidecar: 音频解码为 PCM 旁路文件并内存映射读取（见 audio_analysis.PcmCache）
+
+    Returns:
+        保留片段 [(start, end), ...]
+    """
+    cache = default_cache() if use_cache else None
+    with stage("open"):
+        clip = VideoFileClip(str(video_file))
+    set_media_seconds(clip.duration)
+    smoothing = int(smoothing)
+
+    # 音频检测（VAD 或传统音量检测，与 CLI 共用同一路径）
+    audio_segments = analyze_audio(
+        clip, enable_vad, threshold, min_duration,
+        window_size, smoothing, padding, cache=cache,
+        pcm_cache=default_pcm_cache() if pcm_sidecar else None,
+    )
+
+    # 画面检测共用一次解码
+    face_detector = None
+    if enable_face and audio_segments:
+        from ai_detect import FaceDetector
+        face_detector = FaceDetector()
+        face_detector.load_model()
+        if face_detector.cascade is None:
+            face_detector = None
+    video = VideoAnalysis(
+        clip,
+        static_interval=1.0 if enable_static and audio_segments else None,
+        scene_interval=0.5 if enable_scene and audio_segments else None,
+        face_detector=face_detector,
+        cache=cache,
+    )
+
+    # 视频静止检测（可选）
+    if enable_static and audio_segments:
+        static_segments = detect_static_scenes(
+            clip, static_threshold, static_duration, cache=cache, analysis=video
+        )
+        with stage("combine"):
+            audio_segments = intervals.filter_by_overlap(audio_segments, static_segments, 0.8)
+
+    # 场景分割（可选）
+    if enable_scene and audio_segments:
+        from ai_detect import SceneDetector
+        scenes = SceneDetector.detect_scenes(clip, cache=cache, analysis=video)
+        # 与音频片段求交集
+        with stage("combine"):
+            filtered = intervals.intersect(audio_segments, scenes)
+        audio_segments = filtered if filtered else audio_segments
+
+    # 人脸检测（可选）
+    if face_detector is not None and audio_segments:
+        face_times = face_detector.detect_faces(clip, analysis=video)
+        if face_times:
+            # 保留有人脸的片段
+            with stage("combine"):
+                filtered = intervals.filter_containing(audio_segments, face_times)
+            audio_segments = filtered if filtered else audio_segments
+
+    clip.close()
+    return [(float(s), float(e)) for s, e in audio_segments]
+
+
+def process_videos(input_dir, output_file, silence_threshold=0.01, min_duration=3.0,
+                   use_cache=True, export_mode='reencode', profile=False):
     """处理视频文件
 
     Args:
@@ -170,7 +306,14 @@ def process_videos(input_dir, output_file, silence_threshold=0.01, min_duration=
         output_file: 输出文件路径
         silence_threshold: 静音阈值
         min_duration: 最小有效片段时长
+        use_cache: 使用分析缓存（仅调整分段参数时无需重新解码）
+        export_mode: 导出模式，见 export.EXPORT_MODES
+        profile: 剖析各阶段，True 时输出到 <输出>.profile/，字符串为输出目录
+            （见 profiling 模块）
     """
+    from profiling import profile_dir_for, profiled
+
+    profile_dir = profile_dir_for(output_file, profile)
     input_path = Path(input_dir)
     video_files = list(input_path.glob("*.mp4"))
 
@@ -185,42 +328,53 @@ def process_videos(input_dir, output_file, silence_threshold=0.01, min_duration=
 
     print(f"找到 {len(video_files)} 个视频文件")
 
-    clips = []
-    for video_file in video_files:
+    timeline = []
+    for i, video_file in enumerate(video_files, 1):
         print(f"处理: {video_file.name}")
-        clip = VideoFileClip(str(video_file))
-
-        segments = detect_audio_segments(clip, silence_threshold, min_duration)
+        with profiled(profile_dir, f"analyze-{i:03d}-{video_file.stem}"):
+            segments = analyze_video(video_file, silence_threshold, min_duration,
+                                     use_cache=use_cache)
 
         if not segments:
             print(f"  跳过（无有效音频）")
-            clip.close()
             continue
 
         print(f"  保留 {len(segments)} 个片段")
-        for start, end in segments:
-            clips.append(clip.subclipped(start, end))
+        timeline.extend((str(video_file), start, end) for start, end in segments)
 
-    if not clips:
+    if not timeline:
         print("没有有效片段")
         return
 
-    print(f"\n合并 {len(clips)} 个片段...")
-    final = concatenate_videoclips(clips)
-    final.write_videofile(output_file, codec="libx264", audio_codec="aac")
-
-    for clip in clips:
-        clip.close()
-    final.close()
+    print(f"\n合并 {len(timeline)} 个片段...")
+    with profiled(profile_dir, "export"):
+        export_timeline(timeline, output_file, export_mode, on_status=print)
 
     print(f"\n完成！输出: {output_file}")
+    if profile_dir:
+        print(f"剖析结果: {profile_dir}")
 
 
 def main():
     from sys import argv
 
+    if "--clear-cache" in argv:
+        from export import default_segment_cache
+        from thumbnails import default_thumbnail_cache
+        from volume_pyramid import default_strip_cache
+        freed = (default_cache().clear() + default_segment_cache().clear()
+                 + default_pcm_cache().clear() + default_strip_cache().clear()
+                 + default_thumbnail_cache().clear())
+        print(f"已清除分析缓存、片段缓存、PCM 旁路文件、时间线条和缩略图 ({freed / 1024 / 1024:.1f} MB)")
+        return
+
+    # --profile 可出现在任意位置；未指定时参考环境变量 KOOIX_CUT_PROFILE
+    profile = "--profile" in argv
+    argv = [arg for arg in argv if arg != "--profile"]
+
     if len(argv) < 2:
-        print("用法: kooix-cut <输入目录> [输出文件] [静音阈值] [最小时长]")
+        print("用法: kooix-cut <输入目录> [输出文件] [静音阈值] [最小时长] [--profile]")
+        print("      kooix-cut --clear-cache    清除分析缓存、片段缓存和 PCM 旁路文件")
         print("示例: kooix-cut ./videos output.mp4 0.01 3.0")
         return
 
@@ -229,7 +383,10 @@ def main():
     silence_threshold = float(argv[3]) if len(argv) > 3 else 0.01
     min_duration = float(argv[4]) if len(argv) > 4 else 3.0
 
-    process_videos(input_dir, output_file, silence_threshold, min_duration)
+    if not profile:
+        from profiling import profile_dir_from_env
+        profile = profile_dir_from_env(output_file) or False
+    process_videos(input_dir, output_file, silence_threshold, min_duration, profile=profile)
 
 
 if __name__ == "__main__":
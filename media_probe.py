@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""媒体元数据 - 轻量 ffprobe 探测，并行执行，按文件身份缓存到磁盘
+
+只读取容器和流的头信息（不解码、不启动 MoviePy 读取器），没有 ffprobe 时
+解析 ffmpeg 的输出。缓存键为 (路径, 大小, 修改时间)，文件变化后自动重新探测；
+探测失败的文件同样缓存，不会每次排序都重新调用。
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from analysis_cache import default_cache_root
+
+# 元数据格式变更时递增，使旧缓存自动失效
+METADATA_VERSION = 1
+
+# 缓存条目上限，超出后删除最久未使用的
+MAX_ENTRIES = 50000
+
+# 缓存未命中（区别于已缓存的探测失败结果 None）
+_MISSING = object()
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _rate(value):
+    num, _, den = str(value or "").partition("/")
+    num, den = _float(num), _float(den or 1)
+    return num / den if num and den else None
+
+
+def probe_file(path):
+    """读取单个文件的元数据（ffprobe，未安装时解析 ffmpeg 输出）
+
+    Returns:
+        {'duration', 'width', 'height', 'fps', 'video_codec', 'has_audio',
+         'audio_codec', 'sample_rate', 'channels', 'creation_time'}
+    """
+    from ffmpeg_tools import probe_streams
+
+    info = probe_streams(str(path))
+    fmt = info.get("format") or {}
+    streams = info.get("streams") or []
+    video = next((s for s in streams if s.get("codec_type") == "video"), {})
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), {})
+
+    duration = _float(fmt.get("duration")) or _float(video.get("duration")) or 0.0
+    return {
+        "duration": duration,
+        "width": video.get("width"),
+        "height": video.get("height"),
+        "fps": _rate(video.get("avg_frame_rate")) or _rate(video.get("r_frame_rate")),
+        "video_codec": video.get("codec_name"),
+        "has_audio": bool(audio),
+        "audio_codec": audio.get("codec_name"),
+        "sample_rate": int(_float(audio.get("sample_rate")) or 0) or None,
+        "channels": audio.get("channels"),
+        "creation_time": (fmt.get("tags") or {}).get("creation_time"),
+    }
+
+
+class MetadataCache:
+    """元数据磁盘缓存（单个 JSON 文件）"""
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else default_cache_root() / "metadata.json"
+        self.lock = threading.Lock()
+        self.entries = None
+        self.dirty = False
+
+    def _load(self):
+        if self.entries is None:
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                self.entries = data.get("entries", {}) if data.get("version") == METADATA_VERSION else {}
+            except (OSError, ValueError, AttributeError):
+                self.entries = {}
+
+    def get(self, path, st, default=None):
+        """读取缓存，文件大小或修改时间不一致时返回 default
+
+        探测失败的文件缓存为 None，用 default 区分未命中。
+        """
+        with self.lock:
+            self._load()
+            entry = self.entries.get(path)
+            if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+                entry["used"] = time.time()
+                self.dirty = True
+                return entry["meta"]
+        return default
+
+    def put(self, path, st, meta):
+        with self.lock:
+            self._load()
+            self.entries[path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                                  "used": time.time(), "meta": meta}
+            self.dirty = True
+
+    def save(self):
+        """写回磁盘（原子替换），超出上限时删除最久未使用的条目"""
+        with self.lock:
+            if not self.dirty or self.entries is None:
+                return
+            if len(self.entries) > MAX_ENTRIES:
+                keep = sorted(self.entries.items(), key=lambda kv: kv[1]["used"])[-MAX_ENTRIES:]
+                self.entries = dict(keep)
+            payload = json.dumps({"version": METADATA_VERSION, "entries": self.entries})
+            self.dirty = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(payload, encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"写入元数据缓存失败: {e}")
+
+    def clear(self):
+        with self.lock:
+            self.entries = {}
+            self.dirty = False
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+
+_default_cache = None
+
+
+def default_metadata_cache():
+    """进程内共享的元数据缓存实例"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = MetadataCache()
+    return _default_cache
+
+
+def probe_many(files, workers=None, cache=None):
+    """并行探测多个文件的元数据（命中缓存的不再探测）
+
+    Args:
+        files: 文件路径列表
+        workers: 并行探测进程数，默认 CPU 核数 × 2（最多 32）
+        cache: MetadataCache 实例，默认 default_metadata_cache()
+
+    Returns:
+        {原路径: 元数据 dict 或 None（文件不存在或探测失败）}
+    """
+    cache = cache or default_metadata_cache()
+    result = {}
+    missing = []
+    for f in files:
+        path = os.path.abspath(f)
+        try:
+            st = os.stat(path)
+        except OSError:
+            result[f] = None
+            continue
+        meta = cache.get(path, st, _MISSING)
+        if meta is _MISSING:
+            missing.append((f, path, st))
+        else:
+            result[f] = meta
+
+    def probe(item):
+        f, path, st = item
+        try:
+            meta = probe_file(path)
+        except (RuntimeError, ValueError) as e:
+            # 文件无法读取：同样缓存，文件不变时不再重复探测
+            print(f"探测元数据失败 {f}: {e}")
+            meta = None
+        except Exception as e:
+            # 超时等临时错误不缓存
+            print(f"探测元数据失败 {f}: {e}")
+            return f, None
+        cache.put(path, st, meta)
+        return f, meta
+
+    if missing:
+        workers = workers or min(32, (os.cpu_count() or 4) * 2)
+        with ThreadPoolExecutor(max_workers=min(workers, len(missing))) as executor:
+            result.update(executor.map(probe, missing))
+    cache.save()
+    return result
+
+
+def get_duration(path):
+    """单个文件的时长（秒），失败返回 0.0"""
+    meta = probe_many([path]).get(path)
+    return meta["duration"] if meta else 0.0
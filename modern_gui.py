@@ -1,15 +1,30 @@
 #!/usr/bin/env python3
 """现代化 GUI - 专业深灰色主题（PyQt6实现）"""
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import threading
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QListWidget, QPushButton, QProgressBar, QLabel, QDoubleSpinBox,
                              QLineEdit, QGridLayout, QComboBox, QFrame, QCheckBox,
-                             QListWidgetItem, QFileDialog, QMessageBox, QDialog)
-from PyQt6.QtCore import Qt, QSize
-from PyQt6.QtGui import QFont, QKeySequence, QShortcut
+                             QListWidgetItem, QFileDialog, QMessageBox, QDialog,
+                             QStyledItemDelegate, QStyleOptionViewItem)
+from PyQt6.QtCore import Qt, QSize, QTimer, pyqtSignal
+from PyQt6.QtGui import QColor, QFont, QIcon, QKeySequence, QPainter, QPixmap, QShortcut
 from gui import ProcessThread
+from analysis_cache import default_cache
+from encoders import default_registry
+from engine import analysis_options, preload
+from export import EXPORT_MODES, default_segment_cache
+from media_probe import probe_many
+from thumbnails import THUMB_MEMORY_ITEMS, LruCache, default_thumbnail_cache
 from video_sort import SORT_METHODS, sort_files, get_sort_method_name
 
+# 文件列表时间线条的后台线程数
+STRIP_WORKERS = 2
+
+# 缩略图的后台线程数（每个线程一个 ffmpeg 截帧进程）
+THUMB_WORKERS = 2
+
 
 # 翻译字典
 TRANSLATIONS = {
@@ -44,6 +59,7 @@ TRANSLATIONS = {
         'advanced_settings': 'ADVANCED SETTINGS',
         'encoder': 'Encoder:',
         'preset': 'Preset:',
+        'export_mode': 'Export Mode:',
         'cancel': 'Cancel',
         'apply': 'Apply',
         'disabled': 'Disabled',
@@ -58,6 +74,18 @@ TRANSLATIONS = {
         'resort': 'Re-sort',
         'manual_sort': 'Manual (Drag to reorder)',
         'drag_hint': 'Drag files to reorder • Delete to remove • Ctrl+R to process',
+
+        # Cache
+        'analysis_cache': 'Analysis Cache:',
+        'clear_cache': 'Clear Cache ({:.1f} MB)',
+        'cache_cleared': 'Cache cleared ({:.1f} MB freed)',
+
+        # Preview
+        'preview': 'PREVIEW',
+        'preview_empty': 'Add files to preview kept segments',
+        'preview_loading': 'Analyzing audio of {}...',
+        'preview_no_audio': '{} has no audio track',
+        'preview_summary': '{}: keep {:.0f}s of {:.0f}s ({} segments)',
     },
     'zh': {
         'app_title': 'KOOI Cut',
@@ -90,6 +118,7 @@ TRANSLATIONS = {
         'advanced_settings': '高级设置',
         'encoder': '编码器:',
         'preset': '编码速度:',
+        'export_mode': '导出模式:',
         'cancel': '取消',
         'apply': '确定',
         'disabled': '禁用',
@@ -104,18 +133,155 @@ TRANSLATIONS = {
         'resort': '重新排序',
         'manual_sort': '手动排序（拖拽调整）',
         'drag_hint': '拖拽文件调整顺序 • Delete 删除 • Ctrl+R 处理',
+
+        # 缓存
+        'analysis_cache': '分析缓存:',
+        'clear_cache': '清除缓存 ({:.1f} MB)',
+        'cache_cleared': '已清除缓存（释放 {:.1f} MB）',
+
+        # 预览
+        'preview': '预览',
+        'preview_empty': '添加文件后可预览保留的片段',
+        'preview_loading': '正在分析 {} 的音频...',
+        'preview_no_audio': '{} 没有音轨',
+        'preview_summary': '{}：保留 {:.0f}s / {:.0f}s（{} 个片段）',
     }
 }
 
 
+class VolumePreview(QWidget):
+    """音量包络 + 保留/删除区域预览（数据来自 VolumePyramid）"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(64)
+        self.pyramid = None
+        self.segments = []
+
+    def set_data(self, pyramid, segments):
+        self.pyramid = pyramid
+        self.segments = segments
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        w, h = self.width(), self.height()
+        painter.fillRect(0, 0, w, h, QColor("#1a1a1a"))
+        if self.pyramid is None or self.pyramid.duration <= 0:
+            return
+
+        # 删除区域为底色，保留区域高亮
+        scale = w / self.pyramid.duration
+        for start, end in self.segments:
+            x = int(start * scale)
+            painter.fillRect(x, 0, max(1, int(end * scale) - x), h, QColor("#1f3a22"))
+
+        # 每列一条 min-max 竖线
+        mins, maxs, _ = self.pyramid.envelope(w)
+        peak = float(maxs.max()) if len(maxs) else 0.0
+        if peak <= 0:
+            return
+        painter.setPen(QColor("#4CAF50"))
+        step = w / len(maxs)
+        for i, (lo, hi) in enumerate(zip(mins, maxs)):
+            x = int(i * step)
+            painter.drawLine(x, h - 1 - int(lo / peak * (h - 2)), x, h - 1 - int(hi / peak * (h - 2)))
+
+
+class StripDelegate(QStyledItemDelegate):
+    """文件列表项：左侧缩略图，右侧文件名和时间线条（音量包络 + 保留/删除区域）
+
+    每个文件按当前宽度渲染一次 QPixmap，滚动时只做贴图。缩略图只在
+    列表项第一次绘制时请求，未就绪时显示占位块。
+    """
+
+    STRIP_HEIGHT = 16
+    THUMB_SIZE = QSize(64, 36)
+
+    def __init__(self, strips, thumbnails, request_thumbnail, parent=None):
+        """
+        Args:
+            strips: 路径 -> 时间线条（见 volume_pyramid.load_strip）的字典，由主窗口更新
+            thumbnails: 路径 -> 缩略图 QPixmap 的 LruCache（生成失败为 None）
+            request_thumbnail: 请求后台生成缩略图的回调，参数为路径
+        """
+        super().__init__(parent)
+        self.strips = strips
+        self.thumbnails = thumbnails
+        self.request_thumbnail = request_thumbnail
+        self._pixmaps = {}  # 路径 -> 当前宽度的 QPixmap
+        self._placeholder = QPixmap(self.THUMB_SIZE)
+        self._placeholder.fill(QColor("#151515"))
+
+    def clear(self):
+        self._pixmaps.clear()
+
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        option.displayAlignment = Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop
+        thumb = self.thumbnails.get(index.data(Qt.ItemDataRole.UserRole))
+        option.features |= QStyleOptionViewItem.ViewItemFeature.HasDecoration
+        option.icon = QIcon(thumb or self._placeholder)
+        option.decorationSize = self.THUMB_SIZE
+
+    def sizeHint(self, option, index):
+        size = super().sizeHint(option, index)
+        # 文件名和时间线条上下排列在缩略图右侧
+        stacked = option.fontMetrics.height() + self.STRIP_HEIGHT + 24
+        return QSize(size.width(), max(size.height(), stacked))
+
+    def paint(self, painter, option, index):
+        path = index.data(Qt.ItemDataRole.UserRole)
+        if path not in self.thumbnails:
+            self.request_thumbnail(path)
+        super().paint(painter, option, index)
+
+        rect = option.rect.adjusted(self.THUMB_SIZE.width() + 16, 0, -8, -8)
+        rect.setTop(rect.bottom() - self.STRIP_HEIGHT + 1)
+        if rect.width() <= 0:
+            return
+        if path not in self.strips:
+            painter.fillRect(rect, QColor("#151515"))  # 计算中
+            return
+        pixmap = self._pixmaps.get(path)
+        if pixmap is None or pixmap.width() != rect.width():
+            pixmap = self._render(self.strips[path], rect.width(), rect.height())
+            self._pixmaps[path] = pixmap
+        painter.drawPixmap(rect.topLeft(), pixmap)
+
+    @staticmethod
+    def _render(strip, w, h):
+        pixmap = QPixmap(w, h)
+        pixmap.fill(QColor("#1a1a1a"))
+        if strip is None:
+            return pixmap  # 无音轨
+        painter = QPainter(pixmap)
+        mins, maxs, keep = strip
+        step = len(maxs) / w
+        for x in range(w):
+            i = int(x * step)
+            if keep[i]:
+                painter.fillRect(x, 0, 1, h, QColor("#1f3a22"))
+            painter.setPen(QColor("#4CAF50") if keep[i] else QColor("#555555"))
+            painter.drawLine(x, h - 1 - int(mins[i] * (h - 2)), x, h - 1 - int(maxs[i] * (h - 2)))
+        painter.end()
+        return pixmap
+
+
 class SettingsDialog(QDialog):
     """设置对话框"""
 
+    # 后台线程加载音量金字塔完成（文件路径, VolumePyramid 或 None）
+    pyramid_loaded = pyqtSignal(str, object)
+
     def __init__(self, parent=None, lang='en'):
         super().__init__(parent)
         self.lang = lang
         self.setModal(True)
-        self.resize(480, 520)
+        self.resize(480, 620)
+        self.preview_file = None
+        self.pyramid = None
+        self.pyramid_loaded.connect(self._on_pyramid_loaded)
 
         # 深灰色主题
         self.setStyleSheet("""
@@ -206,6 +372,7 @@ class SettingsDialog(QDialog):
         self.threshold.setValue(0.01)
         self.threshold.setSingleStep(0.001)
         self.threshold.setDecimals(3)
+        self.threshold.valueChanged.connect(self.update_preview)
         basic_grid.addWidget(self.threshold, 0, 1)
 
         self.duration_label = QLabel()
@@ -213,6 +380,7 @@ class SettingsDialog(QDialog):
         self.min_duration = QDoubleSpinBox()
         self.min_duration.setRange(0.5, 60.0)
         self.min_duration.setValue(3.0)
+        self.min_duration.valueChanged.connect(self.update_preview)
         basic_grid.addWidget(self.min_duration, 1, 1)
 
         self.output_label = QLabel()
@@ -222,6 +390,16 @@ class SettingsDialog(QDialog):
 
         layout.addLayout(basic_grid)
 
+        # 阈值预览：调整阈值和最小时长时实时重绘保留区域
+        self.preview_title = QLabel()
+        self.preview_title.setObjectName("sectionTitle")
+        layout.addWidget(self.preview_title)
+        self.preview = VolumePreview()
+        layout.addWidget(self.preview)
+        self.preview_status = QLabel()
+        self.preview_status.setStyleSheet("color: #666666; font-size: 11px;")
+        layout.addWidget(self.preview_status)
+
         # 分割线
         sep1 = QLabel()
         sep1.setObjectName("separator")
@@ -283,17 +461,31 @@ class SettingsDialog(QDialog):
         self.preset.setCurrentText("fast")
         adv_grid.addWidget(self.preset, 1, 1)
 
+        # 导出模式
+        self.export_mode_label = QLabel()
+        adv_grid.addWidget(self.export_mode_label, 2, 0)
+        self.export_mode = QComboBox()
+        adv_grid.addWidget(self.export_mode, 2, 1)
+
         # 排序方式
         self.sort_method_label = QLabel()
-        adv_grid.addWidget(self.sort_method_label, 2, 0)
+        adv_grid.addWidget(self.sort_method_label, 3, 0)
         self.sort_method = QComboBox()
-        adv_grid.addWidget(self.sort_method, 2, 1)
+        adv_grid.addWidget(self.sort_method, 3, 1)
 
         # 排序顺序
         self.sort_order_label = QLabel()
-        adv_grid.addWidget(self.sort_order_label, 3, 0)
+        adv_grid.addWidget(self.sort_order_label, 4, 0)
         self.sort_reverse = QCheckBox()
-        adv_grid.addWidget(self.sort_reverse, 3, 1)
+        adv_grid.addWidget(self.sort_reverse, 4, 1)
+
+        # 分析缓存
+        self.cache_label = QLabel()
+        adv_grid.addWidget(self.cache_label, 5, 0)
+        self.clear_cache_btn = QPushButton()
+        self.clear_cache_btn.setObjectName("cancelButton")
+        self.clear_cache_btn.clicked.connect(self.clear_cache)
+        adv_grid.addWidget(self.clear_cache_btn, 5, 1)
 
         layout.addLayout(adv_grid)
 
@@ -326,6 +518,8 @@ class SettingsDialog(QDialog):
         self.threshold_label.setText(t['silence_threshold'])
         self.duration_label.setText(t['min_duration'])
         self.output_label.setText(t['output_file'])
+        self.preview_title.setText(t['preview'])
+        self.update_preview()
 
         self.ai_title.setText(t['ai_enhancements'])
         self.vad_label.setText(t['vad'])
@@ -335,8 +529,12 @@ class SettingsDialog(QDialog):
         self.adv_title.setText(t['advanced_settings'])
         self.encoder_label.setText(t['encoder'])
         self.preset_label.setText(t['preset'])
+        self.export_mode_label.setText(t['export_mode'])
         self.sort_method_label.setText(t['sort_method'])
         self.sort_order_label.setText(t['sort_descending'])
+        self.cache_label.setText(t['analysis_cache'])
+        if self.isVisible():  # 否则在显示时刷新（见 showEvent），启动时不扫描缓存目录
+            self.update_cache_size()
 
         self.cancel_btn.setText(t['cancel'])
         self.ok_btn.setText(t['apply'])
@@ -357,6 +555,13 @@ class SettingsDialog(QDialog):
         else:
             self.codec.addItems(["libx264 (CPU)", t['auto_detect'], "h264_nvenc (GPU)"])
 
+        # 更新导出模式
+        current_mode = self.export_mode.currentData() or 'reencode'
+        self.export_mode.clear()
+        for mode_id, mode_info in EXPORT_MODES.items():
+            self.export_mode.addItem(mode_info.get(f'name_{lang}', mode_info['name_zh']), mode_id)
+        self.export_mode.setCurrentIndex(max(0, self.export_mode.findData(current_mode)))
+
         # 更新排序方法
         current_sort = self.sort_method.currentData()
         self.sort_method.clear()
@@ -376,6 +581,31 @@ class SettingsDialog(QDialog):
             if idx >= 0:
                 self.sort_method.setCurrentIndex(idx)
 
+    @staticmethod
+    def _caches():
+        # PCM 旁路文件和时间线条缓存所在模块依赖 numpy，用到时才导入
+        from audio_analysis import default_pcm_cache
+        from volume_pyramid import default_strip_cache
+        return [default_cache(), default_segment_cache(), default_pcm_cache(),
+                default_strip_cache(), default_thumbnail_cache()]
+
+    def update_cache_size(self):
+        """刷新缓存大小显示"""
+        t = TRANSLATIONS[self.lang]
+        size_mb = sum(cache.size() for cache in self._caches()) / 1024 / 1024
+        self.clear_cache_btn.setText(t['clear_cache'].format(size_mb))
+
+    def clear_cache(self):
+        """清除分析缓存、增量导出的片段缓存、PCM 旁路文件、时间线条和缩略图"""
+        t = TRANSLATIONS[self.lang]
+        freed = sum(cache.clear() for cache in self._caches())
+        self.update_cache_size()
+        QMessageBox.information(self, t['complete'], t['cache_cleared'].format(freed / 1024 / 1024))
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_cache_size()
+
     def get_config(self):
         """获取配置"""
         t = TRANSLATIONS[self.lang]
@@ -388,6 +618,7 @@ class SettingsDialog(QDialog):
             'enable_face': self.enable_face.currentText() == t['enabled'],
             'codec': self.codec.currentText(),
             'preset': self.preset.currentText(),
+            'export_mode': self.export_mode.currentData() or 'reencode',
             'sort_method': self.sort_method.currentData(),
             'sort_reverse': self.sort_reverse.isChecked(),
         }
@@ -396,16 +627,75 @@ class SettingsDialog(QDialog):
         """设置输出文件路径"""
         self.output_file.setText(path)
 
+    def set_preview_file(self, path):
+        """设置预览的文件，在后台线程读取（或分析）其音量序列"""
+        if path == self.preview_file:
+            return
+        self.preview_file = path
+        self.pyramid = None
+        self.update_preview()
+        if path:
+            threading.Thread(target=self._load_pyramid, args=(path,), daemon=True).start()
+
+    def _load_pyramid(self, path):
+        from volume_pyramid import load_volume_pyramid
+
+        try:
+            pyramid = load_volume_pyramid(path, analysis_options()['window_size'])
+        except Exception as e:
+            print(f"预览分析失败 {path}: {e}")
+            pyramid = None
+        self.pyramid_loaded.emit(path, pyramid)
+
+    def _on_pyramid_loaded(self, path, pyramid):
+        if path != self.preview_file:
+            return  # 已切换到其他文件
+        self.pyramid = pyramid
+        if pyramid is None:
+            self.preview_file = None  # 允许重新尝试
+            self.preview.set_data(None, [])
+            self.preview_status.setText(
+                TRANSLATIONS[self.lang]['preview_no_audio'].format(Path(path).name))
+            return
+        self.update_preview()
+
+    def update_preview(self):
+        """用当前阈值和最小时长重新分段并重绘（不解码，毫秒级）"""
+        t = TRANSLATIONS[self.lang]
+        if not self.preview_file:
+            self.preview.set_data(None, [])
+            self.preview_status.setText(t['preview_empty'])
+            return
+        name = Path(self.preview_file).name
+        if self.pyramid is None:
+            self.preview.set_data(None, [])
+            self.preview_status.setText(t['preview_loading'].format(name))
+            return
+        options = analysis_options()
+        segments = self.pyramid.segments(self.threshold.value(), self.min_duration.value(),
+                                         options['smoothing'], options['padding'])
+        self.preview.set_data(self.pyramid, segments)
+        kept = sum(end - start for start, end in segments)
+        self.preview_status.setText(
+            t['preview_summary'].format(name, kept, self.pyramid.duration, len(segments)))
+
 
 class ModernMainWindow(QMainWindow):
     """主窗口"""
 
+    strip_ready = pyqtSignal(str, object, object)
+    thumbnail_ready = pyqtSignal(str, object)
+    files_sorted = pyqtSignal(object, object)
+
     def __init__(self):
         super().__init__()
         self.lang = 'zh'  # 默认中文
         self.setGeometry(100, 100, 720, 640)
         self.setAcceptDrops(True)
 
+        # 编码器探测和模块预加载在窗口首次绘制后再开始
+        QTimer.singleShot(0, self.start_background_work)
+
         # 深灰色主题
         self.setStyleSheet("""
             QMainWindow {
@@ -592,6 +882,24 @@ class ModernMainWindow(QMainWindow):
         # 连接拖拽完成信号
         self.file_list.model().rowsMoved.connect(self.on_rows_moved)
 
+        # 每个文件的时间线条在后台计算并缓存到磁盘，列表只贴图
+        self.strips = {}
+        self._strip_params = None
+        self._strip_pending = set()
+        self._strip_pool = ThreadPoolExecutor(max_workers=STRIP_WORKERS)
+        self.strip_ready.connect(self._on_strip_ready)
+
+        # 缩略图：列表项首次绘制时在后台截帧（磁盘缓存），内存中只保留最近显示的
+        self.thumbnails = LruCache(THUMB_MEMORY_ITEMS)
+        self._thumb_pending = set()
+        self._thumb_pool = ThreadPoolExecutor(max_workers=THUMB_WORKERS)
+        self.thumbnail_ready.connect(self._on_thumbnail_ready)
+        self.files_sorted.connect(self._on_files_sorted)
+
+        self.file_list.setItemDelegate(StripDelegate(self.strips, self.thumbnails,
+                                                     self.request_thumbnail, self.file_list))
+        self.file_list.setUniformItemSizes(True)
+
         main_layout.addWidget(self.file_list, 1)
 
         # 重新排序按钮
@@ -636,6 +944,13 @@ class ModernMainWindow(QMainWindow):
         # 更新语言
         self.update_language(self.lang)
 
+    def start_background_work(self):
+        """事件循环开始（窗口已绘制）后启动的后台任务"""
+        # 探测可用编码器（结果按 ffmpeg 版本缓存），「自动检测」时直接使用
+        default_registry().start()
+        # 预加载处理流程的重量级模块（numpy、MoviePy 等），开始处理时无需等待导入
+        threading.Thread(target=preload, daemon=True).start()
+
     def setup_shortcuts(self):
         """设置快捷键"""
         QShortcut(QKeySequence("Ctrl+O"), self).activated.connect(self.select_files)
@@ -687,7 +1002,13 @@ class ModernMainWindow(QMainWindow):
             output_path = last_file.parent / output_name
             self.settings_dialog.set_output_file(str(output_path))
 
+        # 预览选中的文件（未选中时预览第一个）
+        selected = self.file_list.selectedItems()
+        row = self.file_list.row(selected[0]) if selected else 0
+        self.settings_dialog.set_preview_file(self.files[row] if self.files else None)
+
         self.settings_dialog.exec()
+        self.request_strips()  # 阈值或最小时长可能已改变
 
     def select_files(self):
         """选择文件"""
@@ -704,14 +1025,20 @@ class ModernMainWindow(QMainWindow):
     def add_files(self, files):
         """添加文件"""
         t = TRANSLATIONS[self.lang]
+        new_files = []
         for file in files:
             if file not in self.files and Path(file).suffix.lower() in ['.mp4', '.avi', '.mov', '.mkv']:
                 self.files.append(file)
+                new_files.append(file)
+
+        # 后台并行读取元数据（写入磁盘缓存），之后按时长排序时无需再等待；
+        # 当前就是按时长排序时由 apply_sort 在后台读取
+        if new_files and self.settings_dialog.get_config().get('sort_method') != 'duration':
+            threading.Thread(target=probe_many, args=(new_files,), daemon=True).start()
 
         if self.files:
-            # 使用配置的排序方法
-            self.sort_files()
-            self.refresh_file_list()
+            # 使用配置的排序方法（列表立即显示，不等待任何解码或探测）
+            self.apply_sort()
             self.btn.setEnabled(True)
             self.btn.setText(t['start_processing'])
             self.status.setText(t['files_selected'].format(len(self.files)))
@@ -722,6 +1049,37 @@ class ModernMainWindow(QMainWindow):
             output_path = last_file.parent / output_name
             self.settings_dialog.set_output_file(str(output_path))
 
+    def apply_sort(self):
+        """按配置排序并刷新列表
+
+        按时长排序需要读取元数据：先按当前顺序显示，后台读取完成后再重排。
+        """
+        config = self.settings_dialog.get_config()
+        if config.get('sort_method') == 'duration':
+            snapshot = list(self.files)
+            threading.Thread(target=self._sort_in_background,
+                             args=(snapshot, config.get('sort_reverse', False)),
+                             daemon=True).start()
+        else:
+            self.sort_files()
+        self.refresh_file_list()
+
+    def _sort_in_background(self, snapshot, reverse):
+        try:
+            ordered = sort_files(snapshot, method='duration', reverse=reverse)
+        except Exception as e:
+            print(f"排序失败: {e}")
+            return
+        self.files_sorted.emit(snapshot, ordered)
+
+    def _on_files_sorted(self, snapshot, ordered):
+        # 期间列表有变化（添加、删除、拖动）时放弃，由之后的排序处理
+        if self.files != snapshot or self.settings_dialog.get_config().get('sort_method') != 'duration':
+            return
+        if ordered != self.files:
+            self.files = ordered
+            self.refresh_file_list()
+
     def sort_files(self):
         """根据配置排序文件"""
         config = self.settings_dialog.get_config()
@@ -740,13 +1098,80 @@ class ModernMainWindow(QMainWindow):
         self.file_list.clear()
         for file in self.files:
             item = QListWidgetItem(Path(file).name)
+            item.setData(Qt.ItemDataRole.UserRole, file)
             self.file_list.addItem(item)
+        self.request_strips()
+
+    def request_strips(self):
+        """在后台读取（或计算）尚未就绪的时间线条"""
+        config = self.settings_dialog.get_config()
+        params = (config['threshold'], config['min_duration'])
+        if params != self._strip_params:
+            # 分段参数改变：保留/删除区域需要重算（音量序列仍命中分析缓存）
+            self._strip_params = params
+            self.strips.clear()
+            self._strip_pending.clear()
+            self.file_list.itemDelegate().clear()
+            self.file_list.viewport().update()
+        for file in self.files:
+            if file not in self.strips and file not in self._strip_pending:
+                self._strip_pending.add(file)
+                self._strip_pool.submit(self._load_strip, file, params)
+
+    def _load_strip(self, path, params):
+        from volume_pyramid import load_strip
+
+        if params != self._strip_params:
+            return  # 排队期间参数已改变
+        options = analysis_options()
+        try:
+            strip = load_strip(path, params[0], params[1], options['window_size'],
+                               options['smoothing'], options['padding'])
+        except Exception as e:
+            print(f"时间线条生成失败 {path}: {e}")
+            strip = None
+        self.strip_ready.emit(path, params, strip)
+
+    def request_thumbnail(self, path):
+        """在后台生成（或从磁盘缓存读取）缩略图，由列表项绘制时调用"""
+        if path in self._thumb_pending:
+            return
+        self._thumb_pending.add(path)
+        self._thumb_pool.submit(self._load_thumbnail, path)
+
+    def _load_thumbnail(self, path):
+        try:
+            data = default_thumbnail_cache().load(path)
+        except Exception as e:
+            print(f"缩略图生成失败 {path}: {e}")
+            data = None
+        self.thumbnail_ready.emit(path, data)
+
+    def _on_thumbnail_ready(self, path, data):
+        # QPixmap 只能在界面线程创建；解码和缩放各做一次
+        self._thumb_pending.discard(path)
+        pixmap = None
+        if data:
+            pixmap = QPixmap()
+            if pixmap.loadFromData(data):
+                pixmap = pixmap.scaled(StripDelegate.THUMB_SIZE, Qt.AspectRatioMode.KeepAspectRatio,
+                                       Qt.TransformationMode.SmoothTransformation)
+            else:
+                pixmap = None
+        self.thumbnails.put(path, pixmap)
+        self.file_list.viewport().update()
+
+    def _on_strip_ready(self, path, params, strip):
+        if params != self._strip_params:
+            return
+        self._strip_pending.discard(path)
+        self.strips[path] = strip
+        self.file_list.viewport().update()
 
     def resort_files(self):
         """重新排序文件"""
         if self.files:
-            self.sort_files()
-            self.refresh_file_list()
+            self.apply_sort()
             t = TRANSLATIONS[self.lang]
             self.status.setText(t['files_selected'].format(len(self.files)))
 
@@ -755,13 +1180,7 @@ class ModernMainWindow(QMainWindow):
         # 重建 files 列表以匹配当前 UI 显示顺序
         new_files = []
         for i in range(self.file_list.count()):
-            item = self.file_list.item(i)
-            filename = item.text()
-            # 从原 files 列表中找到匹配的完整路径
-            for filepath in self.files:
-                if Path(filepath).name == filename:
-                    new_files.append(filepath)
-                    break
+            new_files.append(self.file_list.item(i).data(Qt.ItemDataRole.UserRole))
 
         self.files = new_files
 
@@ -796,6 +1215,12 @@ class ModernMainWindow(QMainWindow):
         if event.mimeData().hasUrls():
             event.acceptProposedAction()
 
+    def closeEvent(self, event):
+        # 不等待排队中的时间线条和缩略图任务
+        self._strip_pool.shutdown(wait=False, cancel_futures=True)
+        self._thumb_pool.shutdown(wait=False, cancel_futures=True)
+        super().closeEvent(event)
+
     def dropEvent(self, event):
         files = [url.toLocalFile() for url in event.mimeData().urls()]
         self.add_files(files)
@@ -816,9 +1241,9 @@ class ModernMainWindow(QMainWindow):
         # 获取编码器
         codec_map = {
             "libx264 (CPU)": "libx264",
-            "Auto Detect": self._detect_gpu(),
+            "Auto Detect": "auto",  # 由处理线程通过编码器注册表解析
             "h264_nvenc (GPU)": "h264_nvenc",
-            "自动检测": self._detect_gpu(),
+            "自动检测": "auto",
         }
         codec = codec_map.get(config['codec'], "libx264")
 
@@ -833,26 +1258,13 @@ class ModernMainWindow(QMainWindow):
             False, 0.02, 5.0,
             config['enable_vad'],
             config['enable_scene'],
-            config['enable_face']
+            config['enable_face'],
+            export_mode=config['export_mode']
         )
         self.thread.progress.connect(self.update_progress)
         self.thread.finished.connect(self.process_finished)
         self.thread.start()
 
-    def _detect_gpu(self):
-        import subprocess
-        try:
-            result = subprocess.run(
-                ["ffmpeg", "-f", "lavfi", "-i", "nullsrc=s=256x256:d=1", "-c:v", "h264_nvenc", "-f", "null", "-"],
-                capture_output=True,
-                timeout=5
-            )
-            if result.returncode == 0:
-                return "h264_nvenc"
-        except:
-            pass
-        return "libx264"
-
     def update_progress(self, current, total, name):
         t = TRANSLATIONS[self.lang]
         self.progress.setValue(current)
@@ -861,7 +1273,8 @@ class ModernMainWindow(QMainWindow):
 
     def process_finished(self, message):
         t = TRANSLATIONS[self.lang]
-        self.status.setText(message)
+        # 状态栏只显示首行，耗时报告在完成对话框中显示
+        self.status.setText(message.splitlines()[0])
         self.btn.setEnabled(True)
         self.btn.setText(t['start_processing'])
         if "完成" in message or "成功" in message.lower() or "complete" in message.lower():
@@ -869,6 +1282,8 @@ class ModernMainWindow(QMainWindow):
 
 
 def main():
+    import multiprocessing
+    multiprocessing.freeze_support()  # PyInstaller 打包后子进程分析需要
     app = QApplication([])
     font = QFont("Segoe UI", 10)
     app.setFont(font)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""性能剖析 - 分阶段输出 cProfile 与采样火焰图数据
+
+启用方式：
+    kooix-cut-cli ... --profile          命令行
+    kooix-cut ./videos out.mp4 --profile 经典命令行
+    KOOIX_CUT_PROFILE=1                  GUI（包括 PyInstaller 打包版）；
+                                         值为目录时写到该目录
+
+每个阶段（每个文件的分析、导出）输出两个文件到 <输出>.profile/ 目录：
+    <阶段>.pstats     cProfile 确定性剖析，可用 `python -m pstats` 或 snakeviz 查看
+    <阶段>.collapsed  采样线程定时抓取调用栈的折叠格式（每行 "栈;帧 次数"），
+                      可直接交给 flamegraph.pl / speedscope / inferno 生成火焰图
+
+同一进程内同时只剖析一个阶段：Python 3.12 起 cProfile 基于进程级的
+sys.monitoring，两个实例同时 enable 会抛出 ValueError。因此 kooix-cut-cli --jobs N
+剖析时，各任务的导出阶段依次执行（分析在工作进程中，不受影响）。
+"""
+import cProfile
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+# GUI 使用的环境变量
+PROFILE_ENV = "KOOIX_CUT_PROFILE"
+
+# 采样间隔（秒）
+SAMPLE_INTERVAL = 0.005
+
+# 同一进程内的剖析阶段串行执行（可重入：嵌套阶段只采样，不重复启用 cProfile）
+_profile_lock = threading.RLock()
+
+
+def profile_dir_for(output, setting=True):
+    """剖析输出目录
+
+    Args:
+        output: 输出视频路径
+        setting: True 或 "1"/"true"/"yes" 表示输出文件旁的 <输出>.profile/，
+                 其他非空字符串视为目录；假值表示不剖析
+
+    Returns:
+        目录路径字符串，或 None
+    """
+    if not setting:
+        return None
+    if setting is True or str(setting).strip().lower() in ("1", "true", "yes", "on"):
+        return str(Path(output).with_suffix(".profile"))
+    return str(setting)
+
+
+def profile_dir_from_env(output):
+    """按环境变量 KOOIX_CUT_PROFILE 决定剖析输出目录（未设置返回 None）"""
+    value = os.environ.get(PROFILE_ENV, "").strip()
+    if value.lower() in ("", "0", "false", "no", "off"):
+        return None
+    return profile_dir_for(output, value)
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """后台线程定时采样调用栈，统计折叠栈
+
+    采样目标线程，以及采样开始后新启动的线程（阶段内的线程池，如并行导出、
+    并行探测）；后者的栈以 "[线程名]" 为根，在火焰图中单独成列。
+    """
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._existing = set()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == self._thread.ident:
+                    continue
+                if ident != self.thread_id and ident in self._existing:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                if stack and ident != self.thread_id:
+                    stack.append(f"[{names.get(ident, ident)}]")
+                if stack:
+                    self.counts[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._existing = set(sys._current_frames())
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def profiled(directory, name, interval=SAMPLE_INTERVAL):
+    """在剖析下运行一个阶段（directory 为 None 时不剖析）
+
+    Args:
+        directory: 输出目录
+        name: 阶段名（用作文件名）
+        interval: 采样间隔（秒）
+    """
+    if not directory:
+        yield
+        return
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    stem = re.sub(r"[^\w.-]+", "_", name)
+
+    with _profile_lock:
+        sampler = StackSampler(threading.get_ident(), interval)
+        profiler = cProfile.Profile()
+        sampler.start()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # 已有其他剖析器（嵌套阶段、调试器）时只输出采样结果
+            print(f"cProfile 不可用，只采样调用栈: {e}")
+            profiler = None
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            sampler.stop()
+            try:
+                if profiler is not None:
+                    profiler.dump_stats(str(directory / f"{stem}.pstats"))
+                sampler.write(directory / f"{stem}.collapsed")
+            except OSError as e:
+                print(f"写入剖析结果失败: {e}")
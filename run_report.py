@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""运行报告 - 分阶段计时与吞吐统计
+
+检测流程的各阶段（打开文件、音频/视频解码、各检测器、片段组合、导出）用
+stage() 包裹，记录墙钟时间、CPU 时间（含 ffmpeg 子进程）和读写字节数。
+阶段可以嵌套，记录的是扣除子阶段后的独占时间，各阶段相加即为总耗时。
+
+没有激活记录器时 stage() 不做任何记录，检测函数可以照常单独调用。
+分析在工作进程中运行，每个文件的 StageRecorder 序列化后传回父进程，
+汇总到 RunReport，最终输出 JSON：
+
+    {"wall", "cpu", "media_seconds", "x_realtime",
+     "stages": {阶段: {...}}, "files": [{"path", "stages": {...}, ...}], "run": {...}}
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import resource
+
+    def _children_cpu():
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return usage.ru_utime + usage.ru_stime
+except ImportError:  # Windows 无法统计子进程 CPU 时间
+    def _children_cpu():
+        return 0.0
+
+# 报告格式变更时递增
+REPORT_VERSION = 1
+
+# 每个线程当前的记录器
+_local = threading.local()
+
+
+def _cpu_now():
+    # 当前线程的 CPU 时间 + 已结束子进程（ffmpeg）的 CPU 时间
+    return time.thread_time() + _children_cpu()
+
+
+def _empty_stage():
+    return {"wall": 0.0, "cpu": 0.0, "bytes_read": 0, "bytes_written": 0, "calls": 0}
+
+
+def _merge_stage(into, stage):
+    for field in ("wall", "cpu", "bytes_read", "bytes_written", "calls"):
+        into[field] += stage[field]
+
+
+def _with_rate(stage, media_seconds):
+    """附加实时倍速（素材时长 / 墙钟时间）"""
+    out = dict(stage)
+    out["x_realtime"] = round(media_seconds / stage["wall"], 2) if stage["wall"] > 0 else None
+    return out
+
+
+class StageRecorder:
+    """一个文件（或一次导出）的分阶段计时"""
+
+    def __init__(self):
+        self.stages = {}
+        self.media_seconds = 0.0
+        self._stack = []
+
+    def add(self, name, wall, cpu, bytes_read=0, bytes_written=0):
+        entry = self.stages.setdefault(name, _empty_stage())
+        _merge_stage(entry, {"wall": wall, "cpu": max(0.0, cpu), "bytes_read": bytes_read,
+                             "bytes_written": bytes_written, "calls": 1})
+
+    def to_dict(self):
+        return {"media_seconds": self.media_seconds, "stages": self.stages}
+
+
+class Stage:
+    """进行中的阶段；调用方可填写 bytes_read / bytes_written"""
+
+    def __init__(self):
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.child_wall = 0.0
+        self.child_cpu = 0.0
+
+
+@contextmanager
+def recording(recorder):
+    """在当前线程中把 stage() 记录到 recorder"""
+    previous = getattr(_local, "recorder", None)
+    _local.recorder = recorder
+    try:
+        yield recorder
+    finally:
+        _local.recorder = previous
+
+
+@contextmanager
+def stage(name):
+    """计时一个阶段（没有激活的记录器时不记录）
+
+    Yields:
+        Stage，可设置 bytes_read / bytes_written
+    """
+    recorder = getattr(_local, "recorder", None)
+    current = Stage()
+    if recorder is None:
+        yield current
+        return
+
+    recorder._stack.append(current)
+    wall0, cpu0 = time.perf_counter(), _cpu_now()
+    try:
+        yield current
+    finally:
+        wall, cpu = time.perf_counter() - wall0, _cpu_now() - cpu0
+        recorder._stack.pop()
+        if recorder._stack:
+            parent = recorder._stack[-1]
+            parent.child_wall += wall
+            parent.child_cpu += cpu
+        recorder.add(name, wall - current.child_wall, cpu - current.child_cpu,
+                     current.bytes_read, current.bytes_written)
+
+
+def timed(func, name):
+    """包装函数，每次调用计入阶段 name（没有激活的记录器时原样返回）"""
+    if getattr(_local, "recorder", None) is None:
+        return func
+
+    def wrapper(*args, **kwargs):
+        with stage(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def set_media_seconds(seconds):
+    """记录当前文件的素材时长（用于计算实时倍速）"""
+    recorder = getattr(_local, "recorder", None)
+    if recorder is not None:
+        recorder.media_seconds = float(seconds or 0.0)
+
+
+def file_size(path):
+    """文件大小（字节），不存在时为 0"""
+    try:
+        return os.path.getsize(path)
+    except (OSError, TypeError):
+        return 0
+
+
+class RunReport:
+    """一次处理任务的运行报告"""
+
+    def __init__(self):
+        self.started = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.files = {}
+        self.run = StageRecorder()  # 任务级阶段（导出）
+        self.info = {}
+        self._wall0 = time.perf_counter()
+        self._cpu0 = _cpu_now()
+        self.wall = None
+
+    def add_file(self, path, data):
+        """合并工作进程传回的单文件计时（StageRecorder.to_dict()）"""
+        self.files[str(path)] = data
+
+    def finish(self):
+        if self.wall is None:
+            self.wall = time.perf_counter() - self._wall0
+        return self
+
+    def totals(self):
+        """各阶段在所有文件和任务级上的合计"""
+        totals = {}
+        for data in list(self.files.values()) + [self.run.to_dict()]:
+            for name, entry in data["stages"].items():
+                _merge_stage(totals.setdefault(name, _empty_stage()), entry)
+        return totals
+
+    def to_dict(self):
+        self.finish()
+        media = sum(data["media_seconds"] for data in self.files.values())
+        totals = self.totals()
+        files = []
+        for path, data in self.files.items():
+            stages = data["stages"]
+            summed = _empty_stage()
+            for entry in stages.values():
+                _merge_stage(summed, entry)
+            summed = _with_rate(summed, data["media_seconds"])
+            summed.pop("calls")
+            files.append(dict(path=path, media_seconds=data["media_seconds"], **summed,
+                              stages={name: _with_rate(entry, data["media_seconds"])
+                                      for name, entry in stages.items()}))
+        run = self.run.to_dict()
+        return {
+            "version": REPORT_VERSION,
+            "started": self.started,
+            "info": self.info,
+            "wall": self.wall,
+            "cpu": sum(entry["cpu"] for entry in totals.values()),
+            "media_seconds": media,
+            "x_realtime": round(media / self.wall, 2) if self.wall else None,
+            "output_seconds": run["media_seconds"],
+            "stages": {name: _with_rate(entry, media) for name, entry in totals.items()},
+            "files": files,
+            "run": {name: _with_rate(entry, run["media_seconds"])
+                    for name, entry in run["stages"].items()},
+        }
+
+    def save(self, path):
+        """写入 JSON 报告"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), indent=2, ensure_ascii=False),
+                        encoding="utf-8")
+        return path
+
+    def summary(self):
+        """可读的摘要（总耗时 + 按耗时排序的各阶段）"""
+        data = self.to_dict()
+        rate = f"，{data['x_realtime']}× 实时" if data["x_realtime"] else ""
+        lines = [f"总耗时 {data['wall']:.1f}s（CPU {data['cpu']:.1f}s），"
+                 f"素材 {data['media_seconds']:.1f}s{rate}"]
+        stages = sorted(data["stages"].items(), key=lambda kv: -kv[1]["wall"])
+        for name, entry in stages:
+            io = ""
+            if entry["bytes_read"] or entry["bytes_written"]:
+                io = (f"  读 {entry['bytes_read'] / 1e6:.1f}MB"
+                      f"  写 {entry['bytes_written'] / 1e6:.1f}MB")
+            lines.append(f"  {name:<14} {entry['wall']:8.2f}s  CPU {entry['cpu']:8.2f}s{io}")
+        return "\n".join(lines)
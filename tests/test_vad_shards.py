@@ -0,0 +1,72 @@
+"""分片并行 VAD（ai_detect._VADStream）与工作进程数、整段串行 VAD 的一致性
+
+需要 webrtcvad，未安装时跳过。用合成音频（调幅谐波"说话"与逐渐增强的背景噪声交替，
+150 秒，即三个分片），不需要视频素材。
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+pytest.importorskip("webrtcvad")
+
+from ai_detect import VAD_SHARD_SECONDS, VADDetector, vad_frames  # noqa: E402
+
+SAMPLE_RATE = 16000
+DURATION = 150.0
+# 与整段串行 VAD 相比允许不一致的帧比例，以及不一致帧距分片边界的最大距离（秒）
+SERIAL_MISMATCH_RATIO = 0.02
+SERIAL_MISMATCH_SECONDS = 15.0
+
+
+def synthetic_audio(seed=0):
+    t = np.arange(int(SAMPLE_RATE * DURATION)) / SAMPLE_RATE
+    speaking = np.sin(2 * np.pi * t / 7.3) > 0.2
+    voice = (0.3 * np.sin(2 * np.pi * 180 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 4 * t))
+             + 0.15 * np.sin(2 * np.pi * 360 * t))
+    noise = np.random.default_rng(seed).normal(0, 1, len(t)) * (0.01 + 0.02 * t / DURATION)
+    return (speaking * voice + noise).astype(np.float32)
+
+
+def stream_flags(samples, workers, chunk_seconds=7.0):
+    stream = VADDetector(workers=workers).create_stream()
+    chunk = int(SAMPLE_RATE * chunk_seconds)
+    for i in range(0, len(samples), chunk):
+        stream.feed(samples[i:i + chunk])
+    return stream.result()
+
+
+def test_vad_shards_independent_of_workers():
+    """分片方式固定，单进程与多进程的逐帧结果完全相同"""
+    samples = synthetic_audio()
+    assert DURATION > 2 * VAD_SHARD_SECONDS
+    serial = stream_flags(samples, workers=1)
+    parallel = stream_flags(samples, workers=2)
+    assert len(serial) == len(parallel) == int(DURATION * 1000 / 30)
+    assert np.array_equal(serial, parallel)
+
+
+def test_vad_shards_close_to_unsharded():
+    """每个分片只用 VAD_WARMUP_SECONDS 预热，与整段串行 VAD 近似而非逐帧相同：
+    不一致的帧不超过 SERIAL_MISMATCH_RATIO，且只出现在分片边界之后
+    SERIAL_MISMATCH_SECONDS 以内"""
+    samples = synthetic_audio()
+    detector = VADDetector(workers=1)
+    frame_length = SAMPLE_RATE * detector.frame_duration // 1000
+    pcm = (samples * 32767).astype(np.int16)
+    pcm = pcm[:len(pcm) // frame_length * frame_length]
+    unsharded = vad_frames(pcm.tobytes(), frame_length, SAMPLE_RATE, detector.mode)
+
+    sharded = stream_flags(samples, workers=1)
+    assert len(sharded) == len(unsharded)
+    mismatch = np.nonzero(sharded != unsharded)[0]
+    assert len(mismatch) <= SERIAL_MISMATCH_RATIO * len(unsharded)
+
+    frame_seconds = detector.frame_duration / 1000
+    since_boundary = (mismatch * frame_seconds) % VAD_SHARD_SECONDS
+    first_shard = mismatch * frame_seconds < VAD_SHARD_SECONDS
+    assert not first_shard.any()
+    assert (since_boundary < SERIAL_MISMATCH_SECONDS).all()
@@ -0,0 +1,27 @@
+"""volume_pyramid.strip_from_pyramid 的边界情况"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from volume_pyramid import VolumePyramid, strip_from_pyramid  # noqa: E402
+
+
+def test_strip_from_empty_volumes():
+    """零时长或音轨解码为空时返回平直的时间线条，而不是抛出 IndexError"""
+    for duration in (0.0, 5.0):
+        strip = strip_from_pyramid(VolumePyramid([], 0.3, duration), [(0.0, duration)], 40)
+        assert strip.shape == (3, 40)
+        assert strip.dtype == np.float32
+        assert not strip[:2].any()
+
+
+def test_strip_from_short_volumes():
+    """窗口数少于列数时按列插值，并按峰值归一化"""
+    pyramid = VolumePyramid([0.0, 0.5, 1.0], 1.0, 3.0)
+    strip = strip_from_pyramid(pyramid, [(1.0, 3.0)], 6)
+    assert strip.shape == (3, 6)
+    assert strip[1].max() == 1.0
+    assert list(strip[2]) == [0, 0, 1, 1, 1, 1]
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""文件列表缩略图 - ffmpeg 单帧定位截取低分辨率封面，内存 LRU + 磁盘缓存
+
+封面取素材 POSTER_FRACTION 处的一帧：-ss 放在 -i 之前，ffmpeg 直接定位到
+附近的关键帧，只解码一两帧，缩放到 THUMB_WIDTH 宽后编码为 JPEG。
+磁盘缓存键为 (路径, 大小, 修改时间)，文件变化后自动重新生成；界面侧用
+按条数限制的 LruCache 只在内存中保留最近显示过的缩略图。
+"""
+from collections import OrderedDict
+
+from analysis_cache import AnalysisCache, default_cache_root
+
+# 缩略图宽度（像素，高度按比例）
+THUMB_WIDTH = 160
+
+# 封面帧在素材中的位置（时长的比例，避开片头黑场）
+POSTER_FRACTION = 0.1
+
+# 单个文件截取超时（秒）
+THUMB_TIMEOUT = 30
+
+# 缩略图磁盘缓存上限（每张约 5KB）
+THUMB_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# 内存中保留的缩略图数
+THUMB_MEMORY_ITEMS = 256
+
+
+def extract_thumbnail(path, width=THUMB_WIDTH, seconds=None):
+    """截取一帧并编码为 JPEG
+
+    Args:
+        path: 视频文件
+        width: 缩略图宽度
+        seconds: 截取位置，默认时长 × POSTER_FRACTION（时长来自元数据缓存）
+
+    Returns:
+        JPEG 字节串
+    """
+    from ffmpeg_tools import run_ffmpeg
+
+    if seconds is None:
+        from media_probe import get_duration
+        seconds = get_duration(path) * POSTER_FRACTION
+
+    def grab(at):
+        return run_ffmpeg([
+            "-ss", f"{at:.3f}", "-i", str(path), "-an", "-sn", "-frames:v", "1",
+            "-vf", f"scale={width}:-2", "-q:v", "5",
+            "-f", "image2pipe", "-vcodec", "mjpeg", "pipe:1",
+        ], timeout=THUMB_TIMEOUT)
+
+    data = grab(seconds)
+    if not data and seconds > 0:
+        data = grab(0.0)  # 时长不准时定位越界，退回第一帧
+    if not data:
+        raise RuntimeError(f"无法截取视频帧: {path}")
+    return data
+
+
+class ThumbnailCache(AnalysisCache):
+    """缩略图的磁盘缓存（.jpg 文件）"""
+
+    suffix = ".jpg"
+
+    def __init__(self, root=None, max_bytes=THUMB_CACHE_MAX_BYTES):
+        super().__init__(root or default_cache_root() / "thumbs", max_bytes)
+
+    def load(self, path, width=THUMB_WIDTH):
+        """读取（或截取并缓存）缩略图 JPEG 字节串"""
+        key = self.key(path, "thumb", [width, POSTER_FRACTION])
+        cached = self.lookup(key)
+        if cached is not None:
+            with open(cached, "rb") as f:
+                return f.read()
+
+        data = extract_thumbnail(path, width)
+        tmp = self.temp_path(key)
+        with open(tmp, "wb") as f:
+            f.write(data)
+        self.store(tmp, key)
+        return data
+
+
+_thumbnail_cache = None
+
+
+def default_thumbnail_cache():
+    """进程内共享的缩略图缓存"""
+    global _thumbnail_cache
+    if _thumbnail_cache is None:
+        _thumbnail_cache = ThumbnailCache()
+    return _thumbnail_cache
+
+
+class LruCache:
+    """按条数限制的内存 LRU（非线程安全，由界面线程使用）"""
+
+    def __init__(self, capacity=THUMB_MEMORY_ITEMS):
+        self.capacity = capacity
+        self._items = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key, default=None):
+        if key not in self._items:
+            return default
+        self._items.move_to_end(key)
+        return self._items[key]
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        self._items.clear()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""时间线 - 只保存片段描述，导出时按需打开源文件
+
+时间线是片段描述列表 [(path, start, end), ...]。MoviePy 导出时不再为每个源
+文件预先创建 VideoFileClip，而是通过 ReaderPool 按需打开读取器：
+同时打开的数量有上限，导出进度越过某个源的最后一个片段后立即关闭。
+
+numpy 和 MoviePy 在构造时间线时才导入，界面启动时导入 export 不会加载它们。
+"""
+from collections import OrderedDict
+
+# 同时打开的读取器默认上限
+READER_POOL_SIZE = 4
+
+# 合成音频的采样率与声道数
+AUDIO_FPS = 44100
+AUDIO_CHANNELS = 2
+
+
+class ReaderPool:
+    """按需打开、有数量上限的读取器池（最近最少使用的先关闭）"""
+
+    def __init__(self, opener, max_open=READER_POOL_SIZE):
+        """
+        Args:
+            opener: 打开读取器的函数 opener(path)，返回有 close() 的对象或 None
+            max_open: 同时打开的最大数量
+        """
+        self.opener = opener
+        self.max_open = max(1, max_open)
+        self.readers = OrderedDict()
+
+    def get(self, path):
+        """返回 path 的读取器，未打开时先打开（必要时关闭最久未用的）"""
+        if path in self.readers:
+            self.readers.move_to_end(path)
+            return self.readers[path]
+        while len(self.readers) >= self.max_open:
+            _, oldest = self.readers.popitem(last=False)
+            if oldest is not None:
+                oldest.close()
+        reader = self.readers[path] = self.opener(path)
+        return reader
+
+    def close(self, path):
+        reader = self.readers.pop(path, None)
+        if reader is not None:
+            reader.close()
+
+    def close_all(self):
+        for path in list(self.readers):
+            self.close(path)
+
+
+class _Cursor:
+    """把时间线上的时间映射到片段，并在越过源文件的最后一个片段后关闭其读取器"""
+
+    def __init__(self, segments, pool):
+        import numpy as np
+
+        self.np = np
+        self.segments = segments
+        self.pool = pool
+        durations = np.array([end - start for _, start, end in segments], dtype=float)
+        self.offsets = np.concatenate([[0.0], np.cumsum(durations)])
+        self.last_use = {path: i for i, (path, _, _) in enumerate(segments)}
+        self.position = 0
+
+    @property
+    def duration(self):
+        return float(self.offsets[-1])
+
+    def index(self, t):
+        """时间 t（标量或数组）所在的片段序号"""
+        i = self.np.searchsorted(self.offsets, t, side='right') - 1
+        return self.np.clip(i, 0, len(self.segments) - 1)
+
+    def advance(self, i):
+        """导出进度到达片段 i：关闭之后不再使用的读取器"""
+        if i <= self.position:
+            return
+        for path, _, _ in self.segments[self.position:i]:
+            if self.last_use[path] < i:
+                self.pool.close(path)
+        self.position = i
+
+    def local_time(self, i, t):
+        _, start, end = self.segments[i]
+        # 不超过片段末尾（避免读到源文件结尾之后）
+        return self.np.minimum(start + (t - self.offsets[i]), end)
+
+
+def _fit_frame(frame, width, height):
+    """等比缩放（最近邻）并居中补黑边到指定尺寸"""
+    import numpy as np
+
+    fh, fw = frame.shape[:2]
+    if (fw, fh) == (width, height):
+        return frame
+    scale = min(width / fw, height / fh)
+    nw, nh = max(1, int(fw * scale)), max(1, int(fh * scale))
+    rows = (np.arange(nh) * fh / nh).astype(int)
+    cols = (np.arange(nw) * fw / nw).astype(int)
+    out = np.zeros((height, width, 3), dtype=frame.dtype)
+    y, x = (height - nh) // 2, (width - nw) // 2
+    out[y:y + nh, x:x + nw] = frame[rows][:, cols]
+    return out
+
+
+def timeline_clip(segments, max_open=READER_POOL_SIZE):
+    """由片段描述构造可直接 write_videofile 的惰性 VideoClip
+
+    视频和音频各自一个读取器池（MoviePy 先完整写音频，再写视频），
+    两者都按时间顺序读取，越过源文件的最后一个片段后关闭读取器。
+    输出分辨率与帧率取第一个片段的源文件，其他分辨率等比缩放补边。
+
+    Args:
+        segments: 片段描述 [(path, start, end), ...]
+        max_open: 每个读取器池同时打开的最大数量
+
+    Returns:
+        (clip, close)：clip 为合成片段，导出完成后调用 close() 释放所有读取器
+    """
+    import numpy as np
+    from moviepy import AudioClip, AudioFileClip, VideoClip, VideoFileClip
+
+    video_pool = ReaderPool(lambda path: VideoFileClip(path, audio=False), max_open)
+    audio_pool = ReaderPool(lambda path: _open_audio(AudioFileClip, path), max_open)
+    video_cursor = _Cursor(segments, video_pool)
+    audio_cursor = _Cursor(segments, audio_pool)
+
+    first = video_pool.get(segments[0][0])
+    width, height = first.size
+    fps = first.fps
+
+    def video_frame(t):
+        i = int(video_cursor.index(t))
+        video_cursor.advance(i)
+        reader = video_pool.get(segments[i][0])
+        return _fit_frame(reader.get_frame(video_cursor.local_time(i, t)), width, height)
+
+    def audio_frame(t):
+        scalar = np.isscalar(t)
+        ts = np.atleast_1d(np.asarray(t, dtype=float))
+        out = np.zeros((len(ts), AUDIO_CHANNELS))
+        indices = audio_cursor.index(ts)
+        for i in np.unique(indices):
+            i = int(i)
+            audio_cursor.advance(i)
+            reader = audio_pool.get(segments[i][0])
+            if reader is None:
+                continue  # 源文件没有音频，保持静音
+            mask = indices == i
+            samples = np.asarray(reader.get_frame(audio_cursor.local_time(i, ts[mask])))
+            samples = samples.reshape(int(mask.sum()), -1)
+            out[mask] = samples if samples.shape[1] == AUDIO_CHANNELS else samples[:, :1]
+        return out[0] if scalar else out
+
+    clip = VideoClip(frame_function=video_frame, duration=video_cursor.duration)
+    clip.fps = fps
+    clip.audio = AudioClip(frame_function=audio_frame, duration=audio_cursor.duration,
+                           fps=AUDIO_FPS)
+
+    def close():
+        video_pool.close_all()
+        audio_pool.close_all()
+
+    return clip, close
+
+
+def _open_audio(audio_file_clip, path):
+    """打开音频读取器，源文件没有音轨时返回 None"""
+    try:
+        return audio_file_clip(path, fps=AUDIO_FPS)
+    except (OSError, KeyError, IndexError, AttributeError):
+        return None
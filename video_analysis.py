@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""视频分析上下文 - 单次解码，多个画面检测器共享"""
+import math
+
+import numpy as np
+
+from run_report import file_size, stage, timed
+
+# 共享采样网格间隔（秒）：采样间隔是它整数倍的检测器共用同一次解码，
+# 并且无论单独运行还是一起运行，都取到完全相同的帧
+GRID_INTERVAL = 0.5
+
+# 抽帧方式或差异度量变更时递增，使旧的静止/场景缓存失效
+SAMPLING_VERSION = 3
+
+
+def strip_width(width, height):
+    """十字条带的半宽（约为短边的 5%）"""
+    return max(2, min(height, width) // 20)
+
+
+def cross_strips(frame):
+    """提取十字条带（中心横竖条带，全分辨率 RGB）"""
+    h, w = frame.shape[:2]
+    h_center = h // 2
+    w_center = w // 2
+    half = strip_width(w, h)
+    # 横条
+    h_strip = frame[h_center - half:h_center + half, :]
+    # 竖条
+    v_strip = frame[:, w_center - half:w_center + half]
+    return np.concatenate([h_strip.ravel(), v_strip.ravel()])
+
+
+def grid_step(interval):
+    """采样间隔在共享网格上的步长，不是网格整数倍时返回 None"""
+    k = int(round(interval / GRID_INTERVAL))
+    if k >= 1 and abs(k * GRID_INTERVAL - interval) < 1e-9:
+        return k
+    return None
+
+
+class StaticDiffAccumulator:
+    """十字条带差异（输入为 cross_strips 的条带像素，次序不影响结果），只保留上一帧"""
+
+    needs = 'strips'
+
+    def __init__(self, n_samples):
+        self.n_samples = n_samples
+        self.prev = None
+        self.diffs = []
+
+    def feed(self, strips, t):
+        sample = strips.ravel().astype(np.int16)
+        if self.prev is not None:
+            self.diffs.append(np.mean(np.abs(sample - self.prev)) / 255.0)
+        self.prev = sample
+
+    def result(self):
+        if not self.diffs:
+            return np.zeros(0)
+        # 末尾帧数不足（ffmpeg 提前结束）时按有变化补齐，保证与采样点数一致，
+        # 且不会把读不到的尾部误判为静止而删除
+        return np.array(self.diffs + [1.0] * (self.n_samples - 1 - len(self.diffs)))
+
+
+class HistogramDiffAccumulator:
+    """相邻帧 RGB 直方图差异（0-200）"""
+
+    needs = 'rgb'
+
+    def __init__(self, n_samples):
+        self.n_samples = n_samples
+        self.prev = None
+        self.diffs = []
+
+    def feed(self, frame, t):
+        # 缩小图像加速
+        small = frame[::4, ::4]
+        hist = np.histogram(small, bins=32, range=(0, 256))[0]
+        hist = hist / hist.sum()
+        if self.prev is not None:
+            self.diffs.append(np.sum(np.abs(hist - self.prev)) * 100)
+        self.prev = hist
+
+    def result(self):
+        return np.array(self.diffs)
+
+
+class FaceAccumulator:
+    """有人脸（且占比足够）的采样时间点"""
+
+    needs = 'rgb'
+
+    def __init__(self, detector, min_face_ratio):
+        import cv2
+        self.cv2 = cv2
+        self.cascade = detector.cascade
+        self.min_face_ratio = min_face_ratio
+        self.face_times = []
+
+    def feed(self, frame, t):
+        gray = self.cv2.cvtColor(frame, self.cv2.COLOR_RGB2GRAY)
+        # 检测人脸
+        faces = self.cascade.detectMultiScale(gray, 1.1, 4)
+        if len(faces) > 0:
+            # 计算人脸占比
+            total_area = sum(w * h for (x, y, w, h) in faces)
+            frame_area = frame.shape[0] * frame.shape[1]
+            if total_area / frame_area >= self.min_face_ratio:
+                self.face_times.append(t)
+
+    def result(self):
+        return self.face_times
+
+
+class VideoAnalysis:
+    """单个文件的画面分析上下文
+
+    各检测器在创建时声明所需的序列（静止差异、场景直方图差异、人脸），
+    首次取结果时在共享采样网格上只解码一次，同一帧分发给所有检测器。
+    ffmpeg 输出全分辨率 RGB 帧；只有静止检测时只输出十字条带，
+    两种方式的条带像素与 get_frame 的原始实现逐像素一致。
+
+    用法:
+        analysis = VideoAnalysis(clip, static_interval=1.0, scene_interval=0.5)
+        diffs = analysis.static_diffs(1.0)      # 触发唯一一次解码
+        hists = analysis.histogram_diffs(0.5)  # 直接复用结果
+    """
+
+    def __init__(self, clip, static_interval=None, scene_interval=None, face_detector=None,
+                 face_interval=1.0, min_face_ratio=0.02, cache=None):
+        """
+        Args:
+            clip: 视频片段
+            static_interval: 静止检测采样间隔（秒），None 表示不需要
+            scene_interval: 场景检测采样间隔（秒），None 表示不需要
+            face_detector: FaceDetector 实例，None 表示不需要人脸检测
+            face_interval: 人脸检测采样间隔（秒）
+            min_face_ratio: 最小人脸占比
+            cache: AnalysisCache 实例，静止/场景序列命中时跳过解码
+        """
+        self.clip = clip
+        self.cache = cache
+        self._pending = {}
+        self._results = {}
+        if static_interval is not None:
+            self._declare_static(static_interval)
+        if scene_interval is not None:
+            self._declare_scene(scene_interval)
+        if face_detector is not None:
+            self._declare_faces(face_detector, face_interval, min_face_ratio)
+
+    def _n_samples(self, interval):
+        return len(np.arange(0, self.clip.duration, interval))
+
+    def _declare(self, key, interval, make):
+        if key not in self._results and key not in self._pending:
+            self._pending[key] = (interval, make)
+        return key
+
+    def _declare_static(self, interval):
+        return self._declare(('static', interval, GRID_INTERVAL, SAMPLING_VERSION), interval,
+                             lambda: StaticDiffAccumulator(self._n_samples(interval)))
+
+    def _declare_scene(self, interval):
+        return self._declare(('scene', interval, GRID_INTERVAL, SAMPLING_VERSION), interval,
+                             lambda: HistogramDiffAccumulator(self._n_samples(interval)))
+
+    def _declare_faces(self, detector, interval, min_face_ratio):
+        key = ('face', id(detector), interval, min_face_ratio)
+        detector.load_model()
+        if detector.cascade is None:
+            self._results.setdefault(key, [])  # 模型不可用，不参与解码
+        return self._declare(key, interval,
+                             lambda: FaceAccumulator(detector, min_face_ratio))
+
+    def static_diffs(self, sample_interval=1.0):
+        """静止检测的相邻帧十字条带差异（0-1）"""
+        if self._n_samples(sample_interval) < 2:
+            return np.zeros(0)
+        return self._get(self._declare_static(sample_interval))
+
+    def histogram_diffs(self, sample_interval=0.5):
+        """场景检测的相邻帧直方图差异（0-200）"""
+        if self._n_samples(sample_interval) < 2:
+            return np.zeros(0)
+        return self._get(self._declare_scene(sample_interval))
+
+    def face_times(self, detector, sample_interval=1.0, min_face_ratio=0.02):
+        """有人脸的采样时间点列表"""
+        return self._get(self._declare_faces(detector, sample_interval, min_face_ratio))
+
+    def _get(self, key):
+        if key not in self._results:
+            self.decode()
+        return self._results[key]
+
+    def decode(self):
+        """执行解码，计算所有已声明但尚未完成的结果"""
+        filename = getattr(self.clip, 'filename', None)
+
+        # 先查磁盘缓存（人脸结果不缓存）
+        cache_keys = {}
+        if self.cache is not None and filename:
+            for key in list(self._pending):
+                if key[0] == 'face':
+                    continue
+                cache_keys[key] = self.cache.key(filename, key[0], list(key[1:]))
+                value = self.cache.get(cache_keys[key])
+                if value is not None:
+                    self._results[key] = value
+                    del self._pending[key]
+
+        # 网格整数倍的检测器共用一次解码，其余各自单独解码；共用解码按各步长的
+        # 最大公约数取最粗的网格（如只有 1 秒间隔的检测器时按 1 秒解码），
+        # 取到的帧与按 GRID_INTERVAL 解码后隔帧取用相同
+        passes = {}
+        grid = [(key, grid_step(interval), interval, make)
+                for key, (interval, make) in self._pending.items()]
+        coarse = math.gcd(*[step for _, step, _, _ in grid if step is not None] or [1])
+        for key, step, interval, make in grid:
+            if step is None:
+                passes.setdefault(interval, []).append((key, 1, interval, make()))
+            else:
+                passes.setdefault(GRID_INTERVAL * coarse, []).append(
+                    (key, step // coarse, interval, make()))
+
+        for base, consumers in passes.items():
+            with stage("video.decode") as st:
+                st.bytes_read = file_size(filename)
+                self._run_pass(base, consumers)
+            for key, _, _, consumer in consumers:
+                self._results[key] = timed(consumer.result, f"video.{key[0]}")()
+                if key in cache_keys:
+                    self.cache.put(cache_keys[key], self._results[key])
+        self._pending = {}
+
+    def _run_pass(self, base, consumers):
+        """按 base 间隔解码一次，第 i 帧分发给步长整除 i 的检测器"""
+        needs = {consumer.needs for _, _, _, consumer in consumers}
+        # 各检测器的计算计入各自的阶段，其余为解码
+        limits = [(step, self._n_samples(interval) * step, interval, consumer.needs,
+                   timed(consumer.feed, f"video.{key[0]}"))
+                  for key, step, interval, consumer in consumers]
+        n_frames = max(limit for _, limit, _, _, _ in limits)
+
+        def dispatch(frames):
+            count = 0
+            for i, (rgb, strips) in enumerate(frames):
+                if i >= n_frames:
+                    break
+                for step, limit, interval, need, feed in limits:
+                    if i % step == 0 and i < limit:
+                        t = (i // step) * interval
+                        feed(strips if need == 'strips' else rgb, t)
+                count += 1
+            return count
+
+        filename = getattr(self.clip, 'filename', None)
+        if filename and dispatch(self._ffmpeg_frames(filename, base, needs)):
+            return
+        if filename:
+            print("ffmpeg 抽帧失败，回退到逐帧读取")
+        # 无源文件时逐帧读取
+        times = np.arange(0, self.clip.duration, base)
+        frames = (self.clip.get_frame(t) for t in times)
+        dispatch(self._with_strips(frames, needs))
+
+    @staticmethod
+    def _with_strips(frames, needs):
+        """(RGB 帧, 十字条带)，不需要条带时为 None"""
+        for rgb in frames:
+            yield rgb, cross_strips(rgb) if 'strips' in needs else None
+
+    def _ffmpeg_frames(self, filename, base, needs):
+        from ffmpeg_tools import iter_cross_strips, iter_video_frames
+
+        width, height = self.clip.size
+        if needs == {'strips'}:
+            # 只有静止检测：ffmpeg 只输出条带，管道数据量约为整帧的 1/10
+            half = strip_width(width, height)
+            return ((None, strips) for strips in
+                    iter_cross_strips(filename, 1.0 / base, width, height, half))
+        return self._with_strips(iter_video_frames(filename, 1.0 / base, width, height,
+                                                   gray=False), needs)
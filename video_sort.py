@@ -3,7 +3,6 @@
 from pathlib import Path
 import re
 from typing import List, Callable
-from moviepy import VideoFileClip
 
 
 def natural_sort_key(text: str) -> List:
@@ -46,16 +45,16 @@ def sort_by_size(files: List[str], reverse: bool = False) -> List[str]:
 def sort_by_duration(files: List[str], reverse: bool = False) -> List[str]:
     """按视频时长排序（从短到长）
 
-    注意: 这个方法较慢，因为需要打开每个视频文件
+    时长由 ffprobe（未安装时解析 ffmpeg 输出）并行读取并按文件缓存（见 media_probe），
+    无法读取的按 0 处理
     """
+    from media_probe import probe_many
+
+    metadata = probe_many(files)
+
     def get_duration(filepath: str) -> float:
-        try:
-            clip = VideoFileClip(filepath)
-            duration = clip.duration
-            clip.close()
-            return duration
-        except:
-            return 0.0
+        meta = metadata.get(filepath)
+        return meta['duration'] if meta else 0.0
 
     return sorted(files, key=get_duration, reverse=reverse)
 
@@ -108,8 +107,8 @@ SORT_METHODS = {
         'name_zh': '视频时长',
         'name_en': 'Video Duration',
         'func': sort_by_duration,
-        'description_zh': '按视频时长排序（较慢，需读取每个视频）',
-        'description_en': 'Sort by video duration (slower, reads each video)'
+        'description_zh': '按视频时长排序（并行读取元数据并缓存）',
+        'description_en': 'Sort by video duration (metadata probed in parallel and cached)'
     }
 }
 
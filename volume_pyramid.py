@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""音量金字塔 - 逐窗口音量的多分辨率 min/max/mean 概要
+
+第 0 层是 compute_audio_volumes 的逐窗口音量序列，之后每层把上一层每
+FACTOR 个值合并为一个（最小、最大、平均）。界面按可用像素宽度选择一层
+绘制波形包络；重新分段直接在第 0 层上进行（见 segments_from_volumes），
+3 小时的素材（约 3.6 万个窗口）也只需几毫秒，拖动阈值时可以实时预览。
+"""
+import numpy as np
+
+from analysis_cache import AnalysisCache, default_cache_root
+
+# 相邻两层的合并倍数
+FACTOR = 4
+
+# 最粗一层的最少窗口数
+MIN_LEVEL_SIZE = 64
+
+
+class VolumePyramid:
+    """逐窗口音量的多分辨率概要"""
+
+    def __init__(self, volumes, window_size, duration):
+        """
+        Args:
+            volumes: 逐窗口音量数组（见 kooix_cut.compute_audio_volumes）
+            window_size: 窗口大小（秒）
+            duration: 素材时长（秒）
+        """
+        self.volumes = np.asarray(volumes, dtype=float)
+        self.window_size = window_size
+        self.duration = duration
+        self.levels = [(self.volumes, self.volumes, self.volumes)]
+        while len(self.levels[-1][0]) >= MIN_LEVEL_SIZE * FACTOR:
+            self.levels.append(self._fold(*self.levels[-1]))
+
+    @staticmethod
+    def _fold(mins, maxs, means):
+        n = len(mins) // FACTOR * FACTOR  # 末尾不足一组的并入最后一组
+        lo = mins[:n].reshape(-1, FACTOR).min(axis=1)
+        hi = maxs[:n].reshape(-1, FACTOR).max(axis=1)
+        avg = means[:n].reshape(-1, FACTOR).mean(axis=1)
+        if n < len(mins):
+            lo[-1] = min(lo[-1], mins[n:].min())
+            hi[-1] = max(hi[-1], maxs[n:].max())
+        return lo, hi, avg
+
+    def envelope(self, columns):
+        """按显示宽度取包络
+
+        选择窗口数不少于 columns 的最粗一层，再按列聚合。
+
+        Args:
+            columns: 列数（像素宽度）
+
+        Returns:
+            (mins, maxs, means)，每个长度为 columns（素材过短时更少）
+        """
+        columns = max(1, int(columns))
+        level = self.levels[0]
+        for candidate in self.levels:
+            if len(candidate[0]) < columns:
+                break
+            level = candidate
+        mins, maxs, means = level
+        if len(mins) <= columns:
+            return mins, maxs, means
+        edges = np.linspace(0, len(mins), columns + 1).astype(int)[:-1]
+        counts = np.diff(np.append(edges, len(mins)))
+        return (np.minimum.reduceat(mins, edges), np.maximum.reduceat(maxs, edges),
+                np.add.reduceat(means, edges) / counts)
+
+    def segments(self, silence_threshold=0.01, min_duration=3.0, smoothing=3, padding=0.5):
+        """用新参数重新分段（与 detect_audio_segments 结果一致，不解码）"""
+        from kooix_cut import segments_from_volumes
+        return segments_from_volumes(self.volumes, self.duration, silence_threshold,
+                                     min_duration, self.window_size, smoothing, padding)
+
+
+def load_volume_pyramid(video_file, window_size=0.3, use_cache=True, pcm_sidecar=False):
+    """读取（或首次分析）视频的音量序列并构建金字塔
+
+    与完整流程使用同一份分析缓存，处理过的文件无需再次解码。
+
+    Returns:
+        VolumePyramid；没有音轨时返回 None
+    """
+    from moviepy import VideoFileClip
+
+    from analysis_cache import default_cache
+    from audio_analysis import AudioAnalysis, default_pcm_cache
+
+    clip = VideoFileClip(str(video_file))
+    try:
+        if clip.audio is None:
+            return None
+        analysis = AudioAnalysis(clip, window_size,
+                                 cache=default_cache() if use_cache else None,
+                                 pcm_cache=default_pcm_cache() if pcm_sidecar else None)
+        return VolumePyramid(analysis.volumes(window_size), window_size, clip.duration)
+    finally:
+        clip.close()
+
+
+# 文件列表时间线条的列数
+STRIP_COLUMNS = 400
+
+# 时间线条缓存上限（每条约 5KB）
+STRIP_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+def strip_from_pyramid(pyramid, segments, columns=STRIP_COLUMNS):
+    """生成文件列表用的时间线条
+
+    Returns:
+        float32 数组，形状 (3, columns)：每列的最小、最大音量（按文件峰值归一化到 0-1）
+        和该列中心是否落在保留片段内（1 保留 / 0 删除）
+    """
+    mins, maxs, _ = pyramid.envelope(columns)
+    if len(mins) == 0:
+        # 零时长或音轨解码不出数据：平直的空波形
+        mins = maxs = np.zeros(columns)
+    else:
+        # 素材过短时按列插值到固定列数
+        positions = np.linspace(0, len(mins) - 1, columns).round().astype(int)
+        mins, maxs = mins[positions], maxs[positions]
+    peak = maxs.max() if len(maxs) else 0.0
+    if peak > 0:
+        mins, maxs = mins / peak, maxs / peak
+
+    centers = (np.arange(columns) + 0.5) * pyramid.duration / columns
+    keep = np.zeros(columns)
+    if segments:
+        starts, ends = np.asarray(segments, dtype=float).T
+        i = np.searchsorted(starts, centers, side='right') - 1
+        keep = (i >= 0) & (centers < ends[np.maximum(i, 0)])
+    return np.vstack([mins, maxs, keep]).astype(np.float32)
+
+
+class StripCache(AnalysisCache):
+    """时间线条的磁盘缓存（键含分段参数，切换回旧参数时直接命中）"""
+
+    def __init__(self, root=None, max_bytes=STRIP_CACHE_MAX_BYTES):
+        super().__init__(root or default_cache_root() / "strips", max_bytes)
+
+
+_strip_cache = None
+
+
+def default_strip_cache():
+    """进程内共享的时间线条缓存"""
+    global _strip_cache
+    if _strip_cache is None:
+        _strip_cache = StripCache()
+    return _strip_cache
+
+
+def load_strip(video_file, silence_threshold=0.01, min_duration=3.0, window_size=0.3,
+               smoothing=3, padding=0.5, columns=STRIP_COLUMNS, cache=None):
+    """读取（或计算并缓存）一个文件的时间线条
+
+    未命中时从分析缓存的音量序列构建（处理过或预览过的文件无需解码）。
+
+    Returns:
+        见 strip_from_pyramid；没有音轨时返回 None
+    """
+    cache = cache or default_strip_cache()
+    key = cache.key(video_file, "strip", [columns, window_size, silence_threshold,
+                                          min_duration, smoothing, padding])
+    strip = cache.get(key)
+    if strip is not None:
+        return strip if strip.size else None
+
+    pyramid = load_volume_pyramid(video_file, window_size)
+    if pyramid is None:
+        cache.put(key, np.zeros((0,), dtype=np.float32))  # 记录“无音轨”，下次不再解码
+        return None
+    segments = pyramid.segments(silence_threshold, min_duration, smoothing, padding)
+    strip = strip_from_pyramid(pyramid, segments, columns)
+    cache.put(key, strip)
+    return strip
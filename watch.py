@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""监视文件夹 - 持续处理新录制的视频
+
+新文件写入完成（大小和修改时间在 settle 秒内不再变化）后，逐个用完整流程
+（engine.run_job）分析并导出为 <输出目录>/<文件名>_cut.mp4（包含子目录时按
+相对路径放在输出目录的同名子目录下）。处理结果记录在台账文件中，重启后不会
+重复处理；文件被修改后会重新处理。
+
+默认定时轮询目录；安装可选依赖 watchdog（pip install "kooix-cut[watch]"）后
+使用系统文件事件（inotify 等）。同时运行的任务数和分析进程数都有上限，
+导出线程按任务数平分 CPU 核数，大量文件同时到达时排队处理。
+
+    kooix-cut-watch /mnt/recordings -o /mnt/cut --jobs 2 --vad
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+
+from engine import VIDEO_EXTENSIONS
+
+LEDGER_NAME = ".kooix-cut-ledger.json"
+
+
+class Ledger:
+    """处理台账（JSON），记录每个源文件的身份与处理结果"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        try:
+            self.entries = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def _identity(st):
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    def is_handled(self, path, st):
+        """该文件（同一大小和修改时间）是否已处理过（成功或失败）"""
+        with self.lock:
+            entry = self.entries.get(str(path))
+        return bool(entry) and all(entry.get(k) == v for k, v in self._identity(st).items())
+
+    def record(self, path, st, status, **extra):
+        with self.lock:
+            self.entries[str(path)] = dict(self._identity(st), status=status,
+                                           time=time.strftime("%Y-%m-%dT%H:%M:%S"), **extra)
+            self._save()
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(self.entries, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+class FolderWatcher:
+    """监视目录并按到达顺序处理稳定的视频文件"""
+
+    def __init__(self, folder, output_dir=None, options=None, export_kwargs=None, jobs=1,
+                 workers=None, settle=10.0, poll_interval=5.0, recursive=False, ledger=None):
+        """
+        Args:
+            folder: 监视目录
+            output_dir: 输出目录，默认 <folder>/cut
+            options: 分析参数（见 engine.analysis_options）
+            export_kwargs: 传给 engine.run_job 的导出参数（codec、preset、export_mode；
+                           threads 默认 CPU 核数 / jobs）
+            jobs: 同时处理的文件数
+            workers: 分析进程数（所有任务共用），默认 CPU 核数
+            settle: 文件大小和修改时间保持不变多久（秒）后视为写入完成
+            poll_interval: 轮询间隔（秒）；使用 watchdog 时只用于补充检查
+            recursive: 是否包含子目录
+            ledger: 台账文件路径，默认 <output_dir>/.kooix-cut-ledger.json
+        """
+        self.folder = Path(folder).resolve()
+        self.output_dir = Path(output_dir).resolve() if output_dir else self.folder / "cut"
+        self.options = options
+        self.export_kwargs = dict(export_kwargs or {})
+        self.jobs = max(1, jobs)
+        self.workers = workers or os.cpu_count() or 1
+        # 与 cli.main 一致：同时运行的任务平分导出线程
+        self.export_kwargs.setdefault("threads", max(1, (os.cpu_count() or 4) // self.jobs))
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.recursive = recursive
+        self.ledger = Ledger(ledger or self.output_dir / LEDGER_NAME)
+
+        self._lock = threading.Lock()
+        self._candidates = {}  # path -> (size, mtime_ns, 首次观察到该状态的时间)
+        self._active = set()   # 已排队或处理中
+        self._stop = threading.Event()
+
+    def _is_video(self, path):
+        path = Path(path)
+        if path.suffix.lower() not in VIDEO_EXTENSIONS or path.name.startswith("."):
+            return False
+        # 不处理输出目录中的文件
+        return self.output_dir not in path.resolve().parents
+
+    def notice(self, path):
+        """记录一个可能的新文件（文件事件或轮询发现）"""
+        if self._is_video(path):
+            with self._lock:
+                self._candidates.setdefault(str(Path(path).resolve()), None)
+
+    def scan(self):
+        """扫描整个目录（启动时和轮询模式下）"""
+        pattern = "**/*" if self.recursive else "*"
+        for path in self.folder.glob(pattern):
+            if path.is_file():
+                self.notice(path)
+
+    def ready_files(self):
+        """返回已稳定、未处理过的文件"""
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for path, state in list(self._candidates.items()):
+                if path in self._active:
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    del self._candidates[path]  # 已删除或被移走
+                    continue
+                if self.ledger.is_handled(path, st):
+                    del self._candidates[path]
+                    continue
+                current = (st.st_size, st.st_mtime_ns)
+                if state is None or state[:2] != current:
+                    self._candidates[path] = current + (now,)
+                elif st.st_size > 0 and now - state[2] >= self.settle:
+                    del self._candidates[path]
+                    self._active.add(path)
+                    ready.append(path)
+        return sorted(ready)
+
+    def output_path(self, path):
+        """输出文件路径：子目录中的文件放到输出目录下的同一相对路径，避免同名文件互相覆盖"""
+        path = Path(path)
+        try:
+            relative = path.resolve().parent.relative_to(self.folder)
+        except ValueError:
+            relative = Path()
+        return self.output_dir / relative / f"{path.stem}_cut.mp4"
+
+    def process(self, path, executor):
+        """处理单个文件并写入台账"""
+        from engine import run_job
+
+        name = Path(path).name
+        st = os.stat(path)
+        output = self.output_path(path)
+
+        def progress(current, total, message):
+            if message != name:  # 分析阶段的消息就是文件名，只显示导出阶段状态
+                print(f"[{name}] {message}", flush=True)
+
+        print(f"[{name}] 开始处理", flush=True)
+        try:
+            output.parent.mkdir(parents=True, exist_ok=True)
+            result = run_job([path], str(output), self.options, executor=executor,
+                             on_progress=progress, **self.export_kwargs)
+            if result is None:
+                print(f"[{name}] 没有有效片段", flush=True)
+                self.ledger.record(path, st, "empty")
+            else:
+                print(f"[{name}] 完成: {result}", flush=True)
+                self.ledger.record(path, st, "done", output=str(result))
+        except Exception as e:
+            print(f"[{name}] 失败: {e}", file=sys.stderr, flush=True)
+            self.ledger.record(path, st, "failed", error=str(e)[-500:])
+        finally:
+            with self._lock:
+                self._active.discard(path)
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        """运行直到 stop() 或 Ctrl+C"""
+        observer = None
+        if WATCHDOG_AVAILABLE:
+            watcher = self
+
+            class Handler(FileSystemEventHandler):
+                def on_any_event(self, event):
+                    if not event.is_directory:
+                        watcher.notice(getattr(event, "dest_path", None) or event.src_path)
+
+            observer = Observer()
+            observer.schedule(Handler(), str(self.folder), recursive=self.recursive)
+            observer.start()
+            mode = "文件事件"
+        else:
+            mode = f"轮询（每 {self.poll_interval:g} 秒）"
+        print(f"监视 {self.folder}（{mode}），输出到 {self.output_dir}", flush=True)
+
+        # 线程池限制同时处理的文件数，进程池限制分析进程数
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        pool = ThreadPoolExecutor(max_workers=self.jobs)
+        last_scan = 0.0
+        try:
+            while not self._stop.is_set():
+                # 有文件事件时轮询只作补充（如网络共享上事件不可靠）
+                interval = self.poll_interval * (6 if observer else 1)
+                if time.monotonic() - last_scan >= interval:
+                    self.scan()
+                    last_scan = time.monotonic()
+                for path in self.ready_files():
+                    pool.submit(self.process, path, executor)
+                self._stop.wait(1.0)
+        except KeyboardInterrupt:
+            print("\n停止监视，等待正在处理的文件完成...", flush=True)
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+            pool.shutdown(wait=True, cancel_futures=True)
+            executor.shutdown()
+
+
+def main(argv=None):
+    from cli import add_pipeline_arguments, options_from_args
+
+    multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(
+        prog="kooix-cut-watch",
+        description="KOOIX Cut 监视模式：自动处理文件夹中新写入的视频",
+    )
+    parser.add_argument("folder", help="监视目录")
+    parser.add_argument("-o", "--output", help="输出目录（默认 <监视目录>/cut）")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="同时处理的文件数（默认 1）")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="分析进程数（默认 CPU 核数）")
+    parser.add_argument("--settle", type=float, default=10.0,
+                        help="文件多久不变视为写入完成（秒，默认 10）")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="轮询间隔（秒）")
+    parser.add_argument("--recursive", action="store_true", help="包含子目录")
+    parser.add_argument("--ledger", help="台账文件（默认 <输出目录>/.kooix-cut-ledger.json）")
+    add_pipeline_arguments(parser)
+    args = parser.parse_args(argv)
+
+    watcher = FolderWatcher(
+        args.folder, args.output, options_from_args(args),
+        export_kwargs=dict(codec=args.codec, preset=args.preset, export_mode=args.export_mode),
+        jobs=args.jobs, workers=args.workers, settle=args.settle,
+        poll_interval=args.poll_interval, recursive=args.recursive, ledger=args.ledger,
+    )
+    watcher.run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())